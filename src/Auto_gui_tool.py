@@ -9,20 +9,25 @@ improved error handling, and better user experience.
 
 # Standard library imports
 import os
+import re
 import sys
 import time
 import json
+import math
 import logging
 import threading
+import queue
 import subprocess
 import uuid
+import hashlib
 import ctypes
 from pathlib import Path
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from typing import Dict, List, Optional, Tuple, Any, Union
-from contextlib import contextmanager
-from collections import deque
+from functools import partial, lru_cache
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # GUI library imports
 import tkinter as tk
@@ -35,7 +40,44 @@ import pyautogui
 import pyperclip
 import mss
 from screeninfo import get_monitors
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageTk, ImageDraw, ImageGrab
+
+# OpenCV: 最適化コード（SIMD等）を有効化し、並列スレッド数はTkのメインスレッド用に1コア残す
+# （画像検索が重い環境ではここのスレッド数が調整ポイント）
+cv2.setUseOptimized(True)
+cv2.setNumThreads(max(1, (os.cpu_count() or 2) - 1))
+
+# オプション: 高速JSONライブラリ（未インストール時は標準jsonを使用）
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# オプション: DXGI Desktop Duplicationによる高速キャプチャ（Windowsのみ、未インストール時はmssを使用）
+try:
+    import dxcam
+    DXCAM_AVAILABLE = os.name == "nt"
+except Exception:
+    dxcam = None
+    DXCAM_AVAILABLE = False
+
+# オプション: Windowsのシステムサウンド（Windows以外では無音）
+try:
+    import winsound
+    WINSOUND_AVAILABLE = True
+except ImportError:
+    winsound = None
+    WINSOUND_AVAILABLE = False
+
+# オプション: グローバルなマウスイベント監視（座標選択の右クリック確定・移動追従に使用）
+try:
+    import pynput.mouse as pynput_mouse
+    PYNPUT_AVAILABLE = True
+except Exception:
+    pynput_mouse = None
+    PYNPUT_AVAILABLE = False
 
 # ログ設定
 class LogManager:
@@ -60,6 +102,359 @@ class LogManager:
 
 logger = LogManager.setup_logging()
 
+
+def beep_async(kind_name: str = "MB_OK"):
+    """システム音をデーモンスレッドで鳴らす（UIスレッドをブロックしない）"""
+    if not WINSOUND_AVAILABLE:
+        return
+    try:
+        threading.Thread(target=winsound.MessageBeep, args=(getattr(winsound, kind_name),), daemon=True).start()
+    except Exception as e:
+        logger.debug(f"サウンド再生エラー（無視可能）: {e}")
+
+
+if os.name == "nt":
+    from ctypes import wintypes
+
+    # SendInput用の構造体（INPUTのサイズはMOUSEINPUTを含む共用体で決まるため3種すべて定義する）
+    class _MOUSEINPUT(ctypes.Structure):
+        _fields_ = [("dx", wintypes.LONG), ("dy", wintypes.LONG), ("mouseData", wintypes.DWORD),
+                    ("dwFlags", wintypes.DWORD), ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+    class _KEYBDINPUT(ctypes.Structure):
+        _fields_ = [("wVk", wintypes.WORD), ("wScan", wintypes.WORD), ("dwFlags", wintypes.DWORD),
+                    ("time", wintypes.DWORD), ("dwExtraInfo", ctypes.c_size_t)]
+
+    class _HARDWAREINPUT(ctypes.Structure):
+        _fields_ = [("uMsg", wintypes.DWORD), ("wParamL", wintypes.WORD), ("wParamH", wintypes.WORD)]
+
+    class _INPUTUNION(ctypes.Union):
+        _fields_ = [("mi", _MOUSEINPUT), ("ki", _KEYBDINPUT), ("hi", _HARDWAREINPUT)]
+
+    class _INPUT(ctypes.Structure):
+        _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+    _INPUT_KEYBOARD = 1
+    _KEYEVENTF_KEYUP = 0x0002
+    _KEYEVENTF_UNICODE = 0x0004
+    # 改行・タブはUnicode文字ではなく仮想キーとして送る（CRはCRLFの一部として捨てる）
+    _TEXT_VIRTUAL_KEYS = {"\n": 0x0D, "\t": 0x09}
+
+
+def send_unicode_text(text: str) -> bool:
+    """SendInputのUnicode入力で文字列を直接入力（クリップボードを使わない）
+    
+    Windows以外、または入力がブロックされ1件も送れなかった場合はFalseを返す。
+    """
+    if os.name != "nt":
+        return False
+    events = []
+    for ch in text:
+        if ch == "\r":
+            continue
+        vk = _TEXT_VIRTUAL_KEYS.get(ch)
+        if vk is not None:
+            events.append((vk, 0, 0))
+            events.append((vk, 0, _KEYEVENTF_KEYUP))
+            continue
+        # BMP外の文字はUTF-16のサロゲートペアを1単位ずつ送る
+        data = ch.encode("utf-16-le")
+        for i in range(0, len(data), 2):
+            unit = data[i] | (data[i + 1] << 8)
+            events.append((0, unit, _KEYEVENTF_UNICODE))
+            events.append((0, unit, _KEYEVENTF_UNICODE | _KEYEVENTF_KEYUP))
+    if not events:
+        return True
+    inputs = (_INPUT * len(events))()
+    for item, (vk, scan, flags) in zip(inputs, events):
+        item.type = _INPUT_KEYBOARD
+        item.u.ki.wVk = vk
+        item.u.ki.wScan = scan
+        item.u.ki.dwFlags = flags
+    sent = ctypes.windll.user32.SendInput(len(events), inputs, ctypes.sizeof(_INPUT))
+    if sent == 0:
+        return False
+    if sent != len(events):
+        raise RuntimeError(f"文字入力が途中で中断されました ({sent}/{len(events)}イベント)")
+    return True
+
+
+def play_system_sound(alias: str) -> bool:
+    """Windowsのシステムサウンドを同期再生（winsoundが無い場合はFalseを返し、呼び出し側で代替音を鳴らす）"""
+    if not WINSOUND_AVAILABLE:
+        return False
+    try:
+        winsound.PlaySound(alias, winsound.SND_ALIAS)
+    except RuntimeError as e:
+        logger.debug(f"サウンド再生エラー（無視可能）: {e}")
+    return True
+
+
+def console_bell():
+    """標準エラーにベル文字を書き出してbeep音を鳴らす（シェルを起動しない。出せない場合は無視）"""
+    try:
+        sys.stderr.write("\a")
+        sys.stderr.flush()
+    except Exception:
+        pass
+
+
+# プライマリ画面のサイズ（初回の呼び出しで取得し、以降はTkへ問い合わせない）
+_SCREEN_SIZE: Optional[Tuple[int, int]] = None
+
+
+def get_screen_size(widget) -> Tuple[int, int]:
+    """画面サイズ (幅, 高さ) を取得（プロセス内で1回だけwinfoを呼ぶ）"""
+    global _SCREEN_SIZE
+    if _SCREEN_SIZE is None:
+        _SCREEN_SIZE = (widget.winfo_screenwidth(), widget.winfo_screenheight())
+    return _SCREEN_SIZE
+
+
+# 縮小率がこれを超える場合はLANCZOSではなくBOXで縮小（極小サムネイルでは画質差が見えない）
+_BOX_RESAMPLE_RATIO = 8
+# Image.reduce() で事前縮小する画像モード
+_REDUCE_MODES = frozenset({"RGB", "RGBA", "L"})
+
+
+def make_thumbnail(pil_image: "Image.Image", size: Tuple[int, int]) -> "Image.Image":
+    """画像をsize以内に縮小したサムネイルを返す（JPEGはデコード時に縮小し、縮小率に応じてフィルタを選択）"""
+    # JPEGはデコード時に縮小（表示サイズの2倍以上を保つ。JPEG以外では何もしない）
+    pil_image.draft("RGB", (size[0] * 2, size[1] * 2))
+    # 整数倍の平均化(reduce)で表示サイズの2倍程度まで先に縮め、残りだけをフィルタで縮小（reduceはRGB/RGBA/Lのみ）
+    factor = min(pil_image.size[0] // (size[0] * 2), pil_image.size[1] // (size[1] * 2))
+    if factor >= 2 and pil_image.mode in _REDUCE_MODES:
+        pil_image = pil_image.reduce(factor)
+    # フィルタはreduce後の残りの縮小率で選ぶ
+    ratio = max(pil_image.size[0] / size[0], pil_image.size[1] / size[1])
+    resample = Image.Resampling.BOX if ratio > _BOX_RESAMPLE_RATIO else Image.Resampling.LANCZOS
+    pil_image.thumbnail(size, resample)
+    return pil_image
+
+
+@lru_cache(maxsize=64)
+def parse_hms(scheduled_time: str) -> Tuple[int, int, int]:
+    """HH:MM:SS 形式の時刻文字列を (時, 分, 秒) に変換（結果は文字列ごとにキャッシュ）
+    
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    time_parts = scheduled_time.split(':')
+    if len(time_parts) != 3:
+        raise ValueError("時刻の形式が正しくありません。HH:MM:SS形式で入力してください。")
+    return int(time_parts[0]), int(time_parts[1]), int(time_parts[2])
+
+
+def dumps_json(data: Any) -> str:
+    """JSONをインデント2の文字列に変換（orjsonがあれば使用）"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def read_json_file(file_path: str) -> Any:
+    """UTF-8のJSONファイルを読み込み（orjsonがあれば使用）
+    
+    orjson.JSONDecodeErrorはjson.JSONDecodeErrorのサブクラスのため、呼び出し側の例外処理はそのまま使える。
+    """
+    if ORJSON_AVAILABLE:
+        with open(file_path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# 設定ファイルの解析結果キャッシュ {(パス, 更新時刻ns, サイズ): 設定dict}
+_CONFIG_CACHE: "OrderedDict[tuple, dict]" = OrderedDict()
+_CONFIG_CACHE_SIZE = 16
+
+
+def read_config_cached(file_path: str) -> Any:
+    """設定ファイルを読み込み（更新時刻・サイズが同じなら解析済みの結果を再利用）
+    
+    返り値はキャッシュと共有されるため、呼び出し側で変更しないこと。
+    """
+    st = os.stat(file_path)
+    key = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+    config = _CONFIG_CACHE.get(key)
+    if config is not None:
+        _CONFIG_CACHE.move_to_end(key)
+        return config
+    config = read_json_file(file_path)
+    _CONFIG_CACHE[key] = config
+    if len(_CONFIG_CACHE) > _CONFIG_CACHE_SIZE:
+        _CONFIG_CACHE.popitem(last=False)
+    return config
+
+
+def invalidate_config_cache(file_path: str):
+    """指定ファイルの解析結果キャッシュを破棄"""
+    path = os.path.abspath(file_path)
+    for key in [key for key in _CONFIG_CACHE if key[0] == path]:
+        del _CONFIG_CACHE[key]
+
+
+def write_json_file(file_path: str, data: Any):
+    """JSONをUTF-8・インデント2でファイルに書き込み（orjsonがあれば使用）"""
+    if ORJSON_AVAILABLE:
+        with open(file_path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def write_file_atomic(file_path: str, data: bytes):
+    """一時ファイルに書いてからos.replaceで置き換え（途中で落ちても壊れたファイルを残さない）"""
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, file_path)
+
+
+def write_json_compact(file_path: str, data: Any):
+    """JSONをインデントなしの1行でアトミックに書き込み（last_configなど小さな内部ファイル用）"""
+    if ORJSON_AVAILABLE:
+        payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    write_file_atomic(file_path, payload)
+
+
+def write_steps_config_file(file_path: str, steps: List[Any], extra: Dict[str, Any]):
+    """ステップ一覧と付帯情報を {"steps": [...], **extra} 形式で書き込み
+    
+    各ステップはキャッシュ済みのJSON断片を連結するため、未変更のステップは再エンコードしない。
+    出力はjson.dump(indent=2)と同じ書式になる。
+    """
+    parts = ['{\n  "steps": [']
+    if steps:
+        parts.append("\n" + ",\n".join(step.to_json_fragment() for step in steps) + "\n  ]")
+    else:
+        parts.append("]")
+    if extra:
+        # 付帯情報は先頭の "{\n" を除いて連結
+        parts.append(",\n" + dumps_json(extra)[2:])
+    else:
+        parts.append("\n}")
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write("".join(parts))
+
+
+# 時刻（HH:MM または HH:MM:SS）の形式・範囲チェック用
+_TIME_RE = re.compile(r'^([01]?\d|2[0-3]):([0-5]?\d)(?::([0-5]?\d))?$')
+
+
+# Windows cmd/PowerShell の危険なコマンドパターン（小文字化したコマンドに対して照合）
+_DANGEROUS_CMD_PATTERNS = (
+    # ファイル削除系
+    r'del\s+.*(/[sq]|\\|\*)',           # del /s, del /q, del *.* 
+    r'rmdir\s+.*(/s|/q)',               # rmdir /s
+    r'rd\s+.*(/s|/q)',                  # rd /s /q
+    r'erase\s+.*(\*|\\)',               # erase
+    r'remove-item\s+.*(-recurse|-force)', # PowerShell Remove-Item
+
+    # システム操作系
+    r'format\s+[a-z]:',                 # format C:
+    r'fdisk\s+',                        # fdisk
+    r'diskpart\s*$',                    # diskpart
+    r'bootrec\s+',                      # bootrec
+    r'bcdedit\s+',                      # bcdedit
+
+    # システム制御系
+    r'shutdown\s+.*(/[rs]|/[fth])',     # shutdown /r /s /f /t /h
+    r'restart-computer',                # PowerShell restart
+    r'stop-computer',                   # PowerShell shutdown
+
+    # ネットワーク/セキュリティ系
+    r'netsh\s+',                        # netsh (firewall, wifi等)
+    r'netstat\s+.*(-a|-n)',             # netstat
+    r'arp\s+(-[ads])',                  # arp manipulation
+
+    # レジストリ操作系
+    r'reg\s+(delete|add|import)',       # registry operations
+    r'regedit\s+(/[si])',              # regedit import/silent
+
+    # サービス制御系  
+    r'sc\s+(delete|create|config)',     # service control
+    r'net\s+(start|stop|user)',         # net commands
+    r'wmic\s+',                         # wmic
+
+    # プロセス制御系
+    r'taskkill\s+.*(/f|/im)',          # force kill processes
+    r'tskill\s+',                       # tskill
+    r'stop-process\s+.*-force',         # PowerShell force stop
+
+    # PowerShell危険系
+    r'powershell\s.*(-encodedcommand|-enc|-ep\s+bypass)', # encoded/bypass execution policy
+    r'invoke-expression\s*\(',          # Invoke-Expression
+    r'iex\s*\(',                        # iex alias
+    r'invoke-webrequest.*downloadfile', # file download
+    r'start-process\s+.*-windowstyle\s+hidden', # hidden process
+
+    # スケジュール/自動実行系
+    r'schtasks\s+.*(/create|/delete)',  # scheduled tasks
+    r'at\s+\d+:\d+',                   # at command
+
+    # ファイアウォール/セキュリティ系
+    r'netsh\s+advfirewall',            # firewall
+    r'netsh\s+firewall',               # legacy firewall
+
+    # コマンドチェーン（危険な組み合わせ）
+    r'[;&|`]\s*(del|rmdir|rd|format|shutdown)', # command chaining
+    r'\|\s*(del|rmdir|rd|format)',     # pipe to dangerous commands
+
+    # 隠蔽系
+    r'attrib\s+.*\+[hs]',              # hide files
+    r'icacls\s+.*(/deny|/remove)',     # permission manipulation
+
+    # バッチ/スクリプト実行
+    r'cmd\s+/c\s+.*(\||&)',            # cmd /c with chaining
+    r'start\s+/min',                   # minimized start
+)
+_DANGEROUS_CMD_RE = re.compile("|".join(f"(?:{pattern})" for pattern in _DANGEROUS_CMD_PATTERNS))
+# タブ・改行・復帰以外の制御文字（null文字を含む）
+_CONTROL_CHAR_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# analyze_error の分類ルール（照合語は小文字、先に一致したものを優先。内容は変更しないこと）
+_ERROR_RULES = (
+    # 画像関連エラー
+    (("画像が見つかりません",), {
+        "category": "🔍 画像検索失敗",
+        "reason": "指定した画像が画面上に見つかりませんでした",
+        "suggestion": "• 画像の信頼度を下げる (推奨: 0.7-0.8)\n• 画像を再キャプチャする\n• 画面の状態を確認する",
+        "action": "adjust_threshold"
+    }),
+    (("ファイルの読み込みに失敗",), {
+        "category": "📁 ファイルエラー",
+        "reason": "画像ファイルが存在しないか、破損しています",
+        "suggestion": "• ファイルパスを確認する\n• 画像を再選択する\n• ファイル権限を確認する",
+        "action": "reselect_file"
+    }),
+    # キー操作エラー
+    (("キー操作",), {
+        "category": "⌨ キーボードエラー",
+        "reason": "キー入力の実行に失敗しました",
+        "suggestion": "• キーの組み合わせを確認する\n• アプリケーションがアクティブか確認する\n• 短い待機時間を追加する",
+        "action": "check_focus"
+    }),
+    # 座標エラー
+    (("座標", "click"), {
+        "category": "🖱 マウスエラー",
+        "reason": "マウス操作の実行に失敗しました",
+        "suggestion": "• 座標値を確認する\n• 画面解像度の変更がないか確認する\n• ウィンドウ位置を確認する",
+        "action": "recapture_coords"
+    }),
+    # スクリーンショットエラー
+    (("スクリーンショット",), {
+        "category": "📷 画面キャプチャエラー",
+        "reason": "画面のキャプチャに失敗しました",
+        "suggestion": "• モニター設定を確認する\n• アプリケーションを管理者権限で実行する\n• DPI設定を確認する",
+        "action": "check_permissions"
+    }),
+)
+
+
 # アプリケーション設定
 class AppConfig:
     APP_NAME = "Auto GUI Tool Professional"
@@ -204,6 +599,42 @@ class AppConfig:
     
     CLICK_TYPES = ["single", "double", "right"]
     
+    # dxcam（DXGI）でのキャプチャを使うか（出力番号とモニター番号の対応が環境依存のため既定は無効）
+    USE_DXCAM_CAPTURE = False
+    
+    # カスタム文字列をSendInputのUnicode入力で送るか（Windowsのみ。無効時・失敗時はクリップボード貼り付け）
+    USE_UNICODE_TEXT_INPUT = True
+    
+    # Undo/Redo履歴の上限（古いものから破棄。スナップショットはStep参照のタプルなので軽量）
+    UNDO_HISTORY_SIZE = 100
+    
+    # 実行スレッドからのUI更新をまとめて反映する間隔（ミリ秒）
+    UI_DRAIN_INTERVAL_MS = 50
+    # 実行ループがステータス・ハイライト等を更新する最小間隔（秒、約30Hz）
+    UI_MIN_UPDATE_INTERVAL = 1 / 30
+    # 完了待ちコマンドの停止・タイムアウト確認間隔（秒）
+    CMD_POLL_INTERVAL = 0.1
+    
+    # 設定ファイルで有効なステップタイプ（実装済みのすべてのタイプを含める）
+    VALID_STEP_TYPES = frozenset({
+        "image_click", "coord_click", "coord_drag", "image_right_click", "image_relative_right_click",
+        "sleep", "custom_text", "cmd", "cmd_command", "key_action", "key",
+        "copy", "paste", "repeat_start", "repeat_end"
+    })
+    
+    # ステップタイプ別の必須パラメータ（表示・実行で直接参照されるキー）
+    REQUIRED_STEP_PARAMS = {
+        "image_click": ("path", "threshold"),
+        "image_relative_right_click": ("path", "offset_x", "offset_y"),
+        "coord_click": ("x", "y"),
+        "coord_drag": ("start_x", "start_y", "end_x", "end_y", "duration"),
+        "custom_text": ("text",),
+        "cmd_command": ("command",),
+        "key": ("key",),
+        "copy": ("key",),
+        "paste": ("key",),
+    }
+    
     # Treeview拡張機能の定数
     FG_DISABLED = '#8E8E8E'  # 無効行の文字色
     ELLIPSIS = '…'  # 省略記号
@@ -837,8 +1268,9 @@ class BaseDialog:
     def center_window(self):
         """ウィンドウをスクリーン中央に配置"""
         self.dialog.update_idletasks()
-        x = (self.dialog.winfo_screenwidth() // 2) - (self.dialog.winfo_width() // 2)
-        y = (self.dialog.winfo_screenheight() // 2) - (self.dialog.winfo_height() // 2)
+        screen_width, screen_height = get_screen_size(self.dialog)
+        x = (screen_width // 2) - (self.dialog.winfo_width() // 2)
+        y = (screen_height // 2) - (self.dialog.winfo_height() // 2)
         self.dialog.geometry(f'+{x}+{y}')
     
     def show_error_dialog(self, title: str, message: str, parent=None):
@@ -898,24 +1330,76 @@ class Step:
     created_at: str = ""
     enabled: bool = True
     
+    # 保存用dict・JSON断片のキャッシュ（dataclassフィールドではない）
+    _cached_dict = None
+    _cached_json = None
+    
     def __post_init__(self):
         if not self.created_at:
             self.created_at = datetime.now().isoformat()
+        # 表示文字列のキャッシュ（dataclassフィールドではない）
+        self._display_cache = {}
     
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
     
+    def to_save_dict(self) -> Dict[str, Any]:
+        """保存用のdictを返す（未変更のステップはキャッシュを再利用）"""
+        if self._cached_dict is None:
+            self._cached_dict = {
+                "type": self.type,
+                "params": dict(self.params),
+                "comment": self.comment,
+                "created_at": self.created_at,
+                "enabled": self.enabled
+            }
+        return self._cached_dict
+    
+    def to_json_fragment(self) -> str:
+        """設定ファイルのsteps配列要素としてのJSON断片（インデント済み）を返す"""
+        if self._cached_json is None:
+            self._cached_json = "\n".join("    " + line for line in dumps_json(self.to_save_dict()).split("\n"))
+        return self._cached_json
+    
+    def invalidate_cache(self):
+        """params/comment/enabledの変更後に保存用・表示用キャッシュを破棄"""
+        self._cached_dict = None
+        self._cached_json = None
+        self._display_cache.clear()
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Step':
-        # 古いフォーマットとの互換性を保つ
-        if 'enabled' not in data:
-            data['enabled'] = True
-        return cls(**data)
+        """設定ファイルのdictから生成（キーワード引数の展開と__init__を経由しない高速パス）"""
+        step = cls.__new__(cls)
+        step.type = data["type"]
+        step.params = data["params"]
+        step.comment = data.get("comment", "")
+        # 古いフォーマットとの互換性を保つ（enabled/created_atが無い場合）
+        step.created_at = data.get("created_at") or datetime.now().isoformat()
+        step.enabled = data.get("enabled", True)
+        step._display_cache = {}
+        return step
+    
+    def clone(self) -> 'Step':
+        """paramsのみ浅くコピーした複製を作成（値は不変型なので共有）"""
+        return Step(self.type, params=dict(self.params), comment=self.comment, enabled=self.enabled)
+    
+    def copy_for_write(self) -> 'Step':
+        """変更前に差し替える複製（created_atを含めて同一内容、paramsは浅いコピー）"""
+        return Step(self.type, dict(self.params), self.comment, self.created_at, self.enabled)
     
     def validate(self) -> bool:
         """ステップの妥当性をチェック"""
         required_fields = {'type', 'params', 'comment'}
-        return all(hasattr(self, field) for field in required_fields)
+        if not all(hasattr(self, field) for field in required_fields):
+            return False
+        # 時刻指定の待機はステップ作成時に一度だけ形式をチェック
+        if self.type == "sleep" and self.params.get("wait_type") == "scheduled":
+            try:
+                datetime.strptime(self.params.get("scheduled_time", ""), "%H:%M:%S")
+            except (TypeError, ValueError):
+                return False
+        return True
     
     def get_preview_image_path(self) -> Optional[str]:
         """プレビュー用の画像パスを取得"""
@@ -923,9 +1407,71 @@ class Step:
             return self.params.get('path')
         return None
 
+@dataclass(frozen=True)
+class FieldSpec:
+    """ダイアログ入力フィールドの静的定義（既定値のみ実行時に注入）"""
+    key: str
+    label: str
+    type: str
+    default: Any = None  # paramsに値が無い場合の既定値（Noneは必須パラメータ）
+    min: Any = None
+    max: Any = None
+    values: Optional[Tuple[str, ...]] = None
+    help_text: Optional[str] = None
+    required: Optional[bool] = None
+    on_change: Optional[bool] = None
+    height: Optional[int] = None
+    show_condition: Optional[Tuple[str, str]] = None  # (フィールド名, 値)
+    choices: Optional[Tuple[Tuple[str, str], ...]] = None  # ((保存値, 表示名), ...) 保存値と画面表示を分ける選択肢
+    
+    def to_display(self, value: Any) -> Any:
+        """保存値を画面表示用の値に変換（choicesが無い・未知の値はそのまま）"""
+        if self.choices:
+            for code, label in self.choices:
+                if value == code:
+                    return label
+        return value
+    
+    def from_display(self, value: Any) -> Any:
+        """画面で選ばれた値を保存値に変換（choicesが無い・未知の値はそのまま）"""
+        if self.choices:
+            for code, label in self.choices:
+                if value == label:
+                    return code
+        return value
+    
+    def with_default(self, value: Any) -> Dict[str, Any]:
+        """既定値を埋め込んだModernDialog用のフィールドdictを作成"""
+        if self.type in ("int", "float"):
+            value = str(value)
+        value = self.to_display(value)
+        field = {"key": self.key, "label": self.label, "type": self.type, "default": value}
+        if self.min is not None:
+            field["min"] = self.min
+        if self.max is not None:
+            field["max"] = self.max
+        if self.choices is not None:
+            field["values"] = [label for _, label in self.choices]
+        elif self.values is not None:
+            field["values"] = list(self.values)
+        if self.help_text is not None:
+            field["help"] = self.help_text
+        if self.required is not None:
+            field["required"] = self.required
+        if self.on_change is not None:
+            field["on_change"] = self.on_change
+        if self.height is not None:
+            field["height"] = self.height
+        if self.show_condition is not None:
+            field["show_condition"] = {"field": self.show_condition[0], "value": self.show_condition[1]}
+        return field
+
 class ImagePreviewWidget:
     """画像プレビューウィジェット"""
     
+    # サムネイルキャッシュの上限件数
+    THUMB_CACHE_SIZE = 64
+    
     def __init__(self, parent, app_instance=None):
         self.parent = parent
         self.app_instance = app_instance
@@ -933,6 +1479,8 @@ class ImagePreviewWidget:
         self.current_image_path = None
         self.image_label = None
         self.info_label = None
+        # {(パス, 更新時刻): (PhotoImage, 情報テキスト)}
+        self._thumb_cache = OrderedDict()
         self.setup_ui()
     
     def setup_ui(self):
@@ -967,19 +1515,26 @@ class ImagePreviewWidget:
     def show_image(self, image_path: str):
         """画像を表示"""
         try:
-            if not image_path or not Path(image_path).exists():
+            if not image_path:
+                self.clear_image()
+                return
+            try:
+                stat = os.stat(image_path)
+            except OSError:
                 self.clear_image()
                 return
             
-            # 画像を読み込み
-            pil_image = Image.open(image_path)
-            
-            # サイズ調整（コンパクトサイズ）
-            display_size = (160, 90)  # 高さをさらに縮小してコンパクトに
-            pil_image.thumbnail(display_size, Image.Resampling.LANCZOS)
-            
-            # Tkinter用に変換
-            photo = ImageTk.PhotoImage(pil_image)
+            # 同じ画像（パスと更新時刻が一致）はデコード済みのサムネイルを再利用
+            key = (image_path, stat.st_mtime)
+            cached = self._thumb_cache.get(key)
+            if cached is not None:
+                self._thumb_cache.move_to_end(key)
+                photo, info_text = cached
+            else:
+                photo, info_text = self._load_thumbnail(image_path, stat.st_size)
+                self._thumb_cache[key] = (photo, info_text)
+                if len(self._thumb_cache) > self.THUMB_CACHE_SIZE:
+                    self._thumb_cache.popitem(last=False)
             
             # プレースホルダーを非表示
             self.placeholder_label.pack_forget()
@@ -993,14 +1548,7 @@ class ImagePreviewWidget:
             self.image_label.configure(image=photo)
             self.image_label.image = photo  # 参照を保持
             
-            # 情報表示を更新（ファイル名を省略形で表示）
-            file_size = Path(image_path).stat().st_size
-            original_size = Image.open(image_path).size
-            filename = Path(image_path).name
-            # ファイル名が長い場合は省略
-            if len(filename) > 20:
-                filename = filename[:15] + "..." + filename[-5:]
-            info_text = f"{filename} | {original_size[0]}x{original_size[1]}px | {file_size:,}B"
+            # 情報表示を更新
             self.info_label.configure(text=info_text)
             
             self.current_image_path = image_path
@@ -1013,6 +1561,25 @@ class ImagePreviewWidget:
             logger.error(f"画像表示エラー: {e}")
             self.clear_image()
 
+    def _load_thumbnail(self, image_path: str, file_size: int):
+        """画像を読み込んでサムネイルと情報テキストを作成"""
+        with Image.open(image_path) as pil_image:
+            original_size = pil_image.size
+            
+            # サイズ調整（コンパクトサイズ）
+            display_size = (160, 90)  # 高さをさらに縮小してコンパクトに
+            pil_image = make_thumbnail(pil_image, display_size)
+            
+            # Tkinter用に変換
+            photo = ImageTk.PhotoImage(pil_image)
+        
+        # ファイル名を省略形で表示
+        filename = Path(image_path).name
+        # ファイル名が長い場合は省略
+        if len(filename) > 20:
+            filename = filename[:15] + "..." + filename[-5:]
+        info_text = f"{filename} | {original_size[0]}x{original_size[1]}px | {file_size:,}B"
+        return photo, info_text
     
     def clear_image(self):
         """画像をクリア"""
@@ -1027,6 +1594,9 @@ class ImagePreviewWidget:
 class DragDropTreeview:
     """ドラッグ&ドラップ対応のTreeview"""
     
+    # 省略表示キャッシュの上限件数
+    ELIDE_CACHE_SIZE = 4096
+    
     def __init__(self, parent, app_instance):
         self.app = app_instance
         self.drag_item = None
@@ -1038,6 +1608,8 @@ class DragDropTreeview:
         
         # 省略表示とツールチップ機能用の変数
         self.full_values = {}  # {item_id: {'Params': '完全なテキスト', 'Comment': '完全なテキスト'}}
+        self._elide_cache = {}  # {(列名, 列幅, テキスト): 省略後テキスト}
+        self._elide_font = None
         self.tooltip_window = None
         self.current_tooltip_item = None
         self.current_tooltip_column = None
@@ -1276,15 +1848,31 @@ class DragDropTreeview:
             self.tree.item(item_id, tags=('disabled',))  # 無効タグを適用
     
     def elide_to_fit(self, text: str, column: str) -> str:
-        """列幅に収まるようにテキストを省略"""
-        import tkinter.font as tkfont
-        
-        # フォントとカラム幅を取得（TreeviewのデフォルトフォントはTkDefaultFontを使用）
-        try:
-            font = tkfont.nametofont("TkDefaultFont")
-        except:
-            font = tkfont.Font(family="Segoe UI", size=9)
+        """列幅に収まるようにテキストを省略（列・列幅・テキスト単位でメモ化）"""
         column_width = self.tree.column(column, 'width')
+        key = (column, column_width, text)
+        cached = self._elide_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        if len(self._elide_cache) >= self.ELIDE_CACHE_SIZE:
+            self._elide_cache.clear()
+        result = self._elide_uncached(text, column_width)
+        self._elide_cache[key] = result
+        return result
+    
+    def _elide_uncached(self, text: str, column_width: int) -> str:
+        """フォント幅を実測してテキストを省略"""
+        font = self._elide_font
+        if font is None:
+            import tkinter.font as tkfont
+            
+            # フォントを取得（TreeviewのデフォルトフォントはTkDefaultFontを使用）
+            try:
+                font = tkfont.nametofont("TkDefaultFont")
+            except:
+                font = tkfont.Font(family="Segoe UI", size=9)
+            self._elide_font = font
         
         # テキストの幅を測定
         text_width = font.measure(text)
@@ -1364,8 +1952,7 @@ class DragDropTreeview:
         y = event.y_root + 10
         
         # スクリーンの端を考慮して位置を調整
-        screen_width = tw.winfo_screenwidth()
-        screen_height = tw.winfo_screenheight()
+        screen_width, screen_height = get_screen_size(tw)
         
         # ツールチップの内容を作成
         import tkinter.font as tkfont
@@ -1426,6 +2013,8 @@ class DragDropTreeview:
     
     def recalculate_display(self):
         """省略表示の再計算"""
+        # 列幅が変わったため旧幅の省略結果は破棄
+        self._elide_cache.clear()
         try:
             children = self.tree.get_children()
             for index, item_id in enumerate(children):
@@ -1571,8 +2160,9 @@ class ModernDialog:
         
     def center_window(self):
         self.dialog.update_idletasks()
-        x = (self.dialog.winfo_screenwidth() // 2) - (self.dialog.winfo_width() // 2)
-        y = (self.dialog.winfo_screenheight() // 2) - (self.dialog.winfo_height() // 2)
+        screen_width, screen_height = get_screen_size(self.dialog)
+        x = (screen_width // 2) - (self.dialog.winfo_width() // 2)
+        y = (screen_height // 2) - (self.dialog.winfo_height() // 2)
         self.dialog.geometry(f'+{x}+{y}')
 
     def setup_ui(self):
@@ -1808,28 +2398,14 @@ class ModernDialog:
                     if not scheduled_time:
                         raise ValueError("時刻指定を選択した場合は実行時刻を入力してください。")
 
-                    try:
-                        time_parts = scheduled_time.split(':')
-                        if len(time_parts) == 2:
-                            # HH:MM形式の場合、:00を補完
-                            time_parts.append("00")
-                        elif len(time_parts) != 3:
-                            raise ValueError("時刻の形式が正しくありません")
-
-                        # 各パーツが数字として有効かチェック
-                        hour = int(time_parts[0])
-                        minute = int(time_parts[1])
-                        second = int(time_parts[2])
-
-                        # 時刻の妥当性をチェック
-                        if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 59):
-                            raise ValueError("時刻の値が範囲外です")
-
-                        # HH:MM:SS形式で保存
-                        formatted_time = f"{hour:02d}:{minute:02d}:{second:02d}"
-                        result["scheduled_time"] = formatted_time
-                    except ValueError as ve:
-                        raise ValueError(f"時刻の形式が正しくありません。HH:MM または HH:MM:SS形式で入力してください。（例：14:30 または 14:30:00）\n詳細: {str(ve)}")
+                    # 正規表現1回で形式と範囲を同時にチェック（HH:MM の場合は秒を補完）
+                    m = _TIME_RE.match(scheduled_time)
+                    if m is None:
+                        raise ValueError("時刻の形式が正しくありません。HH:MM または HH:MM:SS形式で入力してください。（例：14:30 または 14:30:00）")
+                    hour, minute, second = m.group(1), m.group(2), m.group(3) or "0"
+                    
+                    # HH:MM:SS形式で保存
+                    result["scheduled_time"] = f"{int(hour):02d}:{int(minute):02d}:{int(second):02d}"
 
             self.result = result
             self.dialog.destroy()
@@ -1851,9 +2427,183 @@ class ModernDialog:
         self.dialog.bell()
         messagebox.showerror(title, message, parent=self.dialog)
 
+# デフォルトコメントパターン（get_clean_comment用）
+_DEFAULT_PATTERNS = (
+    "画像クリック:",
+    "座標右クリック",
+    "画像オフセットクリック:",
+    "待機時間",
+    "キー操作",
+    "カスタム文字列入力",
+    "キー入力間隔",
+    "右クリック間隔",
+    "画像クリック後待機"
+)
+_DEFAULT_PATTERN_RE = re.compile("(" + "|".join(re.escape(p) for p in _DEFAULT_PATTERNS) + ")")
+
+
+def _handle_image_click_comment(remaining: str) -> str:
+    """"画像クリック: filename.png" のファイル名部分を除去してユーザーコメントを抽出"""
+    remaining = remaining.strip()
+    # 改行、" - " 以降をユーザーコメントとみなす
+    if "\n" in remaining:
+        return remaining.split("\n", 1)[1].strip()
+    if " - " in remaining:
+        return remaining.split(" - ", 1)[1].strip()
+    # その他の場合は、ファイル名のみとみなして空を返す
+    return ""
+
+
+_PATTERN_HANDLERS = {pattern: (lambda rem: rem.strip()) for pattern in _DEFAULT_PATTERNS}
+_PATTERN_HANDLERS["画像クリック:"] = _handle_image_click_comment
+
+
 class AutoActionTool:
     """メインアプリケーションクラス"""
     
+    # デコード済みテンプレート画像のキャッシュ件数
+    TEMPLATE_CACHE_SIZE = 32
+    # 画像検索の粗探索用縮小率・縮小版テンプレートの最小辺・等倍再照合の余白（ピクセル）
+    PYRAMID_SCALE = 0.25
+    PYRAMID_MIN_SIDE = 8
+    PYRAMID_REFINE_MARGIN = 8
+    
+    # ステップ追加ボタン定義: (行, 列, 表示名, メソッド名, 引数, ツールチップ)
+    _BUTTON_SPECS = (
+        # 1列目
+        (0, 0, "画像クリック", "add_step_image_click", (), "画像をクリック/ダブルクリックするステップを追加"),
+        (1, 0, "座標クリック", "add_step_coord_click", (), "指定座標でクリックするステップを追加"),
+        (2, 0, "画像オフセットクリック", "add_step_image_relative_right_click", (), "画像の位置からオフセットした位置をクリックするステップを追加"),
+        (3, 0, "スリープ", "add_step_sleep", (), "待機時間を追加"),
+        # 2列目（コピーとペーストを←→と入れ替え）
+        (0, 1, "←", "add_step_key_action", ("key", "left"), "左キーを追加"),
+        (1, 1, "→", "add_step_key_action", ("key", "right"), "右キーを追加"),
+        (2, 1, "↑", "add_step_key_action", ("key", "up"), "上キーを追加"),
+        (3, 1, "↓", "add_step_key_action", ("key", "down"), "下キーを追加"),
+        # 3列目（←→をコピーとペーストと入れ替え）
+        (0, 2, "コピー", "add_step_key_action", ("copy", "ctrl+c"), "コピー操作を追加"),
+        (1, 2, "ペースト", "add_step_key_action", ("paste", "ctrl+v"), "ペースト操作を追加"),
+        (2, 2, "Tab", "add_step_key_action", ("key", "tab"), "Tabキーを追加"),
+        (3, 2, "Enter", "add_step_key_action", ("key", "enter"), "Enterキーを追加"),
+        # 4列目
+        (0, 3, "カスタムキー", "add_step_key_custom", (), "任意のキー操作を追加"),
+        (1, 3, "カスタム文字列", "add_step_custom_text", (), "任意の文字列を入力するステップを追加"),
+    )
+    
+    # 編集結果の反映に専用処理が必要なステップタイプ
+    _EDIT_APPLY_HANDLERS = {
+        "sleep": "_apply_edit_sleep",
+        "cmd_command": "_apply_edit_cmd_command",
+        "repeat_start": "_apply_edit_repeat_start",
+        "repeat_end": "_apply_edit_repeat_end",
+    }
+    
+    # 編集ダイアログのフィールド定義（ステップタイプ別）
+    _COMMENT_FIELD = FieldSpec("comment", "メモ:", "text")
+    _KEY_FIELDS = (
+        FieldSpec("key", "キー:", "combobox", values=tuple(AppConfig.KEY_OPTIONS), required=True),
+        _COMMENT_FIELD,
+    )
+    # 画像検索の照合方式（保存値は "gray"/"color"。色の違いだけで区別する画像は「カラー」を選ぶ）
+    _MATCH_MODE_FIELD = FieldSpec("match_mode", "照合方式:", "combobox", default="gray",
+                                  choices=(("gray", "グレースケール"), ("color", "カラー")), required=False)
+    _EDIT_FIELD_SCHEMAS = {
+        "image_click": (
+            FieldSpec("threshold", "信頼度（0.5-1.0):", "float", min=0.5, max=1.0),
+            FieldSpec("click_type", "Click Type:", "combobox", default="single", values=tuple(AppConfig.CLICK_TYPES), required=True),
+            FieldSpec("retry", "リトライ回数（0-10）:", "int", min=0),
+            FieldSpec("delay", "リトライ間隔(秒):", "float", min=0.1),
+            _MATCH_MODE_FIELD,
+            _COMMENT_FIELD,
+        ),
+        "coord_click": (
+            FieldSpec("x", "X座標:", "int"),
+            FieldSpec("y", "Y座標:", "int"),
+            FieldSpec("click_type", "クリックタイプ:", "combobox", default="single", values=tuple(AppConfig.CLICK_TYPES), required=True),
+            _COMMENT_FIELD,
+        ),
+        "coord_drag": (
+            FieldSpec("start_x", "開始X座標:", "int"),
+            FieldSpec("start_y", "開始Y座標:", "int"),
+            FieldSpec("end_x", "終了X座標:", "int"),
+            FieldSpec("end_y", "終了Y座標:", "int"),
+            FieldSpec("duration", "ドラッグ時間(秒):", "float", min=0.1),
+            _COMMENT_FIELD,
+        ),
+        "image_relative_right_click": (
+            FieldSpec("threshold", "信頼度(0.5-1.0):", "float", min=0.5, max=1.0),
+            FieldSpec("click_type", "クリックタイプ:", "combobox", default="right", values=tuple(AppConfig.CLICK_TYPES), required=True),
+            FieldSpec("offset_x", "Xオフセット(-9999-9999):", "int", min=-9999),
+            FieldSpec("offset_y", "Yオフセット(-9999-9999):", "int", min=-9999),
+            FieldSpec("retry", "リトライ回数(0-10):", "int", min=0, max=10),
+            FieldSpec("delay", "リトライ間隔(秒, 0.1-10):", "float", min=0.1, max=10.0),
+            _MATCH_MODE_FIELD,
+            _COMMENT_FIELD,
+        ),
+        "sleep": (
+            FieldSpec("wait_type", "待機タイプ:", "combobox", values=("スリープ(秒数指定)", "時刻指定"), on_change=True),
+            FieldSpec("seconds", "待ち時間(秒, 0.1-100):", "float", default=1.0, min=0.1, max=100.0,
+                      show_condition=("wait_type", "スリープ(秒数指定)")),
+            FieldSpec("scheduled_time", "実行時刻(HH:MM:SS):", "str", default="", help_text="日次実行時刻を指定（例：14:30:00）",
+                      show_condition=("wait_type", "時刻指定")),
+            _COMMENT_FIELD,
+        ),
+        "copy": _KEY_FIELDS,
+        "paste": _KEY_FIELDS,
+        "key": _KEY_FIELDS,
+        "custom_text": (
+            FieldSpec("text", "入力文字列:", "text", required=True),
+            _COMMENT_FIELD,
+        ),
+        "cmd_command": (
+            FieldSpec("command", "コマンド:", "text", height=12, required=True, help_text="複数行のコマンドを記述できます"),
+            FieldSpec("timeout", "タイムアウト(秒):", "int", default=30, min=1, required=True),
+            FieldSpec("wait_completion", "完了を待つ:", "combobox", values=("待つ", "待たない")),
+            _COMMENT_FIELD,
+        ),
+        "repeat_start": (
+            FieldSpec("repeat_type", "繰り返しタイプ:", "combobox", default="指定回数繰り返す",
+                      values=("指定回数繰り返す", "終了条件を満たすまで繰り返す"), required=True, on_change=True),
+            FieldSpec("count", "繰り返し回数:", "int", default=2, min=1, required=False,
+                      show_condition=("repeat_type", "指定回数繰り返す")),
+            FieldSpec("max_iterations", "最大繰り返し回数:", "int", default=100, min=1, required=False,
+                      show_condition=("repeat_type", "終了条件を満たすまで繰り返す")),
+            _COMMENT_FIELD,
+        ),
+        "repeat_end": (
+            FieldSpec("end_condition_type", "終了条件タイプ:", "combobox", default="条件なし",
+                      values=("条件なし", "画像一致で終了", "ファイル存在で終了", "ファイル削除で終了", "フォルダ内ファイル数で終了", "クリップボード内容で終了"),
+                      required=True, on_change=True),
+            FieldSpec("end_condition_threshold", "画像一致信頼度:", "float", default=0.8, min=0.1, max=1.0, required=False,
+                      show_condition=("end_condition_type", "画像一致で終了")),
+            FieldSpec("file_path", "ファイルパス:", "file", default="", required=False,
+                      show_condition=("end_condition_type", "ファイル存在で終了")),
+            FieldSpec("file_path_delete", "ファイルパス:", "file", default="", required=False,
+                      show_condition=("end_condition_type", "ファイル削除で終了")),
+            FieldSpec("folder_path", "フォルダパス:", "folder", default="", required=False,
+                      show_condition=("end_condition_type", "フォルダ内ファイル数で終了")),
+            FieldSpec("file_count", "ファイル数:", "int", default=1, min=0, required=False,
+                      show_condition=("end_condition_type", "フォルダ内ファイル数で終了")),
+            FieldSpec("clipboard_text", "クリップボードテキスト:", "str", default="", required=False,
+                      show_condition=("end_condition_type", "クリップボード内容で終了")),
+            FieldSpec("clipboard_match_type", "マッチタイプ:", "combobox", default="部分一致", values=("部分一致", "完全一致"), required=False,
+                      show_condition=("end_condition_type", "クリップボード内容で終了")),
+            _COMMENT_FIELD,
+        ),
+    }
+    
+    @property
+    def running(self) -> bool:
+        """実行中かどうか（停止要求イベントが未セット）"""
+        return not self._stop_event.is_set()
+    
+    @running.setter
+    def running(self, value: bool):
+        if value:
+            self._stop_event.clear()
+        else:
+            self._stop_event.set()
+    
     def __init__(self, root: tk.Tk):
         # 必要なディレクトリを作成
         AppConfig.ensure_directories()
@@ -1865,6 +2615,16 @@ class AutoActionTool:
         # ダークテーマを適用
         AppConfig.apply_dark_theme(self.root)
         
+        # UIウィジェット参照（構築前・未使用のUIはNoneのまま）
+        self.monitor_var = None
+        self.main_status_label = None
+        self.status_label = None
+        self.main_run_btn = None
+        self.start_button = None
+        self.stop_button = None
+        self.main_progress_bar = None
+        self.config_combo = None
+        
         # Animation system initialization
         self.animation_queue = []
         self.animation_running = False
@@ -1889,8 +2649,12 @@ class AutoActionTool:
         
         # メンバ変数の初期化
         self.steps: List[Step] = []
+        # 停止要求イベント（セット中 = 停止中）。runningプロパティ経由で操作する
+        self._stop_event = threading.Event()
         self.running = False
         self.config_file = AppConfig.DEFAULT_CONFIG_FILE
+        # 最後にlast_configへ記録した (ファイル, モニター, ループ回数)
+        self._last_config_key: Optional[tuple] = None
         self.selected_monitor = 0
         self.loop_count = 1
         self.auto_save_enabled = True
@@ -1924,13 +2688,58 @@ class AutoActionTool:
         self.capture_window = None
         self.is_capturing = False
         
+        # 実行中ハイライトを付けている行
+        self._current_highlight_item: Optional[str] = None
+        
+        # スクリーンショットのPNGエンコードと書き込みを行うワーカー
+        self._screenshot_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="screenshot")
+        # スレッドごとの永続mssインスタンス（終了時にまとめて閉じる）
+        self._sct_tls = threading.local()
+        self._sct_lock = threading.Lock()
+        self._sct_instances = []
+        # dxcamのモニター別カメラ（初期化失敗・解像度不一致のモニターはNone）と直近フレーム
+        self._dxcam_cameras: Dict[int, Any] = {}
+        self._dxcam_last_frames: Dict[int, np.ndarray] = {}
+        # デコード済みテンプレート {(パス, 更新時刻ns, サイズ): (等倍, 縮小版)}
+        self._template_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # 実行計画キャッシュ（(offset, 構造シグネチャ), (インデックス, レベル, 有効ステップ数)）
+        self._plan_cache = None
+        # 総ステップ数計算用の全体計画キャッシュ（構造シグネチャ, plan）
+        self._full_plan_cache = None
+        # 実行エラー詳細ダイアログ（初回表示時に構築して再利用）
+        self._error_dialog_cache: Optional[Dict[str, Any]] = None
+        # ステップタイプ → 実行メソッド（画像系のみモニター番号を受け取る）
+        self._step_dispatch = {
+            "image_click": self._execute_image_click,
+            "image_relative_right_click": self._execute_image_right_click,
+            "coord_click": self._execute_coord_click,
+            "coord_drag": self._execute_coord_drag,
+            "sleep": self._execute_sleep,
+            "custom_text": self._execute_custom_text,
+            "cmd_command": self._execute_cmd_command,
+        }
+        self._monitor_step_types = frozenset({"image_click", "image_relative_right_click"})
+        # 待機ステップのwait_type → 待機メソッド
+        self._sleep_handlers = {
+            "scheduled": self._sleep_scheduled,
+            "sleep": self._sleep_seconds,
+        }
+        # 実行スレッド → メインスレッドのUI更新キュー（(スロット, 関数, 引数)）
+        self._ui_queue = queue.SimpleQueue()
+        self._last_ui_update_ts = 0.0
+        self.root.after(AppConfig.UI_DRAIN_INTERVAL_MS, self._drain_ui_queue)
+        # 完了通知・エラー音の初回遅延を避けるため、起動後のアイドル時に事前読み込み
+        self.root.after_idle(self._prewarm_notifications)
+        # スクリーンショット保存ディレクトリ（起動時に一度だけ作成）
+        self._screenshot_dir = os.path.join(os.getcwd(), "screenshots")
+        os.makedirs(self._screenshot_dir, exist_ok=True)
+        
         # GUIの初期化（よりコンパクトサイズ）
         self.root.geometry("1080x720")  # 横幅をさらに10%縮小（1200→1080）
         self.root.minsize(900, 650)    # 最小サイズも比例調整
         
         # ウィンドウを中央に配置
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
+        screen_width, screen_height = get_screen_size(self.root)
         x = (screen_width - 1080) // 2
         y = (screen_height - 730) // 2
         self.root.geometry(f"1080x730+{x}+{y}")
@@ -1978,9 +2787,13 @@ class AutoActionTool:
                 if messagebox.askyesno("終了確認", "実行中です。アプリケーションを終了しますか？"):
                     self.stop_execution()
                     self.save_last_config()
+                    self._close_sct_instances()
+                    self._screenshot_pool.shutdown(wait=False, cancel_futures=True)
                     self.root.destroy()
             else:
                 self.save_last_config()
+                self._close_sct_instances()
+                self._screenshot_pool.shutdown(wait=False, cancel_futures=True)
                 self.root.destroy()
         except Exception as e:
             logger.error(f"アプリケーション終了処理でエラー: {e}")
@@ -2043,9 +2856,9 @@ class AutoActionTool:
         self.setup_hotkeys()
         
         
-        # Undo/Redo システム (最大50段階)
-        self.undo_stack = deque(maxlen=50)
-        self.redo_stack = deque(maxlen=50)
+        # Undo/Redo システム (最大 AppConfig.UNDO_HISTORY_SIZE 段階)
+        self.undo_stack = deque(maxlen=AppConfig.UNDO_HISTORY_SIZE)
+        self.redo_stack = deque(maxlen=AppConfig.UNDO_HISTORY_SIZE)
         self.current_state_id = None
     
     def apply_layout_spacing(self, scale: float = None):
@@ -2551,7 +3364,7 @@ class AutoActionTool:
         """アクション実行時のフィードバックアニメーション"""
         try:
             # ステータスバーに短時間のアクセントカラー表示
-            if hasattr(self, 'status_label'):
+            if self.status_label is not None:
                 original_bg = self.status_label.cget('background')
                 original_fg = self.status_label.cget('foreground')
                 
@@ -2699,8 +3512,8 @@ class AutoActionTool:
             return color1
 
 
-    def update_execution_stats(self, step_name="", success=None, error=None):
-        """実行統計を更新"""
+    def update_execution_stats(self, step_name="", success=None, error=None, update_ui=True):
+        """実行統計を更新（update_ui=Falseの場合は集計のみで表示更新は送らない）"""
         try:
             from datetime import datetime
             
@@ -2717,9 +3530,9 @@ class AutoActionTool:
                 self.execution_stats['completed_steps'] += 1
                 
             # 進捗情報を更新（経過時間と進捗率）
-            if self.execution_stats['start_time']:
+            if update_ui and self.execution_stats['start_time']:
                 progress = self.execution_stats['completed_steps'] / max(self.execution_stats['total_steps'], 1)
-                self.update_realtime_info(step_name, progress)
+                self._post_ui("realtime", self.update_realtime_info, step_name, progress)
                 
         except Exception as e:
             logger.debug(f"統計更新エラー: {e}")
@@ -2727,8 +3540,6 @@ class AutoActionTool:
     def start_execution_tracking(self, total_steps=None):
         """実行追跡を開始"""
         try:
-            from datetime import datetime
-            
             # 繰り返しを考慮した総実行ステップ数を計算
             if total_steps is None:
                 total_steps = self.calculate_total_execution_steps()
@@ -2736,7 +3547,7 @@ class AutoActionTool:
             self.execution_stats.update({
                 'total_steps': total_steps,
                 'completed_steps': 0,
-                'start_time': datetime.now(),
+                'start_time': time.monotonic(),  # 経過時間の計算専用（時計補正の影響を受けない）
                 'success_count': 0,
                 'error_count': 0,
                 'current_step_name': ''
@@ -2823,9 +3634,7 @@ class AutoActionTool:
                 
             # 経過時間をリアルタイムで更新
             if hasattr(self, 'execution_stats') and self.execution_stats.get('start_time'):
-                from datetime import datetime
-                elapsed = datetime.now() - self.execution_stats['start_time']
-                elapsed_str = f"{elapsed.seconds//60:02d}:{elapsed.seconds%60:02d}"
+                elapsed_str = self._format_elapsed()
                 
                 if hasattr(self, 'realtime_labels') and 'elapsed_time' in self.realtime_labels:
                     self.realtime_labels['elapsed_time'].configure(text=elapsed_str)
@@ -2837,6 +3646,11 @@ class AutoActionTool:
         except Exception as e:
             logger.debug(f"リアルタイム表示更新エラー: {e}")
 
+    def _format_elapsed(self) -> str:
+        """実行開始からの経過時間を MM:SS 形式で返す（1日未満の部分のみ）"""
+        elapsed = int(time.monotonic() - self.execution_stats['start_time']) % 86400
+        return f"{elapsed // 60:02d}:{elapsed % 60:02d}"
+
     def stop_realtime_timer(self):
         """リアルタイム更新タイマーを停止"""
         try:
@@ -2858,10 +3672,7 @@ class AutoActionTool:
                 
             # 経過時間を更新
             if self.execution_stats['start_time'] and 'elapsed_time' in self.realtime_labels:
-                from datetime import datetime
-                elapsed = datetime.now() - self.execution_stats['start_time']
-                elapsed_str = f"{elapsed.seconds//60:02d}:{elapsed.seconds%60:02d}"
-                self.realtime_labels['elapsed_time'].configure(text=elapsed_str)
+                self.realtime_labels['elapsed_time'].configure(text=self._format_elapsed())
                 
             # 進捗率をステータスバーのテキストラベルに更新
             if hasattr(self, 'progress_text_label'):
@@ -2872,7 +3683,7 @@ class AutoActionTool:
                 self.progress_text_label.configure(text=progress_percent)
                 
                 # ステータスバーの背景色を進捗率に合わせて更新
-                if hasattr(self, 'progress_bg_frame') and hasattr(self, 'main_status_label'):
+                if hasattr(self, 'progress_bg_frame') and self.main_status_label is not None:
                     # 進捗率に応じて背景の幅を変更（右側のコントロールを避けるため90%まで）
                     limited_progress = min(progress * 0.9, 0.9)
                     self.progress_bg_frame.place_configure(relwidth=limited_progress)
@@ -2888,7 +3699,7 @@ class AutoActionTool:
                         self.main_status_label.configure(text="🟢 システム準備完了")
                     
             # プログレスバーを更新
-            if hasattr(self, 'main_progress_bar') and self.main_progress_bar:
+            if self.main_progress_bar is not None:
                 progress_text = f"実行中: {step_name}" if step_name else f"進捗: {progress_percent}"
                 self.update_progress_bar(self.main_progress_bar, progress, progress_text, animate=True)
                 
@@ -3365,15 +4176,102 @@ F11   フルスクリーン                          F12     開発者ツール
                                 width=10)
         close_button.pack(side="right")
         
+    def _post_ui(self, slot: str, func, *args):
+        """UI更新をキューに積む（同じスロットは最新の1件だけ反映される）"""
+        self._ui_queue.put((slot, func, args))
+
+    def _ui_update_due(self) -> bool:
+        """前回のUI更新からAppConfig.UI_MIN_UPDATE_INTERVAL秒以上経過していればTrue（実行ループ用）"""
+        now = time.perf_counter()
+        if now - self._last_ui_update_ts >= AppConfig.UI_MIN_UPDATE_INTERVAL:
+            self._last_ui_update_ts = now
+            return True
+        return False
+
+    def _prewarm_notifications(self):
+        """メッセージボックスとサウンド出力の初回読み込みを起動時に済ませる（表示・再生はしない）"""
+        try:
+            # X11等ではtk_messageBoxがTclスクリプトで実装されており初回呼び出し時に読み込まれる
+            self.root.tk.call("auto_load", "tk_messageBox")
+        except tk.TclError as e:
+            logger.debug(f"メッセージボックス事前読み込みエラー（無視可能）: {e}")
+        if WINSOUND_AVAILABLE:
+            # 再生中の音を止める呼び出しで音声デバイスを初期化（UIスレッドはブロックしない）
+            threading.Thread(target=winsound.PlaySound, args=(None, 0), daemon=True).start()
+
+    def _drain_ui_queue(self):
+        """キューに溜まったUI更新をスロットごとに間引いてメインスレッドで反映"""
+        pending = {}
+        try:
+            while True:
+                slot, func, args = self._ui_queue.get_nowait()
+                pending.pop(slot, None)  # 到着順を保つため入れ直す
+                pending[slot] = (func, args)
+        except queue.Empty:
+            pass
+        for func, args in pending.values():
+            try:
+                func(*args)
+            except Exception as e:
+                logger.debug(f"UI更新エラー（無視可能）: {e}")
+        self.root.after(AppConfig.UI_DRAIN_INTERVAL_MS, self._drain_ui_queue)
+
+    def _show_step_error(self, analysis: Dict[str, str], step: Step, step_index: int):
+        """ステップ失敗時の表示（エラーダイアログ・エラー行の選択・失敗アニメーション、メインスレッド）"""
+        self.show_error_dialog(analysis, step, step_index+1)
+        self.update_execution_buttons(False)
+        
+        # Select the erroneous step in the Treeview
+        try:
+            children = self.tree.get_children()
+            if step_index < len(children):  # step_index is 0-based, children is 0-based
+                self.tree.selection_set(children[step_index])
+                self.tree.see(children[step_index])  # Ensure the selected item is visible
+                self.update_image_preview(step_index)  # 画像プレビューも同期
+                logger.info(f"エラー行を選択: 行番号={step_index+1}")
+            else:
+                logger.warning(f"エラー行の選択に失敗: 行番号={step_index+1}, ツリーアイテム数={len(children)}")
+        except Exception as select_error:
+            logger.error(f"エラー行の選択エラー: 行番号={step_index+1}, error={str(select_error)}")
+        
+        self.animate_step_completion(step_index, success=False)
+
+    def _post_step_error(self, error: Exception, step: Step, step_index: int):
+        """実行スレッドからステップ失敗を通知（表示はすべてUIキュー経由）"""
+        self._post_ui("status", self.update_status, f"❌ エラー発生: 行番号 {step_index+1}")
+        logger.error(f"ステップ実行エラー: 行番号={step_index+1}, step={step}, error={str(error)}")
+        
+        # スマートエラー分析とダイアログ表示
+        analysis = self.analyze_error(error, step, step_index+1)
+        self.running = False
+        # エラー統計を更新
+        self.update_execution_stats(error=True)
+        self._post_ui("step_error", self._show_step_error, analysis, step, step_index)
+
+    def _post_run_failure(self, message: str):
+        """実行スレッドから実行全体の失敗を通知（表示はすべてUIキュー経由）"""
+        self.running = False
+        self._post_ui("status", self.update_status, "❌ エラー発生")
+        self._post_ui("buttons", self.update_execution_buttons, False)
+        self._post_ui("error", self.show_error_with_sound, "エラー", message)
+
+    def _post_progress_complete(self, total_steps: int, label: str):
+        """実行スレッドから進捗表示を100%完了にする（UIキュー経由）"""
+        self._post_ui("highlight", self.clear_current_step_highlight)
+        self._post_ui("progress", self.progress_var.set, f"{total_steps}/{total_steps}")
+        self._post_ui("realtime", self.update_realtime_info, label, 1.0)
+        if self.main_progress_bar is not None:
+            self._post_ui("progress_bar", self.update_progress_bar, self.main_progress_bar, 1.0, f"{label} ✅", True)
+
     def update_status(self, text):
         """新UIと旧UIの両方に対応したステータス更新"""
-        if hasattr(self, 'main_status_label'):
+        if self.main_status_label is not None:
             self.main_status_label.config(text=text)
-        elif hasattr(self, 'status_label'):
+        elif self.status_label is not None:
             self.status_label.config(text=text)
             
     def on_monitor_selected(self, event=None):
-        if hasattr(self, 'monitor_var'):
+        if self.monitor_var is not None:
             monitor_idx = int(self.monitor_var.get().split()[1])
             self.select_monitor(monitor_idx)
 
@@ -3573,29 +4471,11 @@ F11   フルスクリーン                          F12     開発者ツール
         left_frame = ttk.Frame(parent)
         left_frame.pack(side=tk.LEFT, padx=5, fill=tk.Y)
         ttk.Label(left_frame, text="ステップ追加", font=("Arial", 12, "bold")).pack(pady=5)
-        button_configs = [
-            # 1列目
-            (0, 0, "画像クリック", self.add_step_image_click, "画像をクリック/ダブルクリックするステップを追加"),
-            (1, 0, "座標クリック", self.add_step_coord_click, "指定座標でクリックするステップを追加"),
-            (2, 0, "画像オフセットクリック", self.add_step_image_relative_right_click, "画像の位置からオフセットした位置をクリックするステップを追加"),
-            (3, 0, "スリープ", self.add_step_sleep, "待機時間を追加"),
-            # 2列目（コピーとペーストを←→と入れ替え）
-            (0, 1, "←", lambda: self.add_step_key_action("key", "left"), "左キーを追加"),
-            (1, 1, "→", lambda: self.add_step_key_action("key", "right"), "右キーを追加"),
-            (2, 1, "↑", lambda: self.add_step_key_action("key", "up"), "上キーを追加"),
-            (3, 1, "↓", lambda: self.add_step_key_action("key", "down"), "下キーを追加"),
-            # 3列目（←→をコピーとペーストと入れ替え）
-            (0, 2, "コピー", lambda: self.add_step_key_action("copy", "ctrl+c"), "コピー操作を追加"),
-            (1, 2, "ペースト", lambda: self.add_step_key_action("paste", "ctrl+v"), "ペースト操作を追加"),
-            (2, 2, "Tab", lambda: self.add_step_key_action("key", "tab"), "Tabキーを追加"),
-            (3, 2, "Enter", lambda: self.add_step_key_action("key", "enter"), "Enterキーを追加"),
-            # 4列目
-            (0, 3, "カスタムキー", self.add_step_key_custom, "任意のキー操作を追加"),
-            (1, 3, "カスタム文字列", self.add_step_custom_text, "任意の文字列を入力するステップを追加"),
-        ]
         button_grid = ttk.Frame(left_frame)
         button_grid.pack(fill=tk.X)
-        for row, col, text, command, tooltip in button_configs:
+        for row, col, text, method_name, args, tooltip in self._BUTTON_SPECS:
+            method = getattr(self, method_name)
+            command = partial(method, *args) if args else method
             btn = ttk.Button(button_grid, text=text, command=command)
             btn.grid(row=row, column=col, padx=5, pady=5, sticky="ew")
             self.add_tooltip(btn, tooltip)
@@ -3650,30 +4530,81 @@ F11   フルスクリーン                          F12     開発者ツール
             # 状態を保存（Undo用）
             self.save_state(f"ステップ削除: {len(selected)}個")
             
-            for item in selected:
-                index = self.tree.index(item)
-                self.tree.delete(item)
-                self.steps.pop(index)
+            self._delete_tree_items(selected)
             
             # ステップが削除されたら設定コンボボックスをクリア（編集中状態を示す）
-            if hasattr(self, 'config_combo'):
+            if self.config_combo is not None:
                 self.config_combo.set("")
             
             logger.info("選択したステップを削除")
 
+    def _delete_tree_items(self, items) -> List[int]:
+        """選択行をツリーとステップリストから一括削除し、削除したインデックス（降順）を返す"""
+        indices = sorted({self.tree.index(item) for item in items}, reverse=True)
+        self.tree.delete(*items)
+        for item in items:
+            self.drag_drop_tree.full_values.pop(item, None)
+        for index in indices:
+            del self.steps[index]
+        
+        # 削除位置以降の行番号を振り直し
+        if indices:
+            first = indices[-1]
+            for line_no, item in enumerate(self.tree.get_children()[first:], start=first + 1):
+                self.tree.set(item, "Line", line_no)
+        return indices
+
     def clear_all_steps(self):
-        if messagebox.askyesno("確認", "すべてのステップを削除しますか？"):
-            # 状態を保存（Undo用）
-            self.save_state("全ステップクリア")
-            
-            self.steps.clear()
-            self.refresh_tree()
-            
-            # 設定コンボボックスをクリア（新規状態を示す）
-            if hasattr(self, 'config_combo'):
-                self.config_combo.set("")
-            
-            logger.info("すべてのステップをクリア")
+        """全クリアの確認ダイアログを非モーダルで表示（Escapeの緊急停止を妨げない）"""
+        window = getattr(self, '_clear_confirm_window', None)
+        if window is None or not window.winfo_exists():
+            window = tk.Toplevel(self.root)
+            window.title("確認")
+            window.configure(bg="#2b2b2b")
+            window.resizable(False, False)
+            window.transient(self.root)
+            window.protocol("WM_DELETE_WINDOW", window.withdraw)
+            
+            def on_escape(event):
+                # このウィンドウにフォーカスがあるとルートのEscape（緊急停止）が届かないため、ここでも停止する
+                window.withdraw()
+                self.emergency_stop()
+            
+            window.bind('<Escape>', on_escape)
+            
+            tk.Label(window, text="すべてのステップを削除しますか？",
+                     font=("Meiryo UI", 11), fg="white", bg="#2b2b2b").pack(padx=30, pady=(20, 15))
+            
+            button_frame = tk.Frame(window, bg="#2b2b2b")
+            button_frame.pack(fill="x", padx=20, pady=(0, 15))
+            
+            def on_yes():
+                window.withdraw()
+                self.root.after(0, self._do_clear_all_steps)
+            
+            ttk.Button(button_frame, text="はい", command=on_yes,
+                       style='Primary.TButton', width=10).pack(side="right", padx=(10, 0))
+            ttk.Button(button_frame, text="いいえ", command=window.withdraw,
+                       style='Modern.TButton', width=10).pack(side="right")
+            self._clear_confirm_window = window
+        
+        AppConfig.position_window_on_main_monitor(window, self.root, 360, 140)
+        window.deiconify()
+        window.lift()
+    
+    def _do_clear_all_steps(self):
+        """すべてのステップをクリア（確認後に実行）"""
+        # 状態を保存（Undo用）
+        self.save_state("全ステップクリア")
+        
+        self.steps.clear()
+        self.refresh_tree()
+        
+        # 設定コンボボックスをクリア（新規状態を示す）
+        if self.config_combo is not None:
+            self.config_combo.set("")
+        
+        logger.info("すべてのステップをクリア")
 
 
     def add_tooltip(self, widget: tk.Widget, text: str):
@@ -3705,8 +4636,7 @@ F11   フルスクリーン                          F12     開発者ツール
             tooltip_width = tooltip_window.winfo_reqwidth()
             tooltip_height = tooltip_window.winfo_reqheight()
             
-            screen_width = tooltip_window.winfo_screenwidth()
-            screen_height = tooltip_window.winfo_screenheight()
+            screen_width, screen_height = get_screen_size(tooltip_window)
             
             # 画面からはみ出ないよう調整
             if x + tooltip_width > screen_width:
@@ -3725,7 +4655,9 @@ F11   フルスクリーン                          F12     開発者ツール
         widget.bind("<Enter>", enter)
         widget.bind("<Leave>", leave)
 
-    def select_monitor(self, value: str):
+    def select_monitor(self, value: str, persist: bool = True):
+        """モニターを選択して表示を更新（persist=Falseの場合はlast_configへ保存しない）"""
+        # 実行系はモニター番号をintとして扱うため、ここで一度だけ正規化する
         self.selected_monitor = int(value)
         monitor = self.monitors[self.selected_monitor]
         scale_warning = " (スケーリングが異なる可能性)" if self.dpi_scale != 100.0 else ""
@@ -3737,16 +4669,16 @@ F11   フルスクリーン                          F12     開発者ツール
         elif hasattr(self, 'monitor_info_label'):
             self.monitor_info_label.config(text=monitor_text)
         logger.info(f"モニター選択: {self.selected_monitor}")
-        self.save_last_config()
+        if persist:
+            self.save_last_config()
 
     def save_last_config(self):
         try:
             config = {"last_monitor": self.selected_monitor, "loop_count": self.loop_count}
             if os.path.exists(self.config_file):
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    config.update(json.load(f))
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+                config.update(read_json_file(self.config_file))
+            write_json_compact(self.config_file, config)
+            self._last_config_key = None
             logger.info(f"最終設定保存: モニター={self.selected_monitor}, ループ回数={self.loop_count}")
         except Exception as e:
             logger.error(f"最終設定保存エラー: {e}")
@@ -3771,19 +4703,20 @@ F11   フルスクリーン                          F12     開発者ツール
             insert_index = len(self.steps)
         
         self.steps.insert(insert_index, step)
-        self.refresh_tree()
+        
+        # ツリー全体を再構築せず、挿入した行と後続行の行番号のみ更新
+        new_item = self._insert_tree_row(insert_index, step, insert_index + 1)
+        if insert_index < len(self.steps) - 1:
+            for line_no, item in enumerate(self.tree.get_children()[insert_index + 1:], start=insert_index + 2):
+                self.tree.set(item, "Line", line_no)
         
         # 新しいステップが追加されたら設定コンボボックスをクリア（編集中状態を示す）
-        if hasattr(self, 'config_combo'):
+        if self.config_combo is not None:
             self.config_combo.set("")
         
         # 新しく挿入されたステップを選択
-        if self.steps:
-            tree_children = self.tree.get_children()
-            if insert_index < len(tree_children):
-                new_item = tree_children[insert_index]
-                self.tree.selection_set(new_item)
-                self.tree.see(new_item)
+        self.tree.selection_set(new_item)
+        self.tree.see(new_item)
         
         # 自動保存機能
         if self.auto_save_enabled:
@@ -3816,11 +4749,11 @@ F11   フルスクリーン                          F12     開発者ツール
         if selection:
             index = self.tree.index(selection[0])
             if index < len(self.steps):
-                self.clipboard_step = self.steps[index].to_dict()
+                self.clipboard_step = self.steps[index].clone()
                 status_text = f"📋 ステップをコピー: {self.steps[index].comment}"
-                if hasattr(self, 'main_status_label'):
+                if self.main_status_label is not None:
                     self.main_status_label.configure(text=status_text)
-                elif hasattr(self, 'status_label'):
+                elif self.status_label is not None:
                     self.status_label.configure(text=status_text)
                 logger.info(f"ステップコピー: {self.steps[index].comment}")
     
@@ -3828,13 +4761,13 @@ F11   フルスクリーン                          F12     開発者ツール
         """コピーしたステップを貼り付け"""
         if self.clipboard_step:
             try:
-                new_step = Step.from_dict(self.clipboard_step.copy())
+                new_step = self.clipboard_step.clone()
                 new_step.comment += " (コピー)"
                 self.add_step(new_step)
                 status_text = f"📄 ステップを貼り付け: {new_step.comment}"
-                if hasattr(self, 'main_status_label'):
+                if self.main_status_label is not None:
                     self.main_status_label.configure(text=status_text)
-                elif hasattr(self, 'status_label'):
+                elif self.status_label is not None:
                     self.status_label.configure(text=status_text)
                 logger.info(f"ステップ貼り付け: {new_step.comment}")
             except Exception as e:
@@ -3850,25 +4783,36 @@ F11   フルスクリーン                          F12     開発者ツール
             status = "無効化" if self.steps[index].enabled else "有効化"
             self.save_state(f"ステップ{status}: {index}")
             
-            self.steps[index].enabled = not self.steps[index].enabled
+            step = self._detach_step(index)
+            step.enabled = not step.enabled
             self.refresh_tree()
             
             status = "有効" if self.steps[index].enabled else "無効"
             # ステータス更新（新UIと旧UIの両方をサポート）
             status_text = f"ステップを{status}に変更: {self.steps[index].comment}"
             
-            if hasattr(self, 'main_status_label'):
+            if self.main_status_label is not None:
                 self.main_status_label.configure(text=status_text)
-            elif hasattr(self, 'status_label'):
+            elif self.status_label is not None:
                 self.status_label.configure(text=status_text)
             logger.info(f"ステップ{status}化: {self.steps[index].comment}")
 
     def get_type_display(self, step: Step) -> str:
-        """統一アイコンを使用したアクション表示"""
-        return AppConfig.get_step_display_name(step.type)
+        """統一アイコンを使用したアクション表示（Stepにキャッシュ）"""
+        cache = step._display_cache
+        if 'type' not in cache:
+            cache['type'] = AppConfig.get_step_display_name(step.type)
+        return cache['type']
 
     def get_params_display(self, step: Step) -> str:
-        """簡潔なパラメータ表示"""
+        """簡潔なパラメータ表示（Stepにキャッシュ）"""
+        cache = step._display_cache
+        if 'params' not in cache:
+            cache['params'] = self._format_params_display(step)
+        return cache['params']
+
+    def _format_params_display(self, step: Step) -> str:
+        """パラメータ表示文字列を生成"""
         if step.type == "image_click":
             filename = os.path.basename(step.params['path'])
             click_type_map = {"double": "ダブル", "right": "右", "single": "シングル"}
@@ -3917,51 +4861,14 @@ F11   フルスクリーン                          F12     開発者ツール
     
     def get_clean_comment(self, step: Step) -> str:
         """デフォルトコメントを除去してユーザーコメントのみ表示"""
-        # デフォルトコメントパターン
-        default_patterns = [
-            "画像クリック:",
-            "座標右クリック",
-            "画像オフセットクリック:",
-            "待機時間",
-            "キー操作",
-            "カスタム文字列入力",
-            "キー入力間隔",
-            "右クリック間隔",
-            "画像クリック後待機"
-        ]
-        
         comment = step.comment.strip()
         
-        # デフォルトパターンをチェック
-        for pattern in default_patterns:
-            if pattern in comment:
-                # パターンで分割して、パターン以降の部分をチェック
-                parts = comment.split(pattern, 1)
-                if len(parts) > 1:
-                    remaining = parts[1].strip()
-                    # ファイル名部分を除去してユーザーコメントを抽出
-                    if pattern == "画像クリック:":
-                        # "画像クリック: filename.png" のfilename.png部分を除去
-                        # 改行、" - "、またはファイル名後の最初の空白以降をユーザーコメントとみなす
-                        if "\n" in remaining:
-                            user_comment = remaining.split("\n", 1)[1].strip()
-                            if user_comment:
-                                return user_comment
-                        elif " - " in remaining:
-                            user_comment = remaining.split(" - ", 1)[1].strip()  
-                            if user_comment:
-                                return user_comment
-                        # その他の場合は、ファイル名のみとみなして空を返す
-                        return ""
-                    else:
-                        # 他のパターンの場合、パターン後に何かあればそれを返す
-                        if remaining:
-                            return remaining
-                # パターンのみの場合は空文字列
-                return ""
-        
-        # デフォルトパターンが含まれない場合はそのまま返す
-        return comment
+        # デフォルトパターンを1回の正規表現検索で判定し、ハンドラへ振り分け
+        m = _DEFAULT_PATTERN_RE.search(comment)
+        if m is None:
+            # デフォルトパターンが含まれない場合はそのまま返す
+            return comment
+        return _PATTERN_HANDLERS[m.group(1)](comment[m.end():])
 
     def add_step_image_click(self):
         """画像クリック/ダブルクリックのステップを追加（クリップボード画像対応）"""
@@ -3977,6 +4884,7 @@ F11   フルスクリーン                          F12     開発者ツール
             {"key": "click_type", "label": "クリックタイプ:", "type": "combobox", "default": "single", "values": AppConfig.CLICK_TYPES, "required": True},
             {"key": "retry", "label": "リトライ回数:", "type": "int", "default": "3", "min": 0},
             {"key": "delay", "label": "リトライ間隔(秒):", "type": "float", "default": "1.0", "min": 0.1},
+            self._MATCH_MODE_FIELD.with_default(self._MATCH_MODE_FIELD.default),
             {"key": "comment", "label": "メモ:", "type": "text", "default": f"画像クリック: {os.path.basename(image_path)}"},
         ]
         dialog = ModernDialog(self.root, "画像クリック設定", fields, width=700, height=800)
@@ -3989,6 +4897,7 @@ F11   フルスクリーン                          F12     開発者ツール
                     "click_type": result["click_type"],
                     "retry": result["retry"],
                     "delay": result["delay"],
+                    "match_mode": self._MATCH_MODE_FIELD.from_display(result["match_mode"]),
                 }
                 self.add_step(Step("image_click", params=params, comment=result["comment"]))
                 self.add_step(Step("sleep", params={"seconds": 0.5}, comment="画像クリック後待機"))
@@ -4075,6 +4984,11 @@ F11   フルスクリーン                          F12     開発者ツール
             if result:
                 params = {}
                 if result["wait_type"] == "時刻指定":
+                    try:
+                        datetime.strptime(result["scheduled_time"], "%H:%M:%S")
+                    except ValueError:
+                        self.show_error_with_sound("入力エラー", "時刻の形式が正しくありません。HH:MM:SS形式で入力してください。（例：14:30:00）")
+                        return
                     params["scheduled_time"] = result["scheduled_time"]
                     params["wait_type"] = "scheduled"
                 else:
@@ -4347,6 +5261,7 @@ F11   フルスクリーン                          F12     開発者ツール
             {"key": "offset_y", "label": "Yオフセット:", "type": "int", "default": "0"},
             {"key": "retry", "label": "リトライ回数:", "type": "int", "default": "3", "min": 1},
             {"key": "delay", "label": "リトライ間隔(秒):", "type": "int", "default": "1", "min": 1},
+            self._MATCH_MODE_FIELD.with_default(self._MATCH_MODE_FIELD.default),
             {"key": "comment", "label": "メモ:", "type": "text", "default": f"画像オフセットクリック: {os.path.basename(image_path)}"},
         ]
         dialog = ModernDialog(self.root, "画像オフセットクリックの設定", fields, width=700, height=800)
@@ -4361,6 +5276,7 @@ F11   フルスクリーン                          F12     開発者ツール
                     "offset_y": result["offset_y"],
                     "retry": result["retry"],
                     "delay": result["delay"],
+                    "match_mode": self._MATCH_MODE_FIELD.from_display(result["match_mode"]),
                 }
                 self.add_step(Step("image_relative_right_click", params=params, comment=result["comment"]))
                 self.add_step(Step("sleep", params={"seconds": 1}, comment="オフセットクリック後の待機"))
@@ -4378,11 +5294,8 @@ F11   フルスクリーン                          F12     開発者ツール
             if not selected_items:
                 messagebox.showwarning("警告", "削除するステップを選択してください")
                 return
-            for item in selected_items:
-                index = self.tree.index(item) + 1  # 1-based index
-                self.tree.delete(item)
-                self.steps.pop(index - 1)
-                logger.info(f"選択されたステップを削除しました: 行番号={index}")
+            indices = self._delete_tree_items(selected_items)
+            logger.info(f"選択されたステップを削除しました: 行番号={[index + 1 for index in reversed(indices)]}")  # 1-based index
         except Exception as e:
             logger.error(f"ステップ削除エラー: {e}")
             self.show_error_with_sound("エラー", f"ステップの削除に失敗しました: {e}")
@@ -4407,109 +5320,23 @@ F11   フルスクリーン                          F12     開発者ツール
                 return
             index = self.tree.index(selected_items[0]) + 1  # 1-based index
             step = self.steps[index - 1]
-            fields = []
-
-            if step.type == "image_click":
-                fields = [
-                    {
-                        "key": "threshold",
-                        "label": "信頼度（0.5-1.0):",
-                        "type": "float",
-                        "default": str(step.params["threshold"]),
-                        "min": 0.5,
-                        "max": 1.0
-                    },
-                    {
-                        "key": "click_type",
-                        "label": "Click Type:",
-                        "type": "combobox",
-                        "default": step.params.get("click_type", "single"),
-                        "values": AppConfig.CLICK_TYPES,
-                        "required": True
-                    },
-                    {
-                        "key": "retry",
-                        "label": "リトライ回数（0-10）:",
-                        "type": "int",
-                        "default": str(step.params["retry"]),
-                        "min": 0,
-                    },
-                    {
-                        "key": "delay",
-                        "label": "リトライ間隔(秒):",
-                        "type": "float",
-                        "default": str(step.params["delay"]),
-                        "min": 0.1,
-                    },
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-            elif step.type == "coord_click":
-                fields = [
-                    {"key": "x", "label": "X座標:", "type": "int", "default": str(step.params["x"])},
-                    {"key": "y", "label": "Y座標:", "type": "int", "default": str(step.params["y"])},
-                    {"key": "click_type", "label": "クリックタイプ:", "type": "combobox", "default": step.params.get("click_type", "single"), "values": AppConfig.CLICK_TYPES, "required": True},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-            elif step.type == "coord_drag":
-                fields = [
-                    {"key": "start_x", "label": "開始X座標:", "type": "int", "default": str(step.params["start_x"])},
-                    {"key": "start_y", "label": "開始Y座標:", "type": "int", "default": str(step.params["start_y"])},
-                    {"key": "end_x", "label": "終了X座標:", "type": "int", "default": str(step.params["end_x"])},
-                    {"key": "end_y", "label": "終了Y座標:", "type": "int", "default": str(step.params["end_y"])},
-                    {"key": "duration", "label": "ドラッグ時間(秒):", "type": "float", "default": str(step.params["duration"]), "min": 0.1},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-            elif step.type == "image_relative_right_click":
-                fields = [
-                    {"key": "threshold", "label": "信頼度(0.5-1.0):", "type": "float", "default": str(step.params["threshold"]), "min": 0.5, "max": 1.0},
-                    {"key": "click_type", "label": "クリックタイプ:", "type": "combobox", "default": step.params.get("click_type", "right"), "values": AppConfig.CLICK_TYPES, "required": True},
-                    {"key": "offset_x", "label": "Xオフセット(-9999-9999):", "type": "int", "default": str(step.params["offset_x"]), "min": -9999},
-                    {"key": "offset_y", "label": "Yオフセット(-9999-9999):", "type": "int", "default": str(step.params["offset_y"]), "min": -9999},
-                    {"key": "retry", "label": "リトライ回数(0-10):", "type": "int", "default": str(step.params["retry"]), "min": 0, "max": 10},
-                    {"key": "delay", "label": "リトライ間隔(秒, 0.1-10):", "type": "float", "default": str(step.params["delay"]), "min": 0.1, "max": 10.0},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-            elif step.type == "sleep":
-                current_wait_type = step.params.get("wait_type", "sleep")
-                wait_type_display = "時刻指定" if current_wait_type == "scheduled" else "スリープ(秒数指定)"
-                fields = [
-                    {"key": "wait_type", "label": "待機タイプ:", "type": "combobox", "values": ["スリープ(秒数指定)", "時刻指定"], "default": wait_type_display, "on_change": True},
-                    {"key": "seconds", "label": "待ち時間(秒, 0.1-100):", "type": "float", "default": str(step.params.get("seconds", 1.0)), "min": 0.1, "max": 100.0, "show_condition": {"field": "wait_type", "value": "スリープ(秒数指定)"}},
-                    {"key": "scheduled_time", "label": "実行時刻(HH:MM:SS):", "type": "str", "default": step.params.get("scheduled_time", ""), "help": "日次実行時刻を指定（例：14:30:00）", "show_condition": {"field": "wait_type", "value": "時刻指定"}},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-            elif step.type in ["copy", "paste", "key"]:
-                fields = [
-                    {"key": "key", "label": "キー:", "type": "combobox", "default": step.params["key"], "values": AppConfig.KEY_OPTIONS, "required": True},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-            elif step.type == "custom_text":
-                fields = [
-                    {"key": "text", "label": "入力文字列:", "type": "text", "default": step.params["text"], "required": True},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
+            # 静的なフィールド定義に現在値のみを注入
+            overrides = {"comment": step.comment}
+            if step.type == "sleep":
+                overrides["wait_type"] = "時刻指定" if step.params.get("wait_type", "sleep") == "scheduled" else "スリープ(秒数指定)"
             elif step.type == "cmd_command":
                 # 完了を待つの現在値を文字列に変換
-                wait_completion_value = "待つ" if step.params.get("wait_completion", True) else "待たない"
-                fields = [
-                    {"key": "command", "label": "コマンド:", "type": "text", "height": 12, "default": step.params["command"], "required": True, 
-                     "help": "複数行のコマンドを記述できます"},
-                    {"key": "timeout", "label": "タイムアウト(秒):", "type": "int", "default": str(step.params.get("timeout", 30)), "min": 1, "required": True},
-                    {"key": "wait_completion", "label": "完了を待つ:", "type": "combobox", "values": ["待つ", "待たない"], "default": wait_completion_value},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-            elif step.type == "repeat_start":
-                fields = [
-                    {"key": "repeat_type", "label": "繰り返しタイプ:", "type": "combobox", 
-                     "values": ["指定回数繰り返す", "終了条件を満たすまで繰り返す"], 
-                     "default": step.params.get("repeat_type", "指定回数繰り返す"), "required": True, "on_change": True},
-                    {"key": "count", "label": "繰り返し回数:", "type": "int", "default": str(step.params.get("count", 2)), "min": 1, "required": False,
-                     "show_condition": {"field": "repeat_type", "value": "指定回数繰り返す"}},
-                    {"key": "max_iterations", "label": "最大繰り返し回数:", "type": "int", "default": str(step.params.get("max_iterations", 100)), "min": 1, "required": False,
-                     "show_condition": {"field": "repeat_type", "value": "終了条件を満たすまで繰り返す"}},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-            elif step.type == "repeat_end":
+                overrides["wait_completion"] = "待つ" if step.params.get("wait_completion", True) else "待たない"
+            fields = [
+                spec.with_default(
+                    overrides[spec.key] if spec.key in overrides
+                    else step.params[spec.key] if spec.default is None
+                    else step.params.get(spec.key, spec.default)
+                )
+                for spec in self._EDIT_FIELD_SCHEMAS.get(step.type, ())
+            ]
+            
+            if step.type == "repeat_end":
                 # 現在の設定値を取得
                 current_end_condition = step.params.get("end_condition_type", "条件なし")
                 current_image = step.params.get("end_condition_image", "")
@@ -4518,34 +5345,6 @@ F11   フルスクリーン                          F12     開発者ツール
                 current_x2 = step.params.get("end_condition_x2", 0)
                 current_y2 = step.params.get("end_condition_y2", 0)
                 
-                fields = [
-                    {"key": "end_condition_type", "label": "終了条件タイプ:", "type": "combobox", 
-                     "values": ["条件なし", "画像一致で終了", "ファイル存在で終了", "ファイル削除で終了", "フォルダ内ファイル数で終了", "クリップボード内容で終了"], 
-                     "default": current_end_condition, "required": True, "on_change": True},
-                    {"key": "end_condition_threshold", "label": "画像一致信頼度:", "type": "float", 
-                     "default": str(step.params.get("end_condition_threshold", 0.8)), "min": 0.1, "max": 1.0, "required": False,
-                     "show_condition": {"field": "end_condition_type", "value": "画像一致で終了"}},
-                    {"key": "file_path", "label": "ファイルパス:", "type": "file", 
-                     "default": step.params.get("file_path", ""), "required": False,
-                     "show_condition": {"field": "end_condition_type", "value": "ファイル存在で終了"}},
-                    {"key": "file_path_delete", "label": "ファイルパス:", "type": "file", 
-                     "default": step.params.get("file_path_delete", ""), "required": False,
-                     "show_condition": {"field": "end_condition_type", "value": "ファイル削除で終了"}},
-                    {"key": "folder_path", "label": "フォルダパス:", "type": "folder", 
-                     "default": step.params.get("folder_path", ""), "required": False,
-                     "show_condition": {"field": "end_condition_type", "value": "フォルダ内ファイル数で終了"}},
-                    {"key": "file_count", "label": "ファイル数:", "type": "int", 
-                     "default": str(step.params.get("file_count", 1)), "min": 0, "required": False,
-                     "show_condition": {"field": "end_condition_type", "value": "フォルダ内ファイル数で終了"}},
-                    {"key": "clipboard_text", "label": "クリップボードテキスト:", "type": "str", 
-                     "default": step.params.get("clipboard_text", ""), "required": False,
-                     "show_condition": {"field": "end_condition_type", "value": "クリップボード内容で終了"}},
-                    {"key": "clipboard_match_type", "label": "マッチタイプ:", "type": "combobox", 
-                     "values": ["部分一致", "完全一致"], "default": step.params.get("clipboard_match_type", "部分一致"), "required": False,
-                     "show_condition": {"field": "end_condition_type", "value": "クリップボード内容で終了"}},
-                    {"key": "comment", "label": "メモ:", "type": "text", "default": step.comment},
-                ]
-                
                 # 現在の設定を表示用に追加
                 if current_end_condition == "画像一致で終了":
                     image_info = f"現在の画像: {os.path.basename(current_image) if current_image else '未設定'}"
@@ -4565,153 +5364,35 @@ F11   フルスクリーン                          F12     開発者ツール
                 result = dialog.get_result()
                 if result:
                     logger.info(f"Edit dialog result: {result}")
-                    if step.type == "image_click":
-                        step.params.update({
-                            "threshold": result["threshold"],
-                            "click_type": result["click_type"],
-                            "retry": result["retry"],
-                            "delay": result["delay"],
-                        })
-                    elif step.type == "coord_click":
-                        step.params.update({
-                            "x": result["x"],
-                            "y": result["y"],
-                            "click_type": result["click_type"],
-                        })
-                    elif step.type == "coord_drag":
-                        step.params.update({
-                            "start_x": result["start_x"],
-                            "start_y": result["start_y"],
-                            "end_x": result["end_x"],
-                            "end_y": result["end_y"],
-                            "duration": result["duration"],
-                        })
-                    elif step.type == "image_relative_right_click":
+                    # Undo履歴・設定キャッシュと共有しないよう複製してから書き換える
+                    step = self._detach_step(index - 1)
+                    # タイプ別の反映処理（専用ハンドラが無いタイプはスキーマのキーをそのまま反映）
+                    handler_name = self._EDIT_APPLY_HANDLERS.get(step.type)
+                    if handler_name:
+                        getattr(self, handler_name)(step, result)
+                    else:
                         step.params.update({
-                            "threshold": result["threshold"],
-                            "click_type": result["click_type"],
-                            "offset_x": result["offset_x"],
-                            "offset_y": result["offset_y"],
-                            "retry": result["retry"],
-                            "delay": result["delay"],
+                            spec.key: spec.from_display(result[spec.key])
+                            for spec in self._EDIT_FIELD_SCHEMAS.get(step.type, ())
+                            if spec.key != "comment"
                         })
-                    elif step.type == "sleep":
-                        if result["wait_type"] == "時刻指定":
-                            step.params["scheduled_time"] = result["scheduled_time"]
-                            step.params["wait_type"] = "scheduled"
-                            # 秒数パラメータを削除
-                            if "seconds" in step.params:
-                                del step.params["seconds"]
-                        else:
-                            # スリープ（秒数指定）
-                            step.params["seconds"] = result["seconds"]
-                            step.params["wait_type"] = "sleep"
-                            # scheduled_timeパラメータを削除
-                            if "scheduled_time" in step.params:
-                                del step.params["scheduled_time"]
-                    elif step.type in ["copy", "paste", "key"]:
-                        step.params["key"] = result["key"]
-                    elif step.type == "custom_text":
-                        step.params["text"] = result["text"]
-                    elif step.type == "cmd_command":
-                        step.params["command"] = result["command"]
-                        step.params["timeout"] = result["timeout"]
-                        step.params["wait_completion"] = result["wait_completion"] == "待つ"  # 文字列からboolに変換
-                    elif step.type == "repeat_start":
-                        step.params["repeat_type"] = result["repeat_type"]
-                        step.params["max_iterations"] = result.get("max_iterations", 100)
-                        if result["repeat_type"] == "指定回数繰り返す":
-                            step.params["count"] = result.get("count", 2)
-                        else:
-                            step.params["count"] = result.get("max_iterations", 100)
-                    elif step.type == "repeat_end":
-                        old_condition_type = step.params.get("end_condition_type", "条件なし")
-                        new_condition_type = result["end_condition_type"]
-                        
-                        step.params["end_condition_type"] = new_condition_type
-                        step.params["end_condition_threshold"] = result.get("end_condition_threshold", 0.8)
-                        
-                        # 条件タイプが変更された場合や、画像一致が選択された場合の処理
-                        if new_condition_type == "画像一致で終了":
-                            if old_condition_type != new_condition_type or not step.params.get("end_condition_image"):
-                                # 新しく画像一致が選択された場合や画像が未設定の場合
-                                image_dialog = EnhancedImageDialog(self.root, "終了条件画像を選択")
-                                image_path = image_dialog.get_image_path()
-                                
-                                if image_path:
-                                    step.params["end_condition_image"] = image_path
-                                    
-                                    # 検索範囲の設定
-                                    if messagebox.askyesno("検索範囲設定", 
-                                                         "画像の検索範囲を限定しますか？\n\n"
-                                                         "「はい」: 範囲を指定（処理が高速化されます）\n"
-                                                         "「いいえ」: 全画面から検索"):
-                                        
-                                        start_dialog = MouseCoordinateDialog(self.root, "検索範囲の開始座標を指定")
-                                        start_coordinates = start_dialog.get_coordinates()
-                                        
-                                        if start_coordinates:
-                                            end_dialog = MouseCoordinateDialog(self.root, "検索範囲の終了座標を指定")
-                                            end_coordinates = end_dialog.get_coordinates()
-                                            
-                                            if end_coordinates:
-                                                step.params["end_condition_x1"] = start_coordinates[0]
-                                                step.params["end_condition_y1"] = start_coordinates[1]  
-                                                step.params["end_condition_x2"] = end_coordinates[0]
-                                                step.params["end_condition_y2"] = end_coordinates[1]
-                                            else:
-                                                # 全画面検索に設定
-                                                step.params.update({
-                                                    "end_condition_x1": 0, "end_condition_y1": 0,
-                                                    "end_condition_x2": 0, "end_condition_y2": 0
-                                                })
-                                        else:
-                                            # 全画面検索に設定
-                                            step.params.update({
-                                                "end_condition_x1": 0, "end_condition_y1": 0,
-                                                "end_condition_x2": 0, "end_condition_y2": 0
-                                            })
-                                    else:
-                                        # 全画面検索に設定
-                                        step.params.update({
-                                            "end_condition_x1": 0, "end_condition_y1": 0,
-                                            "end_condition_x2": 0, "end_condition_y2": 0
-                                        })
-                                else:
-                                    # 画像選択がキャンセルされた場合は条件なしに戻す
-                                    step.params["end_condition_type"] = "条件なし"
-                                    messagebox.showinfo("設定変更", "画像が選択されませんでした。条件なしに設定しました。")
-                        
-                        elif new_condition_type == "ファイル存在で終了":
-                            step.params["file_path"] = result.get("file_path", "")
-                        elif new_condition_type == "ファイル削除で終了":
-                            step.params["file_path_delete"] = result.get("file_path_delete", "")
-                        elif new_condition_type == "フォルダ内ファイル数で終了":
-                            step.params["folder_path"] = result.get("folder_path", "")
-                            step.params["file_count"] = result.get("file_count", 1)
-                        elif new_condition_type == "クリップボード内容で終了":
-                            step.params["clipboard_text"] = result.get("clipboard_text", "")
-                            step.params["clipboard_match_type"] = result.get("clipboard_match_type", "部分一致")
-                        else:
-                            # 条件なしの場合は関連設定をクリア
-                            step.params.update({
-                                "end_condition_image": "",
-                                "end_condition_x1": 0, "end_condition_y1": 0,
-                                "end_condition_x2": 0, "end_condition_y2": 0,
-                                "file_path": "", "file_path_delete": "", 
-                                "folder_path": "", "file_count": 1, "clipboard_text": ""
-                            })
 
                     step.comment = result["comment"]
-                    status = "✅" if step.enabled else "❌"
-                    # 編集後は実際のコメント内容を表示（get_clean_commentは使わない）
-                    display_comment = step.comment if step.comment.strip() else "-"
-                    self.tree.item(selected_items[0], values=(status, index, self.get_type_display(step), self.get_params_display(step), display_comment))
+                    step.invalidate_cache()
+                    # 挿入時と同じ行データ（省略表示済み）を作り、省略表示同士で比較する
+                    item = selected_items[0]
+                    new_values, _, full = self._build_row(step, index)
+                    self.drag_drop_tree.full_values[item] = full
+                    # 変更された列のみ更新
+                    old_values = self.tree.item(item, 'values')
+                    for column, old_value, new_value in zip(self.tree["columns"], old_values, new_values):
+                        if str(old_value) != str(new_value):
+                            self.tree.set(item, column, new_value)
                 else:
                     logger.info("Edit dialog cancelled or returned None")
                     
                     # ステップが編集されたら設定コンボボックスをクリア（編集中状態を示す）
-                    if hasattr(self, 'config_combo'):
+                    if self.config_combo is not None:
                         self.config_combo.set("")
                     
                     logger.info(f"ステップ編集: 行番号={index}, step={step}")
@@ -4734,6 +5415,116 @@ F11   フルスクリーン                          F12     開発者ツール
 
 
 
+    def _apply_edit_sleep(self, step: Step, result: Dict[str, Any]):
+        """待機ステップの編集結果を反映"""
+        if result["wait_type"] == "時刻指定":
+            step.params["scheduled_time"] = result["scheduled_time"]
+            step.params["wait_type"] = "scheduled"
+            # 秒数パラメータを削除
+            if "seconds" in step.params:
+                del step.params["seconds"]
+        else:
+            # スリープ（秒数指定）
+            step.params["seconds"] = result["seconds"]
+            step.params["wait_type"] = "sleep"
+            # scheduled_timeパラメータを削除
+            if "scheduled_time" in step.params:
+                del step.params["scheduled_time"]
+
+    def _apply_edit_cmd_command(self, step: Step, result: Dict[str, Any]):
+        """コマンド実行ステップの編集結果を反映"""
+        step.params["command"] = result["command"]
+        step.params["timeout"] = result["timeout"]
+        step.params["wait_completion"] = result["wait_completion"] == "待つ"  # 文字列からboolに変換
+
+    def _apply_edit_repeat_start(self, step: Step, result: Dict[str, Any]):
+        """繰り返し開始ステップの編集結果を反映"""
+        step.params["repeat_type"] = result["repeat_type"]
+        step.params["max_iterations"] = result.get("max_iterations", 100)
+        if result["repeat_type"] == "指定回数繰り返す":
+            step.params["count"] = result.get("count", 2)
+        else:
+            step.params["count"] = result.get("max_iterations", 100)
+
+    def _apply_edit_repeat_end(self, step: Step, result: Dict[str, Any]):
+        """繰り返し終了ステップの編集結果を反映"""
+        old_condition_type = step.params.get("end_condition_type", "条件なし")
+        new_condition_type = result["end_condition_type"]
+
+        step.params["end_condition_type"] = new_condition_type
+        step.params["end_condition_threshold"] = result.get("end_condition_threshold", 0.8)
+
+        # 条件タイプが変更された場合や、画像一致が選択された場合の処理
+        if new_condition_type == "画像一致で終了":
+            if old_condition_type != new_condition_type or not step.params.get("end_condition_image"):
+                # 新しく画像一致が選択された場合や画像が未設定の場合
+                image_dialog = EnhancedImageDialog(self.root, "終了条件画像を選択")
+                image_path = image_dialog.get_image_path()
+
+                if image_path:
+                    step.params["end_condition_image"] = image_path
+
+                    # 検索範囲の設定
+                    if messagebox.askyesno("検索範囲設定", 
+                                         "画像の検索範囲を限定しますか？\n\n"
+                                         "「はい」: 範囲を指定（処理が高速化されます）\n"
+                                         "「いいえ」: 全画面から検索"):
+
+                        start_dialog = MouseCoordinateDialog(self.root, "検索範囲の開始座標を指定")
+                        start_coordinates = start_dialog.get_coordinates()
+
+                        if start_coordinates:
+                            end_dialog = MouseCoordinateDialog(self.root, "検索範囲の終了座標を指定")
+                            end_coordinates = end_dialog.get_coordinates()
+
+                            if end_coordinates:
+                                step.params["end_condition_x1"] = start_coordinates[0]
+                                step.params["end_condition_y1"] = start_coordinates[1]  
+                                step.params["end_condition_x2"] = end_coordinates[0]
+                                step.params["end_condition_y2"] = end_coordinates[1]
+                            else:
+                                # 全画面検索に設定
+                                step.params.update({
+                                    "end_condition_x1": 0, "end_condition_y1": 0,
+                                    "end_condition_x2": 0, "end_condition_y2": 0
+                                })
+                        else:
+                            # 全画面検索に設定
+                            step.params.update({
+                                "end_condition_x1": 0, "end_condition_y1": 0,
+                                "end_condition_x2": 0, "end_condition_y2": 0
+                            })
+                    else:
+                        # 全画面検索に設定
+                        step.params.update({
+                            "end_condition_x1": 0, "end_condition_y1": 0,
+                            "end_condition_x2": 0, "end_condition_y2": 0
+                        })
+                else:
+                    # 画像選択がキャンセルされた場合は条件なしに戻す
+                    step.params["end_condition_type"] = "条件なし"
+                    messagebox.showinfo("設定変更", "画像が選択されませんでした。条件なしに設定しました。")
+
+        elif new_condition_type == "ファイル存在で終了":
+            step.params["file_path"] = result.get("file_path", "")
+        elif new_condition_type == "ファイル削除で終了":
+            step.params["file_path_delete"] = result.get("file_path_delete", "")
+        elif new_condition_type == "フォルダ内ファイル数で終了":
+            step.params["folder_path"] = result.get("folder_path", "")
+            step.params["file_count"] = result.get("file_count", 1)
+        elif new_condition_type == "クリップボード内容で終了":
+            step.params["clipboard_text"] = result.get("clipboard_text", "")
+            step.params["clipboard_match_type"] = result.get("clipboard_match_type", "部分一致")
+        else:
+            # 条件なしの場合は関連設定をクリア
+            step.params.update({
+                "end_condition_image": "",
+                "end_condition_x1": 0, "end_condition_y1": 0,
+                "end_condition_x2": 0, "end_condition_y2": 0,
+                "file_path": "", "file_path_delete": "", 
+                "folder_path": "", "file_count": 1, "clipboard_text": ""
+            })
+
     def _validate_selection(self):
         """選択された項目を確認"""
         selected_items = self.tree.selection()
@@ -4750,8 +5541,7 @@ F11   フルスクリーン                          F12     開発者ツール
                 index = self.tree.index(selected_items[0])
                 if index > 0:
                     self.steps[index], self.steps[index - 1] = self.steps[index - 1], self.steps[index]
-                    self.refresh_tree()
-                    self.tree.selection_set(self.tree.get_children()[index - 1])
+                    self._swap_tree_rows(selected_items[0], self.tree.prev(selected_items[0]), index - 1)
                     logger.info(f"ステップを上に移動: index={index}")
         except Exception as e:
             logger.error(f"ステップ移動エラー: {e}")
@@ -4765,46 +5555,64 @@ F11   フルスクリーン                          F12     開発者ツール
                 index = self.tree.index(selected_items[0])
                 if index < len(self.steps) - 1:
                     self.steps[index], self.steps[index + 1] = self.steps[index + 1], self.steps[index]
-                    self.refresh_tree()
-                    self.tree.selection_set(self.tree.get_children()[index + 1])
+                    self._swap_tree_rows(selected_items[0], self.tree.next(selected_items[0]), index + 1)
                     logger.info(f"ステップを下に移動: index={index}")
         except Exception as e:
             logger.error(f"ステップ下移動エラー: {e}")
             self.show_error_with_sound("エラー", f"ステップの移動に失敗しました: {e}")
 
+    def _swap_tree_rows(self, item: str, neighbor: str, new_index: int):
+        """隣接する2行をツリー上で入れ替え、行番号のみ更新"""
+        old_index = self.tree.index(item)
+        self.tree.move(item, "", new_index)
+        self.tree.set(item, "Line", new_index + 1)
+        self.tree.set(neighbor, "Line", old_index + 1)
+        self.tree.selection_set(item)
+        self.tree.see(item)
 
     def refresh_tree(self):
         """ツリーをリフレッシュ"""
         try:
-            # 既存のアイテムを削除
-            for item in self.tree.get_children():
-                self.tree.delete(item)
+            tree = self.tree
+            tree_insert = tree.insert
+            tree_item = tree.item
+            full_values = self.drag_drop_tree.full_values
+            
+            # 行データを先にまとめて生成
+            rows = [self._build_row(step, index) for index, step in enumerate(self.steps, start=1)]  # 1-based index
+            
+            children = tree.get_children()
+            selected = tree.selection()
+            if selected:
+                tree.selection_remove(*selected)
+            self._current_highlight_item = None
             
             # full_valuesをクリア
-            self.drag_drop_tree.full_values.clear()
+            full_values.clear()
             
-            for index, step in enumerate(self.steps, start=1):  # 1-based index
-                status = "✅" if step.enabled else "❌"
-                
-                # 完全なテキストを最新のstepデータから取得
-                params_full = self.get_params_display(step)
-                comment_full = step.comment
-                
-                # 省略表示を適用
-                params_display = self.drag_drop_tree.elide_to_fit(params_full, "Params")
-                comment_display = self.drag_drop_tree.elide_to_fit(comment_full, "Comment")
-                
-                # アイテムを挿入
-                item_id = self.tree.insert("", tk.END, values=(status, index, self.get_type_display(step), params_display, comment_display))
-                
-                # 完全なテキストを保存（最新データを確実に保存）
-                self.drag_drop_tree.full_values[item_id] = {
-                    'Params': params_full,
-                    'Comment': comment_full
-                }
-                
-                # 無効行のタグを適用
-                self.drag_drop_tree.apply_row_state_tags(item_id, step.enabled)
+            # 表示列を一時的に外して挿入中の列レイアウト再計算を抑制
+            display_columns = tree.cget("displaycolumns")
+            tree.configure(displaycolumns=())
+            try:
+                # 既存アイテムを1回のTcl呼び出しで切り離し、非表示のまま再利用する
+                tree.set_children("")
+                reused = min(len(children), len(rows))
+                item_ids = list(children[:reused])
+                for item_id, (values, tags, full) in zip(item_ids, rows):
+                    tree_item(item_id, values=values, tags=tags)
+                    full_values[item_id] = full
+                # 余った既存アイテムは一括削除
+                if len(children) > reused:
+                    tree.delete(*children[reused:])
+                for values, tags, full in rows[reused:]:
+                    item_id = tree_insert("", tk.END, values=values, tags=tags)
+                    # 完全なテキストを保存（最新データを確実に保存）
+                    full_values[item_id] = full
+                    item_ids.append(item_id)
+                # 全行を1回の呼び出しで再接続
+                tree.set_children("", *item_ids)
+            finally:
+                tree.configure(displaycolumns=display_columns)
                 
             logger.info("ツリーを更新しました")
             # ツリー更新のアニメーション効果
@@ -4813,14 +5621,36 @@ F11   フルスクリーン                          F12     開発者ツール
             logger.error(f"ツリー更新エラー: {e}")
             self.show_error_with_sound("エラー", f"ツリーの更新に失敗しました: 行番号なし, エラー: {e}")
 
+    def _build_row(self, step: Step, line_no: int) -> Tuple[tuple, tuple, Dict[str, str]]:
+        """1ステップ分の行データ（表示値・タグ・完全テキスト）を生成"""
+        status = "✅" if step.enabled else "❌"
+        
+        # 完全なテキストを最新のstepデータから取得
+        params_full = self.get_params_display(step)
+        comment_full = step.comment
+        
+        # 省略表示を適用
+        elide = self.drag_drop_tree.elide_to_fit
+        values = (status, line_no, self.get_type_display(step),
+                  elide(params_full, "Params"), elide(comment_full, "Comment"))
+        tags = () if step.enabled else ('disabled',)
+        return values, tags, {'Params': params_full, 'Comment': comment_full}
+    
+    def _insert_tree_row(self, position, step: Step, line_no: int) -> str:
+        """1ステップ分の行をツリーに挿入"""
+        values, tags, full = self._build_row(step, line_no)
+        item_id = self.tree.insert("", position, values=values, tags=tags)
+        # 完全なテキストを保存（最新データを確実に保存）
+        self.drag_drop_tree.full_values[item_id] = full
+        return item_id
+
     def highlight_current_step(self, step_index: int):
         """実行中のステップをハイライト表示"""
         try:
-            # 既存の選択をクリア
-            for item in self.tree.selection():
-                self.tree.selection_remove(item)
+            # 前回のハイライト行のみ元に戻す
+            self._reset_highlight_item()
             
-            # 指定されたステップを選択・フォーカス
+            # 指定されたステップを選択・フォーカス（selection_setで既存の選択は置き換わる）
             children = self.tree.get_children()
             if 0 <= step_index < len(children):
                 item_id = children[step_index]
@@ -4831,6 +5661,7 @@ F11   フルスクリーン                          F12     開発者ツール
                 # ハイライト用のタグを設定（安全な方法）
                 try:
                     self.tree.item(item_id, tags=("current_step",))
+                    self._current_highlight_item = item_id
                 except Exception as tag_error:
                     logger.debug(f"ステップタグ設定エラー（無視可能）: {tag_error}")
                 
@@ -4858,19 +5689,27 @@ F11   フルスクリーン                          F12     開発者ツール
         """現在のステップハイライトをクリア"""
         try:
             # 全ての選択をクリア
-            for item in self.tree.selection():
-                self.tree.selection_remove(item)
+            self.tree.selection_remove(*self.tree.selection())
             
-            # 実行マーカーをクリア（安全な方法）
-            for item in self.tree.get_children():
-                try:
-                    self.tree.item(item, tags=())
-                except Exception as tag_error:
-                    logger.debug(f"ステップタグクリアエラー（無視可能）: {tag_error}")
+            # 実行マーカーをクリア（ハイライト中の行のみ）
+            self._reset_highlight_item()
                     
         except Exception as e:
             logger.error(f"ステップハイライトクリアエラー: {e}")
 
+    def _reset_highlight_item(self):
+        """ハイライト中の行のタグを有効/無効状態に戻す"""
+        item_id = self._current_highlight_item
+        self._current_highlight_item = None
+        if item_id is None or not self.tree.exists(item_id):
+            return
+        try:
+            index = self.tree.index(item_id)
+            enabled = self.steps[index].enabled if index < len(self.steps) else True
+            self.tree.item(item_id, tags=() if enabled else ('disabled',))
+        except Exception as tag_error:
+            logger.debug(f"ステップタグクリアエラー（無視可能）: {tag_error}")
+
     def take_screenshot_and_save(self):
         """スクリーンショットを撮影してファイルに保存"""
         try:
@@ -4884,24 +5723,15 @@ F11   フルスクリーン                          F12     開発者ツール
             screenshot = pyautogui.screenshot()
             logger.info("スクリーンショット撮影完了")
             
-            # スクリーンショット保存ディレクトリを作成
-            import os
-            screenshot_dir = os.path.join(os.getcwd(), "screenshots")
-            if not os.path.exists(screenshot_dir):
-                os.makedirs(screenshot_dir)
-                logger.info("スクリーンショットディレクトリを作成: " + screenshot_dir)
-            
             # ファイル名生成
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = "screenshot_" + timestamp + ".png"
-            file_path = os.path.join(screenshot_dir, filename)
+            file_path = os.path.join(self._screenshot_dir, filename)
             logger.info("保存先ファイルパス: " + file_path)
             
-            # スクリーンショットを保存
+            # スクリーンショットの保存はバックグラウンドで実行（UIをブロックしない）
             logger.info("ファイル保存開始")
-            screenshot.save(file_path, "PNG")
-            logger.info("ファイル保存完了")
-            logger.info("スクリーンショット保存成功: " + file_path)
+            self._screenshot_pool.submit(self._write_screenshot, screenshot, file_path)
                 
         except Exception as main_error:
             logger.error("スクリーンショット処理でエラーが発生: " + str(type(main_error).__name__))
@@ -4910,6 +5740,16 @@ F11   フルスクリーン                          F12     開発者ツール
             except:
                 logger.error("エラー詳細の取得に失敗")
     
+    @staticmethod
+    def _write_screenshot(screenshot, file_path: str):
+        """スクリーンショットをPNGで書き込み（ワーカースレッドで実行）"""
+        try:
+            # 圧縮レベルを下げてエンコード時間を短縮
+            screenshot.save(file_path, "PNG", compress_level=1)
+            logger.info("スクリーンショット保存成功: " + file_path)
+        except Exception as e:
+            logger.error(f"スクリーンショット保存エラー: {e}")
+    
     def add_specific_key_step(self, key: str, comment: str):
         """特定のキーステップを追加する統合メソッド"""
         try:
@@ -4944,29 +5784,28 @@ F11   フルスクリーン                          F12     開発者ツール
             )
             if file_path:
                 # 設定データを作成
-                config = {
-                    "steps": [step.__dict__ for step in self.steps],
+                config_info = {
                     "last_monitor": self.selected_monitor,
                     "loop_count": self.loop_count,
                     "saved_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     "step_count": len(self.steps)
                 }
                 
-                # 設定ファイルを保存
-                with open(file_path, "w", encoding="utf-8") as f:
-                    json.dump(config, f, ensure_ascii=False, indent=2)
+                # 設定ファイルを保存（未変更ステップはキャッシュ済みJSON断片を再利用）
+                write_steps_config_file(file_path, self.steps, config_info)
+                invalidate_config_cache(file_path)
                 
                 # 最後に使用したファイル情報を記録（次回自動読み込み用）
                 last_config = {
                     "last_file": file_path, 
                     "last_monitor": self.selected_monitor, 
                     "loop_count": self.loop_count,
-                    "last_saved": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "last_saved_ts": int(time.time()),
                     "file_name": os.path.basename(file_path)
                 }
                 
-                with open(self.config_file, "w", encoding="utf-8") as f:
-                    json.dump(last_config, f, ensure_ascii=False, indent=2)
+                write_json_compact(self.config_file, last_config)
+                self._last_config_key = (file_path, self.selected_monitor, self.loop_count)
                 
                 # 成功メッセージ
                 success_msg = f"設定保存完了: {os.path.basename(file_path)} ({len(self.steps)}ステップ)"
@@ -4977,11 +5816,7 @@ F11   フルスクリーン                          F12     開発者ツール
                 self.update_config_list()
                 
                 # 音声フィードバック（成功）
-                try:
-                    import winsound
-                    winsound.MessageBeep(winsound.MB_ICONASTERISK)  # 成功音
-                except:
-                    pass
+                beep_async("MB_ICONASTERISK")
                     
             else:
                 logger.info("設定保存がキャンセルされました")
@@ -5006,50 +5841,112 @@ F11   フルスクリーン                          F12     開発者ツール
             if not isinstance(steps, list):
                 return False
             
+            # ループ内で参照する名前をローカルに束縛
+            _isinstance = isinstance
+            _dict = dict
+            valid_types = AppConfig.VALID_STEP_TYPES
+            required_params = AppConfig.REQUIRED_STEP_PARAMS
+            
             # 各ステップの基本構造をチェック
             for i, step in enumerate(steps):
-                if not isinstance(step, dict):
+                if not _isinstance(step, _dict):
                     logger.warning(f"ステップ {i}: 辞書形式ではありません")
                     return False
                 
                 # 必須フィールド
-                if "type" not in step or "params" not in step:
+                step_type = step.get("type")
+                params = step.get("params")
+                if step_type is None or params is None:
                     logger.warning(f"ステップ {i}: 必須フィールド (type/params) がありません")
                     return False
                 
-                if not isinstance(step["params"], dict):
+                if not _isinstance(params, _dict):
                     logger.warning(f"ステップ {i}: paramsが辞書形式ではありません")
                     return False
                 
-                # ステップタイプの検証（実装済みのすべてのタイプを含める）
-                valid_types = [
-                    "image_click", "coord_click", "coord_drag", "image_right_click", "image_relative_right_click", 
-                    "sleep", "custom_text", "cmd", "cmd_command", "key_action", "key",
-                    "copy", "paste", "repeat_start", "repeat_end"
-                ]
-                if step["type"] not in valid_types:
-                    logger.warning(f"ステップ {i}: 不正なステップタイプ '{step['type']}'")
+                # ステップタイプの検証
+                if step_type not in valid_types:
+                    logger.warning(f"ステップ {i}: 不正なステップタイプ '{step_type}'")
+                    return False
+                
+                # タイプ別の必須パラメータを検証
+                required = required_params.get(step_type)
+                if required is None:
+                    continue
+                missing = [key for key in required if key not in params]
+                if missing:
+                    logger.warning(f"ステップ {i}: 必須パラメータ {missing} がありません（タイプ '{step_type}'）")
                     return False
             
-            # 設定値の範囲チェック
-            if "last_monitor" in config:
-                monitor_val = config["last_monitor"]
-                if not isinstance(monitor_val, int) or monitor_val < 0 or monitor_val > 10:
-                    logger.warning(f"不正なモニター値: {monitor_val}")
-                    config["last_monitor"] = 0  # デフォルト値に修正
-            
-            if "loop_count" in config:
-                loop_val = config["loop_count"]
-                if not isinstance(loop_val, int) or loop_val < 1 or loop_val > 10000:
-                    logger.warning(f"不正なループ回数: {loop_val}")
-                    config["loop_count"] = 1  # デフォルト値に修正
-            
+            # last_monitor / loop_count の範囲チェックは _apply_config で行う（configは共有キャッシュのため書き換えない）
             return True
             
         except Exception as e:
             logger.error(f"設定ファイル検証エラー: {e}")
             return False
 
+    @staticmethod
+    def _config_int(config: Dict[str, Any], key: str, label: str, default: int, low: int, high: int) -> int:
+        """設定値を範囲チェックして返す（不正な値は警告して既定値を使う。configは書き換えない）"""
+        value = config.get(key, default)
+        if not isinstance(value, int) or value < low or value > high:
+            logger.warning(f"不正な{label}: {value}")
+            return default
+        return value
+
+    def _apply_config(self, config: Dict[str, Any], source_path: str, write_last: bool = True) -> int:
+        """読み込んだ設定をステップ一覧・UIに反映し、ステップ数を返す
+        
+        write_last=Trueの場合はモニター設定も反映し、次回自動読み込み用にlast_configを記録する。
+        """
+        # ステップデータの読み込みと補正（解析キャッシュを汚さないようparamsはコピー）
+        steps = []
+        for step_data in config.get("steps", []):
+            step_data = {**step_data, "params": dict(step_data.get("params", {}))}
+            # 旧い形式のimage_clickステップを補正
+            if step_data.get("type") == "image_click" and "click_type" not in step_data["params"]:
+                step_data["params"]["click_type"] = "single"
+                logger.info(f"旧い形式のimage_clickステップを補正: click_type='single'を追加")
+            # 時刻指定は読み込み時に解析しておき、形式の誤りを実行前に知らせる
+            scheduled_time = step_data["params"].get("scheduled_time")
+            if scheduled_time and (step_data.get("type") == "cmd_command" or step_data["params"].get("wait_type") == "scheduled"):
+                try:
+                    parse_hms(scheduled_time)
+                except ValueError as e:
+                    logger.warning(f"時刻指定の形式エラー: 行番号={len(steps) + 1}, scheduled_time={scheduled_time}, error={e}")
+            steps.append(Step.from_dict(step_data))
+        
+        self.steps = steps
+        
+        if not write_last:
+            self.loop_count = self._config_int(config, "loop_count", "ループ回数", self.loop_count, 1, 10000)
+            self.refresh_tree()
+            return len(steps)
+        
+        self.selected_monitor = self._config_int(config, "last_monitor", "モニター値", 0, 0, 10)
+        self.loop_count = self._config_int(config, "loop_count", "ループ回数", 1, 1, 10000)
+        
+        # UIを更新
+        if self.monitor_var is not None:
+            self.monitor_var.set(str(self.selected_monitor))
+        # last_configは下でまとめて記録するため、ここでは保存しない
+        self.select_monitor(str(self.selected_monitor), persist=False)
+        self.refresh_tree()
+        
+        # 次回自動読み込み用に記録（前回記録した内容と同じなら書き込みを省略）
+        last_config_key = (source_path, self.selected_monitor, self.loop_count)
+        if last_config_key != self._last_config_key or not os.path.exists(self.config_file):
+            last_config = {
+                "last_file": source_path,
+                "last_monitor": self.selected_monitor,
+                "loop_count": self.loop_count,
+                "last_loaded_ts": int(time.time()),
+                "file_name": os.path.basename(source_path)
+            }
+            write_json_compact(self.config_file, last_config)
+            self._last_config_key = last_config_key
+        return len(steps)
+
     def load_config(self):
         """設定をファイルから読み込む（自動読み込み対応改善版）"""
         try:
@@ -5058,8 +5955,7 @@ F11   フルスクリーン                          F12     開発者ツール
                 title="設定ファイルを読み込み"
             )
             if file_path:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    config = json.load(f)
+                config = read_json_file(file_path)
                 
                 # 設定ファイル構造の検証
                 if not self._validate_config_structure(config):
@@ -5068,39 +5964,10 @@ F11   フルスクリーン                          F12     開発者ツール
                     messagebox.showerror("読み込みエラー", error_msg)
                     return
                     
-                # ステップデータの読み込みと補正
-                steps = []
-                for step_data in config.get("steps", []):
-                    # 旧い形式のimage_clickステップを補正
-                    if step_data.get("type") == "image_click" and "click_type" not in step_data.get("params", {}):
-                        step_data["params"]["click_type"] = "single"
-                        logger.info(f"旧い形式のimage_clickステップを補正: click_type='single'を追加")
-                    steps.append(Step(**step_data))
-                
-                self.steps = steps
-                self.selected_monitor = int(config.get("last_monitor", 0))
-                self.loop_count = int(config.get("loop_count", 1))
-                
-                # UIを更新
-                if hasattr(self, 'monitor_var'):
-                    self.monitor_var.set(str(self.selected_monitor))
-                self.select_monitor(str(self.selected_monitor))
-                self.refresh_tree()
-                
-                # 次回自動読み込み用に記録
-                last_config = {
-                    "last_file": file_path,
-                    "last_monitor": self.selected_monitor,
-                    "loop_count": self.loop_count,
-                    "last_loaded": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "file_name": os.path.basename(file_path)
-                }
-                
-                with open(self.config_file, "w", encoding="utf-8") as f:
-                    json.dump(last_config, f, ensure_ascii=False, indent=2)
+                step_count = self._apply_config(config, file_path)
                 
                 # 成功メッセージ
-                success_msg = f"設定読み込み完了: {os.path.basename(file_path)} ({len(steps)}ステップ)"
+                success_msg = f"設定読み込み完了: {os.path.basename(file_path)} ({step_count}ステップ)"
                 logger.info(success_msg)
                 self.update_status(success_msg)
                 
@@ -5108,11 +5975,7 @@ F11   フルスクリーン                          F12     開発者ツール
                 self.update_config_list()
                 
                 # 音声フィードバック（成功）
-                try:
-                    import winsound
-                    winsound.MessageBeep(winsound.MB_ICONASTERISK)
-                except:
-                    pass
+                beep_async("MB_ICONASTERISK")
                     
             else:
                 logger.info("設定読み込みがキャンセルされました")
@@ -5126,7 +5989,7 @@ F11   フルスクリーン                          F12     開発者ツール
         """設定ファイル一覧を更新"""
         try:
             # config_comboが初期化されているかチェック
-            if not hasattr(self, 'config_combo'):
+            if self.config_combo is None:
                 logger.warning("config_combo が初期化されていません")
                 return
                 
@@ -5135,14 +5998,12 @@ F11   フルスクリーン                          F12     開発者ツール
                 logger.warning(f"configディレクトリが存在しません: {config_dir}")
                 return
             
-            # config配下のJSONファイル一覧を取得
-            config_files = []
-            for file in os.listdir(config_dir):
-                if file.endswith(".json") and file != "last_config.json":
-                    config_files.append(file)
-            
-            # ファイル名順でソート
-            config_files.sort()
+            # config配下のJSONファイル一覧をファイル名順で取得（DirEntryのキャッシュ済み種別を利用）
+            with os.scandir(config_dir) as entries:
+                config_files = sorted(
+                    entry.name for entry in entries
+                    if entry.name.endswith(".json") and entry.name != "last_config.json" and entry.is_file()
+                )
             logger.info(f"設定ファイル一覧: {config_files}")
             
             # コンボボックスを更新
@@ -5151,8 +6012,7 @@ F11   フルスクリーン                          F12     開発者ツール
             # 現在のファイルを選択状態にする
             try:
                 if os.path.exists(self.config_file):
-                    with open(self.config_file, "r", encoding="utf-8") as f:
-                        last_config = json.load(f)
+                    last_config = read_json_file(self.config_file)
                     current_file = last_config.get("file_name", "")
                     if current_file in config_files:
                         self.config_combo.set(current_file)
@@ -5206,7 +6066,7 @@ F11   フルスクリーン                          F12     開発者ツール
             self.root.after(100, lambda: self.root.configure(relief='flat'))
             
             # ステータスバーにアニメーション効果
-            if hasattr(self, 'status_label'):
+            if self.status_label is not None:
                 original_bg = self.status_label.cget('background')
                 self.status_label.configure(background=AppConfig.THEME['bg_accent'])
                 self.root.after(200, lambda: self.status_label.configure(background=original_bg))
@@ -5219,8 +6079,8 @@ F11   フルスクリーン                          F12     開発者ツール
     def load_config_file(self, file_path):
         """指定されたファイルパスの設定を読み込み"""
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
+            # 同じファイルの再選択は解析済みの設定を再利用
+            config = read_config_cached(file_path)
             
             # 設定ファイル構造の検証
             if not self._validate_config_structure(config):
@@ -5229,51 +6089,18 @@ F11   フルスクリーン                          F12     開発者ツール
                 messagebox.showerror("読み込みエラー", error_msg)
                 return
                 
-            # ステップデータの読み込みと補正
-            steps = []
-            for step_data in config.get("steps", []):
-                # 旧い形式のimage_clickステップを補正
-                if step_data.get("type") == "image_click" and "click_type" not in step_data.get("params", {}):
-                    step_data["params"]["click_type"] = "single"
-                    logger.info(f"旧い形式のimage_clickステップを補正: click_type='single'を追加")
-                steps.append(Step(**step_data))
+            step_count = self._apply_config(config, file_path)
             
-            self.steps = steps
-            self.selected_monitor = config.get("last_monitor", 0)
-            self.loop_count = int(config.get("loop_count", 1))
+            # 成功メッセージ
+            success_msg = f"設定読み込み完了: {os.path.basename(file_path)} ({step_count}ステップ)"
+            logger.info(success_msg)
+            self.update_status(success_msg)
             
-            # UIを更新
-            if hasattr(self, 'monitor_var'):
-                self.monitor_var.set(str(self.selected_monitor))
-            self.select_monitor(str(self.selected_monitor))
-            self.refresh_tree()
-            
-            # 次回自動読み込み用に記録
-            last_config = {
-                "last_file": file_path,
-                "last_monitor": self.selected_monitor,
-                "loop_count": self.loop_count,
-                "last_loaded": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "file_name": os.path.basename(file_path)
-            }
-            
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(last_config, f, ensure_ascii=False, indent=2)
-            
-            # 成功メッセージ
-            success_msg = f"設定読み込み完了: {os.path.basename(file_path)} ({len(steps)}ステップ)"
-            logger.info(success_msg)
-            self.update_status(success_msg)
-            
-            # コンボボックスの選択状態を更新
-            self.config_combo.set(os.path.basename(file_path))
+            # コンボボックスの選択状態を更新
+            self.config_combo.set(os.path.basename(file_path))
             
             # 音声フィードバック（成功）
-            try:
-                import winsound
-                winsound.MessageBeep(winsound.MB_OK)
-            except:
-                pass
+            beep_async("MB_OK")
                 
         except Exception as e:
             logger.error(f"設定ファイル読み込みエラー: {file_path}, エラー: {e}")
@@ -5284,8 +6111,7 @@ F11   フルスクリーン                          F12     開発者ツール
         try:
             if os.path.exists(self.config_file):
                 try:
-                    with open(self.config_file, "r", encoding="utf-8") as f:
-                        config = json.load(f)
+                    config = read_json_file(self.config_file)
                     
                     # 基本設定を復元
                     last_file = config.get("last_file")
@@ -5293,32 +6119,17 @@ F11   フルスクリーン                          F12     開発者ツール
                     self.loop_count = int(config.get("loop_count", 1))
                     
                     # モニター設定をUIに反映
-                    if hasattr(self, 'monitor_var'):
+                    if self.monitor_var is not None:
                         self.monitor_var.set(str(self.selected_monitor))
                     
                     # 前回のファイルが存在する場合は自動読み込み
                     if last_file and os.path.exists(last_file):
                         try:
-                            with open(last_file, "r", encoding="utf-8") as f:
-                                data = json.load(f)
-                            
-                            # ステップデータの読み込みと補正
-                            steps = []
-                            for step_data in data.get("steps", []):
-                                # 旧形式のimage_clickステップを補正
-                                if step_data.get("type") == "image_click" and "click_type" not in step_data.get("params", {}):
-                                    step_data["params"]["click_type"] = "single"
-                                    logger.info(f"旧形式のimage_clickステップを補正: click_type='single'を追加")
-                                steps.append(Step(**step_data))
-                            
-                            self.steps = steps
-                            self.loop_count = int(data.get("loop_count", self.loop_count))
-                            
-                            # UIを更新
-                            self.refresh_tree()
+                            data = read_json_file(last_file)
+                            step_count = self._apply_config(data, last_file, write_last=False)
                             
                             # 成功メッセージ
-                            status_msg = f"前回の設定を自動読み込み完了: {os.path.basename(last_file)} ({len(steps)}ステップ)"
+                            status_msg = f"前回の設定を自動読み込み完了: {os.path.basename(last_file)} ({step_count}ステップ)"
                             logger.info(status_msg)
                             
                             # ステータスバーに表示（遅延実行）
@@ -5348,7 +6159,7 @@ F11   フルスクリーン                          F12     開発者ツール
                 self.update_status("初回起動 - 新規セッション開始")
                 self.selected_monitor = 0
                 self.loop_count = 1
-                if hasattr(self, 'monitor_var'):
+                if self.monitor_var is not None:
                     self.monitor_var.set("0")
                 self.select_monitor("0")
                 
@@ -5358,7 +6169,7 @@ F11   フルスクリーン                          F12     開発者ツール
             # フォールバック処理
             self.selected_monitor = 0
             self.loop_count = 1
-            if hasattr(self, 'monitor_var'):
+            if self.monitor_var is not None:
                 self.monitor_var.set("0")
             self.select_monitor("0")
 
@@ -5383,9 +6194,9 @@ F11   フルスクリーン                          F12     開発者ツール
             # 実行開始時にハイライトをクリアして初期化
             self.clear_current_step_highlight()
             status_text = "▶️ 実行中..."
-            if hasattr(self, 'main_status_label'):
+            if self.main_status_label is not None:
                 self.main_status_label.config(text=status_text)
-            elif hasattr(self, 'status_label'):
+            elif self.status_label is not None:
                 self.status_label.config(text=status_text)
             threading.Thread(target=self._run_all_steps, daemon=True).start()
             logger.info(f"実行開始: ループ回数={self.loop_count}")
@@ -5412,17 +6223,17 @@ F11   フルスクリーン                          F12     開発者ツール
             self.loop_count = 1  # 選択から実行は1回のみ
             self.running = True
             
-            if hasattr(self, 'main_run_btn'):
+            if self.main_run_btn is not None:
                 self.main_run_btn.configure(text="⏸️ 実行中", state="disabled")
-            elif hasattr(self, 'start_button'):
+            elif self.start_button is not None:
                 self.start_button.configure(text="実行中", state="disabled")
-            if hasattr(self, 'stop_button'):
+            if self.stop_button is not None:
                 self.stop_button.configure(state="normal")
             
             status_text = f"▶️ ステップ{start_index+1}から実行中..."
-            if hasattr(self, 'main_status_label'):
+            if self.main_status_label is not None:
                 self.main_status_label.config(text=status_text)
-            elif hasattr(self, 'status_label'):
+            elif self.status_label is not None:
                 self.status_label.config(text=status_text)
                 
             # 選択されたステップから実行開始
@@ -5440,8 +6251,9 @@ F11   フルスクリーン                          F12     開発者ツール
             logger.info("選択ステップからの実行処理を開始しました")
         except Exception as e:
             logger.error(f"選択ステップ実行エラー: {e}")
-            self.update_status("❌ エラー発生")
-            self.show_error_with_sound("エラー", f"選択ステップからの実行に失敗しました: {e}")
+            self._post_run_failure(f"選択ステップからの実行に失敗しました: {e}")
+        finally:
+            self._release_thread_sct()
     
     def _run_steps_from_index(self):
         """指定インデックスからステップ実行"""
@@ -5455,23 +6267,30 @@ F11   フルスクリーン                          F12     開発者ツール
     def _execute_steps_for_monitor_from_index(self, monitor_index: int, start_index: int) -> bool:
         """モニターごとのステップ実行（指定インデックスから）"""
         try:
-            # monitor_indexが文字列の場合は整数に変換
-            if isinstance(monitor_index, str):
-                monitor_index = int(monitor_index)
+            # 文字列（設定ファイル由来など）も受け付けるよう整数に正規化（不正な値はValueError）
+            monitor_index = int(monitor_index)
             # 指定インデックス以降のステップで実行計画生成
             steps_from_index = self.steps[start_index:]
-            execution_plan = self._generate_execution_plan_from_steps(steps_from_index, start_index)
-            
-            # 有効ステップの総数を計算
-            total_valid_steps = sum(1 for step_index, _ in execution_plan 
-                                   if self.steps[step_index].enabled)
+            plan_indices, plan_levels, total_valid_steps = self._generate_execution_plan_from_steps(steps_from_index, start_index)
+            # 進捗率は逆数との乗算で求める（0件なら常に0）
+            inv_total = 1.0 / total_valid_steps if total_valid_steps > 0 else 0.0
             
             # 実行済みステップのカウンター
             executed_steps = 0
-            
-            for exec_index, (step_index, repeat_iter) in enumerate(execution_plan, start=1):
+            step_dispatch = self._step_dispatch
+            monitor_step_types = self._monitor_step_types
+            
+            # ステータス表示の不変部分（総ステップ数・タイプ表示名）をループ外で用意
+            total_steps = len(self.steps)
+            type_labels = {step.type: self.get_type_display(step) for step in steps_from_index}
+            last_status_key = None
+            last_exec_index = plan_indices.size - 1
+            
+            for exec_index in range(plan_indices.size):
+                step_index = int(plan_indices[exec_index])
+                repeat_iter = int(plan_levels[exec_index])
                 if not self.running:
-                    self.update_status("⛔ 実行中断")
+                    self._post_ui("status", self.update_status, "⛔ 実行中断")
                     logger.info("ステップ実行が中断されました")
                     return False
                 
@@ -5482,25 +6301,31 @@ F11   フルスクリーン                          F12     開発者ツール
                     logger.info(f"ステップスキップ: 行番号={step_index+1}, type={step.type} (無効)")
                     continue
                 
-                # 繰り返し表示
-                repeat_text = f" (繰り返し{repeat_iter+1}回目)" if repeat_iter > 0 else ""
-                self.update_status(f"▶️ ステップ {step_index+1}/{len(self.steps)}: {self.get_type_display(step)}{repeat_text}")
                 logger.info(f"ステップ実行開始: 行番号={step_index+1}, type={step.type}, repeat_iter={repeat_iter}")
                 
                 # 有効ステップの場合、進捗を更新
                 if step.enabled:
                     executed_steps += 1
-                    # 進行状況を更新
-                    self.progress_var.set(f"{executed_steps}/{total_valid_steps}")
-                
-                # 実行中のステップをハイライト表示
-                self.highlight_current_step(step_index)
-                
-                # プログレス可視化を更新
-                current_progress = executed_steps / total_valid_steps if total_valid_steps > 0 else 0
                 step_name = f"{step.comment}" if step.comment else f"{step.type.upper()}"
-                self.update_realtime_info(step_name, current_progress)
-                self.update_execution_stats(step_name)
+                
+                # UI更新は一定間隔に間引く（最初と最後のステップ・完了・エラー時は必ず反映される）
+                ui_due = exec_index == 0 or exec_index == last_exec_index or self._ui_update_due()
+                if ui_due:
+                    # 同じ行・同じ繰り返し回の連続実行では再生成しない
+                    status_key = (step_index, repeat_iter)
+                    if status_key != last_status_key:
+                        last_status_key = status_key
+                        # 繰り返し表示
+                        repeat_text = f" (繰り返し{repeat_iter+1}回目)" if repeat_iter > 0 else ""
+                        self._post_ui("status", self.update_status, f"▶️ ステップ {step_index+1}/{total_steps}: {type_labels[step.type]}{repeat_text}")
+                    # 進行状況を更新
+                    self._post_ui("progress", self.progress_var.set, f"{executed_steps}/{total_valid_steps}")
+                    # 実行中のステップをハイライト表示
+                    self._post_ui("highlight", self.highlight_current_step, step_index)
+                    # プログレス可視化を更新
+                    current_progress = executed_steps * inv_total
+                    self._post_ui("realtime", self.update_realtime_info, step_name, current_progress)
+                self.update_execution_stats(step_name, update_ui=ui_due)
                 
                 try:
                     if step.type == "repeat_start":
@@ -5516,85 +6341,79 @@ F11   フルスクリーン                          F12     開発者ツール
                         if should_continue:
                             # 継続の場合は特別なフラグを設定（実装は後で拡張）
                             pass
-                    elif step.type == "image_click":
-                        self._execute_image_click(step, monitor_index)
-                    elif step.type == "coord_click":
-                        self._execute_coord_click(step)
-                    elif step.type == "coord_drag":
-                        self._execute_coord_drag(step)
-                    elif step.type == "image_relative_right_click":
-                        self._execute_image_right_click(step, monitor_index)
-                    elif step.type == "sleep":
-                        self._execute_sleep(step)
-                    elif step.type == "custom_text":
-                        self._execute_custom_text(step)
-                    elif step.type == "cmd_command":
-                        self._execute_cmd_command(step)
                     else:
-                        self._execute_key_action(step)
+                        handler = step_dispatch.get(step.type, self._execute_key_action)
+                        if step.type in monitor_step_types:
+                            handler(step, monitor_index)
+                        else:
+                            handler(step)
                     logger.info(f"ステップ実行成功: 行番号={step_index+1}, step={step}")
                     
                     # 成功時の統計とアニメーション更新
-                    self.update_execution_stats(success=True)
-                    self.animate_step_completion(step_index, success=True)
+                    self.update_execution_stats(success=True, update_ui=ui_due)
+                    self._post_ui("animation", self.animate_step_completion, step_index, True)
                 except Exception as e:
-                    self.update_status(f"❌ エラー発生: 行番号 {step_index+1}")
-                    logger.error(f"ステップ実行エラー: 行番号={step_index+1}, step={step}, error={str(e)}")
-                    
-                    # スマートエラー分析とダイアログ表示
-                    analysis = self.analyze_error(e, step, step_index+1)
-                    self.show_error_dialog(analysis, step, step_index+1)
-                    
-                    
-                    self.running = False
-                    self.update_execution_buttons(False)
-                    # Select the erroneous step in the Treeview
-                    try:
-                        children = self.tree.get_children()
-                        if step_index < len(children):
-                            self.tree.selection_set(children[step_index])
-                            self.tree.see(children[step_index])
-                            self.update_image_preview(step_index)  # 画像プレビューも同期
-                            logger.info(f"エラー行を選択: 行番号={step_index+1}")
-                        else:
-                            logger.warning(f"エラー行の選択に失敗: 行番号={step_index+1}, ツリーアイテム数={len(children)}")
-                    except Exception as select_error:
-                        logger.error(f"エラー行の選択エラー: 行番号={step_index+1}, error={str(select_error)}")
-                    # エラー統計を更新
-                    self.update_execution_stats(error=True)
-                    self.animate_step_completion(step_index, success=False)
-                    
-                    # エラー時にハイライトをクリア（コメントアウト - エラー行を視認しやすくするため）
-                    # self.clear_current_step_highlight()
+                    # エラー時はハイライトを残す（エラー行を視認しやすくするため）
+                    self._post_step_error(e, step, step_index)
                     return False
-            # 実行完了時にハイライトをクリア
-            self.clear_current_step_highlight()
-            
-            # 完了時の進捗表示を更新（100%完了）
-            self.progress_var.set(f"{total_valid_steps}/{total_valid_steps}")
-            self.update_realtime_info("実行完了", 1.0)
-            if hasattr(self, 'main_progress_bar') and self.main_progress_bar:
-                self.update_progress_bar(self.main_progress_bar, 1.0, "実行完了 ✅", animate=True)
+            # 実行完了時にハイライトをクリアし、進捗表示を100%完了にする
+            self._post_progress_complete(total_valid_steps, "実行完了")
             
             logger.info(f"モニター[{monitor_index}]の選択ステップ実行完了")
             return True
         except Exception as e:
-            self.update_status("❌ エラー発生")
             logger.error(f"モニター[{monitor_index}]選択ステップ実行エラー: {e}")
-            self.show_error_with_sound("エラー", f"モニター[{monitor_index}]の選択ステップ実行に失敗しました: 行番号なし, エラー: {e}")
-            self.running = False
-            self.update_execution_buttons(False)
-            # エラー時にハイライトをクリア（コメントアウト - エラー行を視認しやすくするため）
-            # self.clear_current_step_highlight()
+            self._post_run_failure(f"モニター[{monitor_index}]の選択ステップ実行に失敗しました: 行番号なし, エラー: {e}")
             return False
     
+    @staticmethod
+    def _plan_signature(steps):
+        """実行計画に影響する要素（タイプ・有効状態・繰り返し設定）だけを抜き出したシグネチャ"""
+        return tuple(
+            (step.type, step.enabled, step.params.get('count', 1), step.params.get('repeat_type'),
+             step.params.get('max_iterations', 100))
+            if step.type == "repeat_start" else (step.type, step.enabled)
+            for step in steps
+        )
+
     def _generate_execution_plan_from_steps(self, steps, offset=0):
-        """指定されたステップリストから実行計画生成（ネスト対応）"""
-        return self._expand_nested_loops_from_steps(steps, 0, len(steps), offset)
+        """指定されたステップリストから実行計画生成（ネスト対応）
+        
+        (インデックス配列, ネストレベル配列, 計画中の有効ステップ総数) を返す。
+        """
+        key = (offset, self._plan_signature(steps))
+        cached = self._plan_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        pair_table = self._build_loop_pair_table(steps)
+        indices, levels = self._expand_nested_loops_from_steps(steps, 0, len(steps), offset, pair_table=pair_table)
+        # タプルのリストではなく int32 配列2本（インデックス/ネストレベル）で保持
+        plan_indices = np.asarray(indices, dtype=np.int32)
+        # 有効ステップ総数も計画と同じシグネチャで無効化されるため一緒に保持
+        enabled_mask = np.fromiter((step.enabled for step in steps), dtype=bool, count=len(steps))
+        total_valid_steps = int(enabled_mask[plan_indices - offset].sum())
+        plan = (plan_indices, np.asarray(levels, dtype=np.int32), total_valid_steps)
+        self._plan_cache = (key, plan)
+        return plan
 
-    def _expand_nested_loops_from_steps(self, steps, start_idx, end_idx, offset=0, nest_level=0):
-        """指定されたステップリストからネストしたループを再帰的に展開"""
-        execution_plan = []
+    @staticmethod
+    def _build_loop_pair_table(steps):
+        """repeat_start → 対応するrepeat_end のインデックス表をスタックで一括作成"""
+        pair_table = {}
+        stack = []
+        for i, step in enumerate(steps):
+            if step.type == "repeat_start":
+                stack.append(i)
+            elif step.type == "repeat_end" and stack:
+                pair_table[stack.pop()] = i
+        return pair_table
+
+    def _expand_nested_loops_from_steps(self, steps, start_idx, end_idx, offset=0, nest_level=0, pair_table=None):
+        """指定されたステップリストからネストしたループを再帰的に展開（(インデックス列, ネストレベル列)を返す）"""
+        if pair_table is None:
+            pair_table = self._build_loop_pair_table(steps)
+        plan_indices = []
+        plan_levels = []
         i = start_idx
         
         while i < end_idx:
@@ -5606,32 +6425,31 @@ F11   フルスクリーン                          F12     開発者ツール
                 repeat_type = step.params.get('repeat_type', '指定回数繰り返す')
                 max_iterations = step.params.get('max_iterations', 100)
                 
-                execution_plan.append((actual_index, nest_level))  # repeat_start自体を追加
+                # repeat_start自体を追加
+                plan_indices.append(actual_index)
+                plan_levels.append(nest_level)
                 
-                # 対応するrepeat_endを見つける
-                nest_depth = 1
-                end_pos = i + 1
-                while end_pos < end_idx and nest_depth > 0:
-                    if steps[end_pos].type == "repeat_start":
-                        nest_depth += 1
-                    elif steps[end_pos].type == "repeat_end":
-                        nest_depth -= 1
-                    end_pos += 1
+                # 対応するrepeat_endを表から取得
+                end_pos = pair_table.get(i)
                 
-                if nest_depth == 0:  # 対応するrepeat_endが見つかった
-                    end_pos -= 1  # repeat_endのインデックスに調整
-                    
+                if end_pos is not None and end_pos < end_idx:  # 対応するrepeat_endが見つかった
                     # 繰り返し処理（条件繰り返しの場合は最大回数を使用）
                     actual_count = max_iterations if repeat_type == "終了条件を満たすまで繰り返す" else repeat_count
                     
+                    # ループ内容は一度だけ展開し、繰り返しごとにネストレベルをずらして再利用
+                    inner_indices, inner_levels = self._expand_nested_loops_from_steps(
+                        steps, i + 1, end_pos, offset, nest_level + 1, pair_table
+                    )
+                    repeat_end_index = end_pos + offset
                     for repeat_iter in range(actual_count):
-                        # ループ内容を再帰的に展開
-                        inner_plan = self._expand_nested_loops_from_steps(
-                            steps, i + 1, end_pos, offset, nest_level + repeat_iter + 1
-                        )
-                        execution_plan.extend(inner_plan)
+                        plan_indices.extend(inner_indices)
+                        if repeat_iter == 0:
+                            plan_levels.extend(inner_levels)
+                        else:
+                            plan_levels.extend([level + repeat_iter for level in inner_levels])
                         # 各繰り返しの最後にrepeat_endも実行
-                        execution_plan.append((end_pos + offset, nest_level + repeat_iter + 1))
+                        plan_indices.append(repeat_end_index)
+                        plan_levels.append(nest_level + repeat_iter + 1)
                     
                     i = end_pos + 1  # repeat_endの次に進む
                 else:
@@ -5640,12 +6458,16 @@ F11   フルスクリーン                          F12     開発者ツール
             elif step.type == "repeat_end":
                 # 単体のrepeat_endは無視（親の処理で対応済み）
                 i += 1
+            elif not step.enabled:
+                # 無効なステップは計画に含めない（繰り返し回数分の空回りを防ぐ）
+                i += 1
             else:
                 # 通常のステップ
-                execution_plan.append((actual_index, nest_level))
+                plan_indices.append(actual_index)
+                plan_levels.append(nest_level)
                 i += 1
         
-        return execution_plan
+        return plan_indices, plan_levels
 
     def run_all_monitors(self, event=None):
         """全モニターで検索を実行"""
@@ -5654,11 +6476,11 @@ F11   フルスクリーン                          F12     開発者ツール
             if self.loop_count < 0:
                 raise ValueError("ループ回数は0以上の整数で設定してください")
             self.running = True
-            if hasattr(self, 'main_run_btn'):
+            if self.main_run_btn is not None:
                 self.main_run_btn.configure(text="⏸️ 実行中", state="disabled")
-            elif hasattr(self, 'start_button'):
+            elif self.start_button is not None:
                 self.start_button.configure(text="実行中", state="disabled")
-            if hasattr(self, 'stop_button'):
+            if self.stop_button is not None:
                 self.stop_button.configure(state="normal")
             self.update_status("🔍 全モニター検索中...")
             threading.Thread(target=self._run_steps_all_monitors, daemon=True).start()
@@ -5673,15 +6495,11 @@ F11   フルスクリーン                          F12     開発者ツール
             logger.warning("ESC緊急停止が実行されました")
             self.stop_execution()
             # 緊急停止の視覚的フィードバック
-            if hasattr(self, 'main_status_label'):
+            if self.main_status_label is not None:
                 self.main_status_label.config(text="🚨 ESC緊急停止しました", fg='#e74c3c')
                 self.root.after(3000, lambda: self.main_status_label.config(fg='#ffffff'))
             # システム音で停止を知らせる
-            try:
-                import os
-                os.system("echo \a")
-            except:
-                pass
+            console_bell()
 
     def stop_execution(self, event=None):
         """実行を停止"""
@@ -5694,9 +6512,9 @@ F11   フルスクリーン                          F12     開発者ツール
             # 実行停止時にハイライトをクリア
             self.clear_current_step_highlight()
             status_text = "⏹️ 停止しました"
-            if hasattr(self, 'main_status_label'):
+            if self.main_status_label is not None:
                 self.main_status_label.config(text=status_text)
-            elif hasattr(self, 'status_label'):
+            elif self.status_label is not None:
                 self.status_label.config(text=status_text)
             logger.info("実行を停止しました")
         except Exception as e:
@@ -5724,38 +6542,176 @@ F11   フルスクリーン                          F12     開発者ツール
             logger.error(f"モニター領域取得エラー: index={monitor_index}, error={e}")
             raise ValueError(f"モニター領域の取得に失敗しました: {e}")
 
-    @contextmanager
-    def mss_context(self):
-        """mssインスタンスをスレッドセーフに管理"""
-        sct = mss.mss()
+    def _get_sct(self):
+        """スレッドごとに1つのmssインスタンスを生成して使い回す"""
+        sct = getattr(self._sct_tls, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._sct_tls.sct = sct
+            with self._sct_lock:
+                self._sct_instances.append(sct)
+        return sct
+
+    def _release_thread_sct(self):
+        """現在のスレッドのmssインスタンスを閉じて一覧から外す（実行スレッドの終了時）"""
+        sct = getattr(self._sct_tls, "sct", None)
+        if sct is None:
+            return
+        self._sct_tls.sct = None
+        with self._sct_lock:
+            try:
+                self._sct_instances.remove(sct)
+            except ValueError:
+                pass  # 終了処理で既に閉じられている
         try:
-            yield sct
-        except Exception as e:
-            logger.error(f"mssコンテキストエラー: {e}")
-            raise
-        finally:
             sct.close()
+        except Exception as e:
+            logger.debug(f"mssクローズエラー（無視可能）: {e}")
+
+    def _close_sct_instances(self):
+        """生成したすべてのmssインスタンスを閉じる（終了時）"""
+        with self._sct_lock:
+            instances, self._sct_instances = self._sct_instances, []
+        for sct in instances:
+            try:
+                sct.close()
+            except Exception as e:
+                logger.debug(f"mssクローズエラー（無視可能）: {e}")
+
+    def _load_template_entry(self, path: str, grayscale: bool = False) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        """テンプレート画像と粗探索用の縮小版を読み込み（ファイルが未変更ならキャッシュを再利用）
+        
+        grayscale=Trueの場合は単一チャンネルに変換したものを返す。
+        縮小版は縮小後の短辺がPYRAMID_MIN_SIDE未満になる小さな画像ではNone。
+        """
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size, grayscale)
+        cache = self._template_cache
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+            return entry
+        template = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if template is None:
+            return None
+        if grayscale:
+            template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        scale = self.PYRAMID_SCALE
+        template_small = None
+        if min(template.shape[:2]) * scale >= self.PYRAMID_MIN_SIDE:
+            template_small = cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        entry = (template, template_small)
+        cache[key] = entry
+        if len(cache) > self.TEMPLATE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return entry
+
+    def _match_template(self, screenshot: np.ndarray, template: np.ndarray,
+                        template_small: Optional[np.ndarray]) -> Tuple[float, Tuple[int, int]]:
+        """縮小画像で粗く位置を絞り、等倍のROIで再照合して (スコア, 左上座標) を返す
+        
+        閾値の判定は呼び出し側でROIの再照合スコアに対して行う（スコアが低くても画面全体の再照合はしない）。
+        縮小版がない場合や画面・ROIがテンプレートより小さい場合のみ、従来通り画面全体を等倍で照合する。
+        """
+        if template_small is not None:
+            scale = self.PYRAMID_SCALE
+            # 縮小画像も作業用バッファに書き込み、試行ごとの確保を避ける
+            small_h = int(round(screenshot.shape[0] * scale))
+            small_w = int(round(screenshot.shape[1] * scale))
+            screen_small = self._get_scratch_buffer("pyramid", (small_h, small_w) + screenshot.shape[2:])
+            cv2.resize(screenshot, (small_w, small_h), dst=screen_small, interpolation=cv2.INTER_AREA)
+            if screen_small.shape[0] >= template_small.shape[0] and screen_small.shape[1] >= template_small.shape[1]:
+                result = cv2.matchTemplate(screen_small, template_small, cv2.TM_CCOEFF_NORMED)
+                _, _, _, coarse_loc = cv2.minMaxLoc(result)
+                # 縮小による位置誤差を吸収する余白を付けて等倍で再照合
+                h, w = template.shape[:2]
+                margin = int(round(1 / scale)) + self.PYRAMID_REFINE_MARGIN
+                x = int(coarse_loc[0] / scale)
+                y = int(coarse_loc[1] / scale)
+                x0, y0 = max(x - margin, 0), max(y - margin, 0)
+                x1 = min(x + w + margin, screenshot.shape[1])
+                y1 = min(y + h + margin, screenshot.shape[0])
+                roi = screenshot[y0:y1, x0:x1]
+                if roi.shape[0] >= h and roi.shape[1] >= w:
+                    result = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED)
+                    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+                    # 閾値未満（対象がまだ表示されていない等）でも全体照合はせず、この結果を返す
+                    return max_val, (x0 + max_loc[0], y0 + max_loc[1])
+        result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return max_val, max_loc
+
+    def _get_scratch_buffer(self, key, shape: Tuple[int, ...]) -> np.ndarray:
+        """用途キーごとの作業用uint8バッファを取得（スレッドローカル、形状変更時のみ再確保）"""
+        buffers = getattr(self._sct_tls, "buffers", None)
+        if buffers is None:
+            buffers = self._sct_tls.buffers = {}
+        buf = buffers.get(key)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            buffers[key] = buf
+        return buf
+
+    def _to_grayscale(self, screenshot: np.ndarray) -> np.ndarray:
+        """撮影画像を作業用バッファ上でグレースケールに変換"""
+        gray = self._get_scratch_buffer("gray", screenshot.shape[:2])
+        cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY, dst=gray)
+        return gray
+
+    def _get_capture_buffer(self, monitor_index: int, height: int, width: int) -> np.ndarray:
+        """モニターごとの撮影用BGRバッファを取得（解像度変更時のみ再確保）
+        
+        撮影ごとに画面サイズの配列を新規確保しないことで、リトライ中のページフォルトとメモリ使用量の変動を抑える。
+        """
+        return self._get_scratch_buffer(("capture", monitor_index), (height, width, 3))
+
+    def _grab_with_dxcam(self, monitor_index: int) -> Optional[np.ndarray]:
+        """dxcamでモニター全体をBGRで取得（使えない場合はNoneを返し、呼び出し側でmssにフォールバック）"""
+        if monitor_index not in self._dxcam_cameras:
+            camera = None
+            try:
+                camera = dxcam.create(output_idx=monitor_index, output_color="BGR")
+                # mssのモニター情報と解像度が一致しない場合は対応が取れていないとみなす
+                sct = self._get_sct()
+                monitor = sct.monitors[monitor_index + 1]
+                if (camera.height, camera.width) != (monitor["height"], monitor["width"]):
+                    logger.warning(f"dxcamの出力とモニター[{monitor_index}]の解像度が一致しないためmssを使用します")
+                    camera = None
+            except Exception as e:
+                logger.warning(f"dxcam初期化エラー（mssを使用）: モニター[{monitor_index}], error={e}")
+                camera = None
+            self._dxcam_cameras[monitor_index] = camera
+        camera = self._dxcam_cameras[monitor_index]
+        if camera is None:
+            return None
+        frame = camera.grab()
+        if frame is None:
+            # 前回から画面が変化していない場合はNoneが返るため直近フレームを使う
+            return self._dxcam_last_frames.get(monitor_index)
+        self._dxcam_last_frames[monitor_index] = frame
+        return frame
 
     def capture_screenshot(self, monitor_index: int) -> np.ndarray:
-        """スクリーンショットを撮影"""
+        """スクリーンショットを撮影
+        
+        返り値は次回の同モニター撮影で上書きされる共有バッファのため、保持する場合はコピーすること。
+        """
         try:
-            # monitor_indexが文字列の場合は整数に変換
-            if isinstance(monitor_index, str):
-                monitor_index = int(monitor_index)
-                
-            with self.mss_context() as sct:
-                monitor = sct.monitors[monitor_index + 1]
-                screenshot = sct.grab({
-                    "left": monitor["left"],
-                    "top": monitor["top"],
-                    "width": monitor["width"],
-                    "height": monitor["height"],
-                })
-                img = Image.frombytes("RGB", screenshot.size, screenshot.rgb)
-                img_np = np.array(img)
-                img_np = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
-                logger.info(f"スクリーンショット取得成功: モニター[{monitor_index}]")
-                return img_np
+            # 文字列（設定ファイル由来など）も受け付けるよう整数に正規化（不正な値はValueError）
+            monitor_index = int(monitor_index)
+            if DXCAM_AVAILABLE and AppConfig.USE_DXCAM_CAPTURE:
+                frame = self._grab_with_dxcam(monitor_index)
+                if frame is not None:
+                    return frame
+                
+            sct = self._get_sct()
+            # sct.monitorsの要素はleft/top/width/heightを持つためそのまま撮影領域に渡す
+            screenshot = sct.grab(sct.monitors[monitor_index + 1])
+            img_np = self._get_capture_buffer(monitor_index, screenshot.height, screenshot.width)
+            bgra = np.frombuffer(screenshot.bgra, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
+            cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=img_np)
+            logger.info(f"スクリーンショット取得成功: モニター[{monitor_index}]")
+            return img_np
         except Exception as e:
             logger.error(f"スクリーンショットエラー: モニター[{monitor_index}], error={str(e)}")
             raise RuntimeError(f"スクリーンショット取得に失敗しました: モニター[{monitor_index}]: {str(e)}")
@@ -5767,8 +6723,9 @@ F11   フルスクリーン                          F12     開発者ツール
             logger.info("ステップのループ処理を開始しました")
         except Exception as e:
             logger.error(f"ステップループ実行エラー: {e}")
-            self.update_status("❌ エラー発生")
-            self.show_error_with_sound("エラー", f"ステップのループ実行に失敗しました: {e}")
+            self._post_run_failure(f"ステップのループ実行に失敗しました: {e}")
+        finally:
+            self._release_thread_sct()
 
     def _run_steps_all_monitors(self):
         """全モニターでステップを検索実行"""
@@ -5777,8 +6734,9 @@ F11   フルスクリーン                          F12     開発者ツール
             logger.info("全モニター検索のループ処理を開始しました")
         except Exception as e:
             logger.error(f"全モニター検索ループエラー: {e}")
-            self.update_status("❌ エラー発生")
-            self.show_error_with_sound("エラー", f"全モニター検索のループ実行に失敗しました: {e}")
+            self._post_run_failure(f"全モニター検索のループ実行に失敗しました: {e}")
+        finally:
+            self._release_thread_sct()
 
     def _execute_loop(self, run_func: callable, mode: str):
         """ループ実行の共通ロジック"""
@@ -5788,28 +6746,23 @@ F11   フルスクリーン                          F12     開発者ツール
                 if not self.running:
                     logger.info(f"{mode} 実行が中断されました")
                     break
-                self.update_status(f"🔄 {mode} {i + 1}/{self.loop_count if self.loop_count else '∞'}")
+                self._post_ui("status", self.update_status, f"🔄 {mode} {i + 1}/{self.loop_count if self.loop_count else '∞'}")
                 logger.info(f"{mode} 実行中: ループ {i + 1}/{self.loop_count or '∞'}")
                 run_func()
-            # 実行完了時にボタン状態を更新
+            # 実行完了時にボタン状態を更新（UI反映は先に積まれた更新の後になるようキュー経由）
             self.running = False
-            self.update_execution_buttons(False)
-            
-            status_text = "✅ 実行完了"
-            if hasattr(self, 'main_status_label'):
-                self.main_status_label.config(text=status_text)
-            elif hasattr(self, 'status_label'):
-                self.status_label.config(text=status_text)
+            self._post_ui("buttons", self.update_execution_buttons, False)
+            self._post_ui("status", self.update_status, "✅ 実行完了")
             self.execution_start_index = 0  # リセット
             logger.info(f"{mode} 実行完了")
             
             # 処理完了通知ダイアログ（通知音付き）
-            self.show_completion_notification()
+            self._post_ui("notification", self.show_completion_notification)
         except Exception as e:
             logger.error(f"{mode} ループ実行エラー: {e}")
-            self.update_status("❌ エラー発生")
-            self.stop_execution()
-            self.show_error_with_sound("エラー", f"{mode}の実行中にエラーが発生しました: {e}")
+            self.running = False
+            self._post_ui("stop", self.stop_execution)
+            self._post_run_failure(f"{mode}の実行中にエラーが発生しました: {e}")
 
     def _run_steps_for_monitor(self):
         """指定モニターでステップを実行"""
@@ -5838,36 +6791,39 @@ F11   フルスクリーン                          F12     開発者ツール
                 if not self.running:
                     logger.info("全モニター実行が中断されました")
                     break
-                self.update_status(f"🔍 モニター[{monitor_index}] 検索中...")
+                self._post_ui("status", self.update_status, f"🔍 モニター[{monitor_index}] 検索中...")
                 logger.info(f"モニター[{monitor_index}] 検索開始")
                 self.selected_monitor = monitor_index
-                self.select_monitor(str(monitor_index))
+                self._post_ui("monitor", self.select_monitor, str(monitor_index))
                 if not self._execute_steps_for_monitor(monitor_index):
                     logger.info(f"モニター[{monitor_index}] 実行中断")
                     break
             logger.info("全モニターの実行が完了しました")
         except Exception as e:
             logger.error(f"全モニター実行エラー: {e}")
-            self.update_status("❌ エラー発生")
-            self.show_error_with_sound("エラー", f"全モニターの実行中にエラーが発生しました: {e}")
+            self._post_run_failure(f"全モニターの実行中にエラーが発生しました: {e}")
 
     def _execute_steps_for_monitor(self, monitor_index: int) -> bool:
         """モニターごとのステップ実行（条件繰り返し対応）"""
         try:
-            # monitor_indexが文字列の場合は整数に変換
-            if isinstance(monitor_index, str):
-                monitor_index = int(monitor_index)
-                
+            # 文字列（設定ファイル由来など）も受け付けるよう整数に正規化（不正な値はValueError）
+            monitor_index = int(monitor_index)
             # 条件繰り返しを考慮した動的実行
-            return self._execute_steps_dynamically(monitor_index, 0, len(self.steps))
+            if not self._execute_steps_dynamically(monitor_index, 0, len(self.steps)):
+                return False
+            
+            # 完了時の進捗表示を更新（100%完了）
+            self._post_progress_complete(self.execution_stats['total_steps'], "全ステップ実行完了")
+            logger.info(f"モニター[{monitor_index}]の全ステップ実行完了")
+            return True
             
         except KeyboardInterrupt:
             logger.info("実行が中断されました")
-            self.update_status("⏸️ 実行中断")
+            self._post_ui("status", self.update_status, "⏸️ 実行中断")
             return False
         except Exception as e:
             logger.error(f"ステップ実行中にエラーが発生しました: {e}")
-            self.update_status("❌ エラー発生")
+            self._post_ui("status", self.update_status, "❌ エラー発生")
             return False
     
     def _execute_steps_dynamically(self, monitor_index: int, start_idx: int, end_idx: int) -> bool:
@@ -5968,16 +6924,19 @@ F11   フルスクリーン                          F12     開発者ツール
     def _execute_single_step(self, step: Step, step_index: int, monitor_index: int, repeat_iter: int) -> bool:
         """単一ステップの実行"""
         try:
-            # 繰り返し表示
-            repeat_text = f" (繰り返し{repeat_iter+1}回目)" if repeat_iter > 0 else ""
-            self.update_status(f"▶️ ステップ {step_index+1}/{len(self.steps)}: {self.get_type_display(step)}{repeat_text}")
             logger.info(f"ステップ実行開始: 行番号={step_index+1}, type={step.type}, repeat_iter={repeat_iter}")
-            
-            self.highlight_current_step(step_index)
-            
             step_name = f"{step.comment}" if step.comment else f"{step.type.upper()}"
-            self.update_realtime_info(step_name, 0)
-            self.update_execution_stats(step_name)
+            
+            # UI更新は一定間隔に間引いてメインスレッドへ送る（最初と最後の行は必ず反映する）
+            ui_due = (self.execution_stats['completed_steps'] == 0 or step_index == len(self.steps) - 1
+                      or self._ui_update_due())
+            if ui_due:
+                # 繰り返し表示
+                repeat_text = f" (繰り返し{repeat_iter+1}回目)" if repeat_iter > 0 else ""
+                self._post_ui("status", self.update_status, f"▶️ ステップ {step_index+1}/{len(self.steps)}: {self.get_type_display(step)}{repeat_text}")
+                self._post_ui("highlight", self.highlight_current_step, step_index)
+                self._post_ui("realtime", self.update_realtime_info, step_name, 0)
+            self.update_execution_stats(step_name, update_ui=ui_due)
             
             if step.type == "repeat_start":
                 repeat_type = step.params.get('repeat_type', '指定回数繰り返す')
@@ -5988,126 +6947,77 @@ F11   フルスクリーン                          F12     開発者ツール
                     logger.info(f"条件満たすまで繰り返し開始: 最大{max_iter}回")
             elif step.type == "repeat_end":
                 logger.info(f"繰り返し終了")
-            elif step.type == "image_click":
-                self._execute_image_click(step, monitor_index)
-            elif step.type == "coord_click":
-                self._execute_coord_click(step)
-            elif step.type == "coord_drag":
-                self._execute_coord_drag(step)
-            elif step.type == "image_relative_right_click":
-                self._execute_image_right_click(step, monitor_index)
-            elif step.type == "sleep":
-                self._execute_sleep(step)
-            elif step.type == "custom_text":
-                self._execute_custom_text(step)
-            elif step.type == "cmd_command":
-                self._execute_cmd_command(step)
             else:
-                self._execute_key_action(step)
+                handler = self._step_dispatch.get(step.type, self._execute_key_action)
+                if step.type in self._monitor_step_types:
+                    handler(step, monitor_index)
+                else:
+                    handler(step)
                 
             logger.info(f"ステップ実行成功: 行番号={step_index+1}, step={step}")
             
             # 成功時の統計とアニメーション更新
-            self.update_execution_stats(success=True)
-            self.animate_step_completion(step_index, success=True)
+            self.update_execution_stats(success=True, update_ui=ui_due)
+            self._post_ui("animation", self.animate_step_completion, step_index, True)
             return True
             
         except Exception as e:
-            self.update_status(f"❌ エラー発生: 行番号 {step_index+1}")
-            logger.error(f"ステップ実行エラー: 行番号={step_index+1}, step={step}, error={str(e)}")
-            
-            # スマートエラー分析とダイアログ表示
-            analysis = self.analyze_error(e, step, step_index+1)
-            self.show_error_dialog(analysis, step, step_index+1)
-            
-            self.running = False
-            self.update_execution_buttons(False)
-            
-            # Select the erroneous step in the Treeview
-            try:
-                children = self.tree.get_children()
-                if step_index < len(children):  # step_index is 0-based, children is 0-based
-                    self.tree.selection_set(children[step_index])
-                    self.tree.see(children[step_index])  # Ensure the selected item is visible
-                    self.update_image_preview(step_index)  # 画像プレビューも同期
-                    logger.info(f"エラー行を選択: 行番号={step_index+1}")
-                else:
-                    logger.warning(f"エラー行の選択に失敗: 行番号={step_index+1}, ツリーアイテム数={len(children)}")
-            except Exception as select_error:
-                logger.error(f"エラー行の選択エラー: 行番号={step_index+1}, error={str(select_error)}")
-            
-            # エラー統計を更新
-            self.update_execution_stats(error=True)
-            self.animate_step_completion(step_index, success=False)
-            return False
-            # 完了時の進捗表示を更新（100%完了）
-            self.progress_var.set(f"{total_valid_steps}/{total_valid_steps}")
-            self.update_realtime_info("全ステップ実行完了", 1.0)
-            if hasattr(self, 'main_progress_bar') and self.main_progress_bar:
-                self.update_progress_bar(self.main_progress_bar, 1.0, "全ステップ実行完了 ✅", animate=True)
-                
-            logger.info(f"モニター[{monitor_index}]の全ステップ実行完了")
-            return True
-        except Exception as e:
-            self.update_status("❌ エラー発生")
-            logger.error(f"モニター[{monitor_index}]ステップ実行エラー: {e}")
-            self.show_error_with_sound("エラー", f"モニター[{monitor_index}]のステップ実行に失敗しました: 行番号なし, エラー: {e}")
-            self.running = False
-            self.update_execution_buttons(False)
-            # エラー時にハイライトをクリア（コメントアウト - エラー行を視認しやすくするため）
-            # self.clear_current_step_highlight()
+            self._post_step_error(e, step, step_index)
             return False
 
     def _generate_execution_plan(self):
-        """繰り返しアクション解析による実行計画生成（ネスト対応）"""
-        return self._expand_nested_loops(self.steps, 0, len(self.steps))
+        """繰り返しアクション解析による実行計画生成（ネスト対応、構造が同じなら前回の結果を再利用）"""
+        key = self._plan_signature(self.steps)
+        cached = self._full_plan_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        plan = self._expand_nested_loops(self.steps, 0, len(self.steps))
+        self._full_plan_cache = (key, plan)
+        return plan
 
     def _expand_nested_loops(self, steps, start_idx, end_idx, nest_level=0):
-        """ネストしたループを再帰的に展開"""
+        """ネストしたループを明示的なスタックで展開（再帰・repeat_endの再走査なし）"""
+        pair_table = self._build_loop_pair_table(steps)
         execution_plan = []
-        i = start_idx
-        
-        while i < end_idx:
+        # フレーム: ["seq", 現在位置, 終端, ネストレベル] / ["loop", 本体開始, repeat_end位置, 基準レベル, 完了回数, 回数, 本体展開中]
+        stack = [["seq", start_idx, end_idx, nest_level]]
+        
+        while stack:
+            frame = stack[-1]
+            if frame[0] == "loop":
+                _, body_start, end_pos, base_level, done, repeat_count, in_body = frame
+                if in_body:
+                    # 本体の展開が終わったので、この回のrepeat_endを追加
+                    execution_plan.append((end_pos, base_level + done + 1))
+                    frame[4] = done = done + 1
+                    frame[6] = False
+                if done >= repeat_count:
+                    stack.pop()
+                else:
+                    frame[6] = True
+                    stack.append(["seq", body_start, end_pos, base_level + done + 1])
+                continue
+            
+            i, seq_end, level = frame[1], frame[2], frame[3]
+            if i >= seq_end:
+                stack.pop()
+                continue
             step = steps[i]
             
             if step.type == "repeat_start":
-                repeat_count = step.params.get('count', 1)
-                execution_plan.append((i, nest_level))  # repeat_start自体を追加
-                
-                # 対応するrepeat_endを見つける
-                nest_depth = 1
-                end_pos = i + 1
-                while end_pos < end_idx and nest_depth > 0:
-                    if steps[end_pos].type == "repeat_start":
-                        nest_depth += 1
-                    elif steps[end_pos].type == "repeat_end":
-                        nest_depth -= 1
-                    end_pos += 1
-                
-                if nest_depth == 0:  # 対応するrepeat_endが見つかった
-                    end_pos -= 1  # repeat_endのインデックスに調整
-                    
-                    # 繰り返し処理
-                    for repeat_iter in range(repeat_count):
-                        # ループ内容を再帰的に展開
-                        inner_plan = self._expand_nested_loops(
-                            steps, i + 1, end_pos, nest_level + repeat_iter + 1
-                        )
-                        execution_plan.extend(inner_plan)
-                        # 各繰り返しの最後にrepeat_endも実行
-                        execution_plan.append((end_pos, nest_level + repeat_iter + 1))
-                    
-                    i = end_pos + 1  # repeat_endの次に進む
-                else:
+                end_pos = pair_table.get(i)
+                if end_pos is None or end_pos >= seq_end:
                     raise ValueError(f"対応するrepeat_endが見つかりません: ステップ{i}")
-                    
+                execution_plan.append((i, level))  # repeat_start自体を追加
+                frame[1] = end_pos + 1  # repeat_endの次に進む
+                stack.append(["loop", i + 1, end_pos, level, 0, step.params.get('count', 1), False])
             elif step.type == "repeat_end":
                 # 単体のrepeat_endは無視（親の処理で対応済み）
-                i += 1
+                frame[1] = i + 1
             else:
                 # 通常のステップ
-                execution_plan.append((i, nest_level))
-                i += 1
+                execution_plan.append((i, level))
+                frame[1] = i + 1
         
         return execution_plan
 
@@ -6125,12 +7035,12 @@ F11   フルスクリーン                          F12     開発者ツール
         """
         try:
             import pyautogui
-            with self.mss_context() as sct:
-                virt = sct.monitors[0]  # monitors[0] は仮想スクリーン全体
-                v_left = int(virt.get("left", 0))
-                v_top = int(virt.get("top", 0))
-                v_width = int(virt.get("width", 1)) or 1
-                v_height = int(virt.get("height", 1)) or 1
+            sct = self._get_sct()
+            virt = sct.monitors[0]  # monitors[0] は仮想スクリーン全体
+            v_left = int(virt.get("left", 0))
+            v_top = int(virt.get("top", 0))
+            v_width = int(virt.get("width", 1)) or 1
+            v_height = int(virt.get("height", 1)) or 1
 
             pa_width, pa_height = pyautogui.size()
             sx = float(pa_width) / float(v_width)
@@ -6175,20 +7085,14 @@ F11   フルスクリーン                          F12     開発者ツール
                 logger.info(f"画像一致終了条件チェック: path={image_path}, threshold={threshold}")
                 
                 # 画像テンプレートを読み込み
-                template = cv2.imdecode(np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_COLOR)
-                if template is None:
+                template_entry = self._load_template_entry(image_path)
+                if template_entry is None:
                     logger.error(f"終了条件画像の読み込み失敗: {image_path}")
                     return False
+                template, template_small = template_entry
                 
-                # スクリーンショットを取得
-                if isinstance(monitor_index, str):
-                    monitor_index = int(monitor_index)
-                
-                with self.mss_context() as sct:
-                    mon = sct.monitors[monitor_index + 1]
-                    screenshot = sct.grab(mon)
-                    screenshot_np = np.array(screenshot)
-                    screenshot_bgr = cv2.cvtColor(screenshot_np, cv2.COLOR_BGRA2BGR)
+                # スクリーンショットを取得（BGRAから共有バッファへ直接BGR変換）
+                screenshot_bgr = self.capture_screenshot(monitor_index)
                 
                 # 検索範囲を指定した場合は切り出し
                 if x2 > x1 and y2 > y1:
@@ -6197,9 +7101,8 @@ F11   フルスクリーン                          F12     開発者ツール
                 else:
                     roi = screenshot_bgr
                 
-                # テンプレートマッチング
-                result = cv2.matchTemplate(roi, template, cv2.TM_CCOEFF_NORMED)
-                _, max_val, _, _ = cv2.minMaxLoc(result)
+                # テンプレートマッチング（粗探索→等倍再照合、見つからなければ全体を等倍照合）
+                max_val, _ = self._match_template(roi, template, template_small)
                 
                 match_found = max_val >= threshold
                 logger.info(f"画像一致結果: max_val={max_val:.3f}, threshold={threshold}, match={match_found}")
@@ -6322,9 +7225,6 @@ F11   フルスクリーン                          F12     開発者ツール
 
     def _execute_image_click(self, step: Step, monitor_index: int):
         """画像をクリック/ダブル/右クリック（MSS物理→PyAutoGUI論理 正規化版）。"""
-        if isinstance(monitor_index, str):
-            monitor_index = int(monitor_index)
-
         params = step.params
         try:
             path = params["path"]
@@ -6336,14 +7236,20 @@ F11   フルスクリーン                          F12     開発者ツール
                 f"画像クリック実行: path={path}, monitor={monitor_index}, threshold={threshold}, click_type={click_type}, retry={retry}, delay={delay}"
             )
 
-            template = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
-            if template is None:
+            # 既定は輝度のみで照合（3チャンネルより約3倍軽い）。色で区別したい画像は「カラー」を指定
+            grayscale = params.get("match_mode", "gray") != "color"
+            template_entry = self._load_template_entry(path, grayscale)
+            if template_entry is None:
                 raise ValueError(f"画像ファイルの読み込みに失敗しました: {path}")
+            template, template_small = template_entry
 
-            with self.mss_context() as sct:
-                mon = sct.monitors[monitor_index + 1]  # mssは1-based
-                left, top = int(mon["left"]), int(mon["top"])  # 物理
-                logger.info(f"MSS物理座標: left={left}, top={top}")
+            sct = self._get_sct()
+            mon = sct.monitors[monitor_index + 1]  # mssは1-based
+            left, top = int(mon["left"]), int(mon["top"])  # 物理
+            logger.info(f"MSS物理座標: left={left}, top={top}")
+            # 一致位置（左上）からクリック中心への変換量は試行ごとに変わらないので先に求める
+            h, w = template.shape[:2]
+            center_x, center_y = left + w // 2, top + h // 2
 
             for attempt in range(retry + 1):
                 if not getattr(self, 'running', True):
@@ -6355,13 +7261,13 @@ F11   フルスクリーン                          F12     開発者ツール
                 except RuntimeError as e:
                     logger.error(f"スクリーンショット取得エラー: {e}")
                     raise
+                if grayscale:
+                    screenshot = self._to_grayscale(screenshot)
 
-                result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-                _, max_val, _, max_loc = cv2.minMaxLoc(result)
+                max_val, max_loc = self._match_template(screenshot, template, template_small)
 
                 if max_val >= threshold:
-                    h, w = template.shape[:2]
-                    click_point = (int(left + max_loc[0] + w // 2), int(top + max_loc[1] + h // 2))
+                    click_point = (int(center_x + max_loc[0]), int(center_y + max_loc[1]))
 
                     logger.info(
                         f"画像検出成功: max_val={max_val:.3f}, match_loc={max_loc}, click_point={click_point}"
@@ -6379,7 +7285,8 @@ F11   フルスクリーン                          F12     開発者ツール
                     logger.info(f"{click_type}クリック成功: point={click_point}")
                     return
 
-                time.sleep(delay)
+                # 停止操作で即座に起床し、次の試行冒頭の中断チェックで抜ける
+                self._stop_event.wait(delay)
                 logger.info(f"画像検索試行: attempt={attempt + 1}, max_val={max_val:.3f}")
 
             raise RuntimeError(f"画像が見つかりませんでした: {os.path.basename(path)}")
@@ -6440,9 +7347,6 @@ F11   フルスクリーン                          F12     開発者ツール
 
     def _execute_image_right_click(self, step: Step, monitor_index: int):
         """画像のオフセット座標でクリック（MSS物理→PyAutoGUI論理 正規化版）。"""
-        if isinstance(monitor_index, str):
-            monitor_index = int(monitor_index)
-
         params = step.params
         try:
             path = params["path"]
@@ -6456,14 +7360,20 @@ F11   フルスクリーン                          F12     開発者ツール
                 f"画像オフセット{click_type}クリック実行: path={path}, monitor={monitor_index}, threshold={threshold}, offset=({offset_x}, {offset_y}), retry={retry}, delay={delay}"
             )
 
-            template = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
-            if template is None:
+            # 既定は輝度のみで照合（3チャンネルより約3倍軽い）。色で区別したい画像は「カラー」を指定
+            grayscale = params.get("match_mode", "gray") != "color"
+            template_entry = self._load_template_entry(path, grayscale)
+            if template_entry is None:
                 raise ValueError(f"画像ファイルの読み込みに失敗しました: {path}")
+            template, template_small = template_entry
 
-            with self.mss_context() as sct:
-                mon = sct.monitors[monitor_index + 1]
-                left, top = int(mon["left"]), int(mon["top"])  # 物理
-                logger.info(f"MSS物理座標: left={left}, top={top}")
+            sct = self._get_sct()
+            mon = sct.monitors[monitor_index + 1]
+            left, top = int(mon["left"]), int(mon["top"])  # 物理
+            logger.info(f"MSS物理座標: left={left}, top={top}")
+            # 一致位置（左上）からクリック中心への変換量は試行ごとに変わらないので先に求める
+            h, w = template.shape[:2]
+            center_x, center_y = left + w // 2, top + h // 2
 
             for attempt in range(retry + 1):
                 if not getattr(self, 'running', True):
@@ -6475,13 +7385,13 @@ F11   フルスクリーン                          F12     開発者ツール
                 except RuntimeError as e:
                     logger.error(f"スクリーンショット取得エラー: {e}")
                     raise
+                if grayscale:
+                    screenshot = self._to_grayscale(screenshot)
 
-                result = cv2.matchTemplate(screenshot, template, cv2.TM_CCOEFF_NORMED)
-                _, max_val, _, max_loc = cv2.minMaxLoc(result)
+                max_val, max_loc = self._match_template(screenshot, template, template_small)
 
                 if max_val >= threshold:
-                    h, w = template.shape[:2]
-                    base_point = (int(left + max_loc[0] + w // 2), int(top + max_loc[1] + h // 2))
+                    base_point = (int(center_x + max_loc[0]), int(center_y + max_loc[1]))
                     click_point = (base_point[0] + offset_x, base_point[1] + offset_y)
 
                     logger.info(
@@ -6500,7 +7410,8 @@ F11   フルスクリーン                          F12     開発者ツール
                     logger.info(f"画像オフセット{click_type}クリック成功: point={click_point}")
                     return
 
-                time.sleep(delay)
+                # 停止操作で即座に起床し、次の試行冒頭の中断チェックで抜ける
+                self._stop_event.wait(delay)
                 logger.info(f"画像検索試行: attempt={attempt + 1}, max_val={max_val:.3f}")
 
         except Exception as e:
@@ -6540,6 +7451,11 @@ F11   フルスクリーン                          F12     開発者ツール
                 text = params["text"]
                 logger.info(f"カスタム文字列入力実行: text={text}")
                 
+                # Windowsではクリップボードを経由せずUnicode入力で直接送る
+                if AppConfig.USE_UNICODE_TEXT_INPUT and send_unicode_text(text):
+                    logger.info(f"カスタム文字列入力成功: text={text}")
+                    return
+                
                 # Copy text to clipboard and paste it
                 pyperclip.copy(text)
                 time.sleep(0.1)  # Brief pause to ensure clipboard is updated
@@ -6553,83 +7469,12 @@ F11   フルスクリーン                          F12     開発者ツール
 
     def _validate_command_safety(self, command: str) -> bool:
         """コマンドの安全性を検証"""
-        # Windows cmd/PowerShell の危険なコマンドパターン
-        dangerous_patterns = [
-            # ファイル削除系
-            r'del\s+.*(/[sq]|\\|\*)',           # del /s, del /q, del *.* 
-            r'rmdir\s+.*(/s|/q)',               # rmdir /s
-            r'rd\s+.*(/s|/q)',                  # rd /s /q
-            r'erase\s+.*(\*|\\)',               # erase
-            r'remove-item\s+.*(-recurse|-force)', # PowerShell Remove-Item
-            
-            # システム操作系
-            r'format\s+[a-z]:',                 # format C:
-            r'fdisk\s+',                        # fdisk
-            r'diskpart\s*$',                    # diskpart
-            r'bootrec\s+',                      # bootrec
-            r'bcdedit\s+',                      # bcdedit
-            
-            # システム制御系
-            r'shutdown\s+.*(/[rs]|/[fth])',     # shutdown /r /s /f /t /h
-            r'restart-computer',                # PowerShell restart
-            r'stop-computer',                   # PowerShell shutdown
-            
-            # ネットワーク/セキュリティ系
-            r'netsh\s+',                        # netsh (firewall, wifi等)
-            r'netstat\s+.*(-a|-n)',             # netstat
-            r'arp\s+(-[ads])',                  # arp manipulation
-            
-            # レジストリ操作系
-            r'reg\s+(delete|add|import)',       # registry operations
-            r'regedit\s+(/[si])',              # regedit import/silent
-            
-            # サービス制御系  
-            r'sc\s+(delete|create|config)',     # service control
-            r'net\s+(start|stop|user)',         # net commands
-            r'wmic\s+',                         # wmic
-            
-            # プロセス制御系
-            r'taskkill\s+.*(/f|/im)',          # force kill processes
-            r'tskill\s+',                       # tskill
-            r'stop-process\s+.*-force',         # PowerShell force stop
-            
-            # PowerShell危険系
-            r'powershell\s.*(-encodedcommand|-enc|-ep\s+bypass)', # encoded/bypass execution policy
-            r'invoke-expression\s*\(',          # Invoke-Expression
-            r'iex\s*\(',                        # iex alias
-            r'invoke-webrequest.*downloadfile', # file download
-            r'start-process\s+.*-windowstyle\s+hidden', # hidden process
-            
-            # スケジュール/自動実行系
-            r'schtasks\s+.*(/create|/delete)',  # scheduled tasks
-            r'at\s+\d+:\d+',                   # at command
-            
-            # ファイアウォール/セキュリティ系
-            r'netsh\s+advfirewall',            # firewall
-            r'netsh\s+firewall',               # legacy firewall
-            
-            # コマンドチェーン（危険な組み合わせ）
-            r'[;&|`]\s*(del|rmdir|rd|format|shutdown)', # command chaining
-            r'\|\s*(del|rmdir|rd|format)',     # pipe to dangerous commands
-            
-            # 隠蔽系
-            r'attrib\s+.*\+[hs]',              # hide files
-            r'icacls\s+.*(/deny|/remove)',     # permission manipulation
-            
-            # バッチ/スクリプト実行
-            r'cmd\s+/c\s+.*(\||&)',            # cmd /c with chaining
-            r'start\s+/min',                   # minimized start
-        ]
-        
-        import re
-        command_lower = command.lower()
-        
-        for pattern in dangerous_patterns:
-            if re.search(pattern, command_lower):
-                return False
+        # 危険なコマンドパターン（結合済みの正規表現で一度に照合）
+        if _DANGEROUS_CMD_RE.search(command.lower()):
+            return False
         
         # 基本的な文字検証（制御文字やnull文字を除外）
-        if any(ord(c) < 32 and c not in ['\t', '\n', '\r'] for c in command):
+        if _CONTROL_CHAR_RE.search(command):
             return False
             
         return True
@@ -6656,34 +7501,53 @@ F11   フルスクリーン                          F12     開発者ツール
                 if self._wait_for_scheduled_time(scheduled_time):
                     return  # 実行が中断された場合
             
-            self.update_status(f"🔧 コマンド実行中: {command[:50]}...")
+            self._post_ui("status", self.update_status, f"🔧 コマンド実行中: {command[:50]}...")
             
             if wait_completion:
-                # 完了を待つ場合
-                result = subprocess.run(
+                # 完了を待つ場合（停止操作とタイムアウトを短い間隔で確認しながら出力を回収）
+                proc = subprocess.Popen(
                     command,
                     shell=True,
-                    capture_output=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
                     text=True,
-                    timeout=timeout,
                     encoding='utf-8',
                     errors='replace'
                 )
-                
-                if result.returncode == 0:
-                    logger.info(f"cmdコマンド実行成功: command={command}, stdout={result.stdout}")
-                    if result.stdout.strip():
-                        messagebox.showinfo("コマンド実行結果", f"コマンド: {command[:50]}...\n\n実行結果:\n{result.stdout}")
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        stdout, stderr = proc.communicate(timeout=AppConfig.CMD_POLL_INTERVAL)
+                        break
+                    except subprocess.TimeoutExpired:
+                        if not self.running:
+                            proc.kill()
+                            proc.communicate()
+                            logger.info(f"cmdコマンド実行中断: command={command}")
+                            return
+                        if time.monotonic() >= deadline:
+                            proc.kill()
+                            proc.communicate()
+                            raise
+                returncode = proc.returncode
+                
+                if returncode == 0:
+                    logger.info(f"cmdコマンド実行成功: command={command}, stdout={stdout}")
+                    if stdout.strip():
+                        # 実行結果の表示はメインスレッドで行う（結果ごとに別スロットにして間引かれないようにする）
+                        self._post_ui(f"cmd_result:{time.monotonic_ns()}", messagebox.showinfo,
+                                      "コマンド実行結果", f"コマンド: {command[:50]}...\n\n実行結果:\n{stdout}")
                 else:
                     # よくあるエラーの場合はよりわかりやすいメッセージにする
-                    if "No such file or directory" in result.stderr or "cannot find" in result.stderr.lower():
-                        error_msg = f"ファイルまたはディレクトリが見つかりません\n\nコマンド: {command}\n\nエラー詳細:\n{result.stderr}"
-                    elif "command not found" in result.stderr.lower() or "is not recognized" in result.stderr.lower():
-                        error_msg = f"コマンドが見つかりません\n\nコマンド: {command}\n\nエラー詳細:\n{result.stderr}"
+                    stderr_lower = stderr.lower()
+                    if "No such file or directory" in stderr or "cannot find" in stderr_lower:
+                        error_msg = f"ファイルまたはディレクトリが見つかりません\n\nコマンド: {command}\n\nエラー詳細:\n{stderr}"
+                    elif "command not found" in stderr_lower or "is not recognized" in stderr_lower:
+                        error_msg = f"コマンドが見つかりません\n\nコマンド: {command}\n\nエラー詳細:\n{stderr}"
                     else:
-                        error_msg = f"コマンドが失敗しました (終了コード: {result.returncode})\n\nコマンド: {command}\n\nエラー詳細:\n{result.stderr}"
+                        error_msg = f"コマンドが失敗しました (終了コード: {returncode})\n\nコマンド: {command}\n\nエラー詳細:\n{stderr}"
                     
-                    logger.error(f"cmdコマンド実行失敗: command={command}, stderr={result.stderr}")
+                    logger.error(f"cmdコマンド実行失敗: command={command}, stderr={stderr}")
                     raise RuntimeError(error_msg)
             else:
                 # バックグラウンドで実行（完了を待たない）
@@ -6713,14 +7577,8 @@ F11   フルスクリーン                          F12     開発者ツール
             bool: True if execution was interrupted, False if continued
         """
         try:
-            # HH:MM:SS形式のパース
-            time_parts = scheduled_time.split(':')
-            if len(time_parts) != 3:
-                raise ValueError("時刻の形式が正しくありません。HH:MM:SS形式で入力してください。")
-            
-            target_hour = int(time_parts[0])
-            target_minute = int(time_parts[1])
-            target_second = int(time_parts[2])
+            # HH:MM:SS形式のパース（同じ文字列は読み込み時に解析済み）
+            target_hour, target_minute, target_second = parse_hms(scheduled_time)
             
             # 現在時刻取得
             now = datetime.now()
@@ -6736,28 +7594,39 @@ F11   フルスクリーン                          F12     開発者ツール
             logger.info(f"指定時刻まで待機: {wait_seconds}秒 (目標時刻: {target_today.strftime('%Y-%m-%d %H:%M:%S')})")
             
             # 待機中のステータス表示
-            self.update_status(f"⏰ {target_today.strftime('%H:%M:%S')}まで待機中...")
-            
-            # 1秒ごとにチェックしながら待機
-            remaining = int(wait_seconds)
-            while remaining > 0 and self.running:
-                if remaining % 60 == 0:  # 1分ごとにログ出力
-                    logger.info(f"実行待機中: 残り{remaining // 60}分{remaining % 60}秒")
+            self._post_ui("status", self.update_status, f"⏰ {target_today.strftime('%H:%M:%S')}まで待機中...")
+            
+            # 残り1分超は表示が分単位で切り替わる時点まで、以降は1秒ずつまとめて待機
+            deadline = time.monotonic() + wait_seconds
+            # 残り時間表示のテンプレート（1時間以上/未満）と直前の表示内容
+            status_fmt_hms = "⏰ 実行待機中... あと{:02d}:{:02d}:{:02d}"
+            status_fmt_ms = "⏰ 実行待機中... あと{:02d}:{:02d}"
+            last_status = None
+            while self.running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                remaining_seconds = math.ceil(remaining)
                 
-                # 残り時間を表示
-                hours = remaining // 3600
-                minutes = (remaining % 3600) // 60
-                seconds = remaining % 60
+                # 残り時間を表示（表示が変わる場合のみ）
+                hours = remaining_seconds // 3600
+                minutes = (remaining_seconds % 3600) // 60
+                seconds = remaining_seconds % 60
                 
                 if hours > 0:
-                    time_str = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+                    status = status_fmt_hms.format(hours, minutes, seconds)
                 else:
-                    time_str = f"{minutes:02d}:{seconds:02d}"
+                    status = status_fmt_ms.format(minutes, seconds)
                 
-                self.update_status(f"⏰ 実行待機中... あと{time_str}")
+                if status != last_status:
+                    last_status = status
+                    if seconds == 0:  # 1分ごとにログ出力（同じ残り時間では1回だけ）
+                        logger.info(f"実行待機中: 残り{remaining_seconds // 60}分{seconds}秒")
+                    self._post_ui("status", self.update_status, status)
                 
-                time.sleep(1)
-                remaining -= 1
+                chunk = remaining % 60 if remaining > 60 else remaining % 1
+                if self._stop_event.wait(chunk or 1.0):
+                    break
             
             # 実行が中断された場合
             if not self.running:
@@ -6775,100 +7644,63 @@ F11   フルスクリーン                          F12     開発者ツール
             raise RuntimeError(f"時間待機に失敗しました: {e}")
 
     def _execute_sleep(self, step: Step):
-        """スリープを実行"""
+        """スリープを実行（wait_typeに応じたハンドラへ振り分け、未知の値は秒数指定として扱う）"""
         params = step.params
         try:
-            wait_type = params.get("wait_type", "sleep")  # デフォルトはスリープ
-            
-            if wait_type == "scheduled":
-                # 時刻指定待機
-                scheduled_time = params.get("scheduled_time")
-                if scheduled_time:
-                    logger.info(f"時刻指定待機実行: scheduled_time={scheduled_time}")
-                    if self._wait_for_scheduled_time(scheduled_time):
-                        return  # 実行が中断された場合
-                    logger.info(f"時刻指定待機完了: scheduled_time={scheduled_time}")
-                else:
-                    logger.error("scheduled_timeパラメータが見つかりません")
-                    raise RuntimeError("時刻指定待機のパラメータが見つかりません")
-            else:
-                # デフォルトのスリープ（秒数指定）
-                seconds = float(params.get("seconds", 1.0))
-                logger.info(f"スリープ実行: seconds={seconds}")
-                time.sleep(seconds)
-                logger.info(f"スリープ完了: seconds={seconds}")
+            handler = self._sleep_handlers.get(params.get("wait_type", "sleep"), self._sleep_seconds)
+            handler(params)
         except Exception as e:
             logger.error(f"待機エラー: params={params}, error={str(e)}")
             raise RuntimeError(f"待機の実行に失敗しました: {e}")
 
+    def _sleep_scheduled(self, params: Dict[str, Any]):
+        """時刻指定待機"""
+        scheduled_time = params.get("scheduled_time")
+        if not scheduled_time:
+            logger.error("scheduled_timeパラメータが見つかりません")
+            raise RuntimeError("時刻指定待機のパラメータが見つかりません")
+        logger.info(f"時刻指定待機実行: scheduled_time={scheduled_time}")
+        if self._wait_for_scheduled_time(scheduled_time):
+            return  # 実行が中断された場合
+        logger.info(f"時刻指定待機完了: scheduled_time={scheduled_time}")
+
+    def _sleep_seconds(self, params: Dict[str, Any]):
+        """スリープ（秒数指定）"""
+        seconds = float(params.get("seconds", 1.0))
+        logger.info(f"スリープ実行: seconds={seconds}")
+        # 停止要求があれば待機途中でも即座に戻る
+        if self._stop_event.wait(seconds):
+            logger.info("スリープが中断されました")
+            return
+        logger.info(f"スリープ完了: seconds={seconds}")
+
     def analyze_error(self, error: Exception, step: Step, step_number: int) -> Dict[str, str]:
         """エラーを分析して詳細情報と対処法を提供"""
-        error_str = str(error).lower()
+        message = str(error)
+        message_lower = message.lower()
         error_type = type(error).__name__
         
         analysis = {
             "type": error_type,
-            "message": str(error),
+            "message": message,
             "step_info": f"行 {step_number}: {step.type}",
             "suggestion": "詳細ログを確認してください",
             "action": "retry"
         }
         
-        # 画像関連エラー
-        if "画像が見つかりません" in str(error):
-            analysis.update({
-                "category": "🔍 画像検索失敗",
-                "reason": "指定した画像が画面上に見つかりませんでした",
-                "suggestion": "• 画像の信頼度を下げる (推奨: 0.7-0.8)\n• 画像を再キャプチャする\n• 画面の状態を確認する",
-                "action": "adjust_threshold"
-            })
-        elif "ファイルの読み込みに失敗" in str(error):
-            analysis.update({
-                "category": "📁 ファイルエラー",
-                "reason": "画像ファイルが存在しないか、破損しています",
-                "suggestion": "• ファイルパスを確認する\n• 画像を再選択する\n• ファイル権限を確認する",
-                "action": "reselect_file"
-            })
-        # キー操作エラー  
-        elif "キー操作" in str(error):
-            analysis.update({
-                "category": "⌨ キーボードエラー",
-                "reason": "キー入力の実行に失敗しました",
-                "suggestion": "• キーの組み合わせを確認する\n• アプリケーションがアクティブか確認する\n• 短い待機時間を追加する",
-                "action": "check_focus"
-            })
-        # 座標エラー
-        elif "座標" in str(error) or "click" in error_str:
-            analysis.update({
-                "category": "🖱 マウスエラー", 
-                "reason": "マウス操作の実行に失敗しました",
-                "suggestion": "• 座標値を確認する\n• 画面解像度の変更がないか確認する\n• ウィンドウ位置を確認する",
-                "action": "recapture_coords"
-            })
-        # スクリーンショットエラー
-        elif "スクリーンショット" in str(error):
-            analysis.update({
-                "category": "📷 画面キャプチャエラー",
-                "reason": "画面のキャプチャに失敗しました",
-                "suggestion": "• モニター設定を確認する\n• アプリケーションを管理者権限で実行する\n• DPI設定を確認する",
-                "action": "check_permissions"
-            })
+        # 先頭から順に照合し、最初に一致した分類を適用
+        for needles, payload in _ERROR_RULES:
+            if any(needle in message_lower for needle in needles):
+                analysis.update(payload)
+                break
         
         return analysis
 
     def show_error_with_sound(self, title: str, message: str):
         """エラー音付きのエラーダイアログ表示"""
-        # エラー音を再生
-        try:
-            import winsound
-            winsound.PlaySound("SystemHand", winsound.SND_ALIAS)
-        except ImportError:
-            # winsoundが使えない場合はbeep音
-            try:
-                import os
-                os.system("echo \a")  # システムbeep音
-            except:
-                pass  # 音が出せない場合は無視
+        # エラー音を再生（winsoundが使えない場合はbeep音）
+        if not play_system_sound("SystemHand"):
+            console_bell()
         
         # メッセージボックスを最前面で表示
         self.root.attributes("-topmost", True)
@@ -6876,12 +7708,8 @@ F11   フルスクリーン                          F12     開発者ツール
     def show_completion_notification(self):
         """処理完了通知ダイアログ（通知音付き）"""
         try:
-            # 完了音を再生
-            try:
-                import winsound
-                # 成功音を1回再生
-                winsound.PlaySound("SystemAsterisk", winsound.SND_ALIAS)
-            except ImportError:
+            # 完了音を再生（成功音を1回）
+            if not play_system_sound("SystemAsterisk"):
                 # winsoundが使えない場合はbeep音
                 try:
                     self.root.bell()
@@ -6903,31 +7731,58 @@ F11   フルスクリーン                          F12     開発者ツール
     
     def show_error_dialog(self, analysis: Dict[str, str], step: Step, step_number: int):
         """詳細なエラーダイアログを表示"""
-        # エラー音を再生
-        try:
-            import winsound
-            winsound.PlaySound("SystemHand", winsound.SND_ALIAS)
-        except ImportError:
-            # winsoundが使えない場合はbeep音
-            try:
-                import os
-                os.system("echo \a")  # システムbeep音
-            except:
-                pass  # 音が出せない場合は無視
-        
-        dialog = tk.Toplevel(self.root)
-        dialog.title("🚨 実行エラー詳細")
-        dialog.configure(bg="#2b2b2b")
-        dialog.resizable(False, False)
-        dialog.grab_set()
-        
-        # メイン画面と同じモニターに配置
+        # エラー音を再生（winsoundが使えない場合はbeep音）
+        if not play_system_sound("SystemHand"):
+            console_bell()
+        
+        # ウィジェットは初回のみ構築し、以降は非表示のまま内容を差し替えて再表示する
+        widgets = self._error_dialog_cache
+        if widgets is None or not widgets["dialog"].winfo_exists():
+            widgets = self._error_dialog_cache = self._build_error_dialog()
+        dialog = widgets["dialog"]
+        widgets["step"] = step
+        widgets["step_number"] = step_number
+        widgets["category"].config(text=analysis.get("category", "❌ エラー"))
+        widgets["step_info"].config(text=f"📍 {analysis['step_info']}")
+        # Textウィジェットは再利用し、内容が前回と異なる場合のみ書き換える
+        contents = widgets["contents"]
+        for key, content in (("reason", analysis.get("reason", "不明なエラーが発生しました")),
+                             ("solution", analysis.get("suggestion", "ログファイルを確認してください"))):
+            if contents.get(key) != content:
+                self._set_readonly_text(widgets[key], content)
+                contents[key] = content
+        
+        # メイン画面と同じモニターに配置（配置と表示を一度に行う）
         AppConfig.position_window_on_main_monitor(dialog, self.root, 500, 450)
+        dialog.grab_set()
         
         # ウィンドウを最前面に表示
         dialog.attributes("-topmost", True)
         dialog.focus_force()
         dialog.lift()
+
+    @staticmethod
+    def _set_readonly_text(text_widget: tk.Text, content: str):
+        """読み取り専用Textの内容を差し替え"""
+        text_widget.config(state="normal")
+        text_widget.delete("1.0", "end")
+        text_widget.insert("1.0", content)
+        text_widget.config(state="disabled")
+
+    def _hide_error_dialog(self, dialog: tk.Toplevel):
+        """エラーダイアログを破棄せずに隠す（次回のエラー表示で再利用）"""
+        dialog.grab_release()
+        dialog.withdraw()
+
+    def _build_error_dialog(self) -> Dict[str, Any]:
+        """エラー詳細ダイアログのウィジェットを非表示で構築し、差し替え対象を返す"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("🚨 実行エラー詳細")
+        dialog.configure(bg="#2b2b2b")
+        dialog.resizable(False, False)
+        dialog.withdraw()
+        dialog.protocol("WM_DELETE_WINDOW", lambda: self._hide_error_dialog(dialog))
+        widgets = {"dialog": dialog, "step": None, "step_number": 0, "contents": {}}
         
         main_frame = tk.Frame(dialog, bg="#2b2b2b")
         main_frame.pack(fill="both", expand=True, padx=20, pady=20)
@@ -6935,12 +7790,13 @@ F11   フルスクリーン                          F12     開発者ツール
         # エラーカテゴリ
         title_label = tk.Label(
             main_frame,
-            text=analysis.get("category", "❌ エラー"),
+            text="",
             font=("Meiryo UI", 16, "bold"),
             fg="#ff6b6b",
             bg="#2b2b2b"
         )
         title_label.pack(anchor="w", pady=(0, 10))
+        widgets["category"] = title_label
         
         # ステップ情報
         step_frame = tk.Frame(main_frame, bg="#3c3c3c", relief="groove", bd=1)
@@ -6948,12 +7804,13 @@ F11   フルスクリーン                          F12     開発者ツール
         
         step_info_label = tk.Label(
             step_frame,
-            text=f"📍 {analysis['step_info']}",
+            text="",
             font=("Meiryo UI", 10, "bold"),
             fg="#ffd93d", 
             bg="#3c3c3c"
         )
         step_info_label.pack(anchor="w", padx=10, pady=5)
+        widgets["step_info"] = step_info_label
         
         # エラー詳細
         details_frame = tk.Frame(main_frame, bg="#2b2b2b")
@@ -6981,8 +7838,7 @@ F11   フルスクリーン                          F12     開発者ツール
             pady=5
         )
         reason_text.pack(fill="x", pady=(0, 10))
-        reason_text.insert("1.0", analysis.get("reason", "不明なエラーが発生しました"))
-        reason_text.config(state="disabled")
+        widgets["reason"] = reason_text
         
         # 対処法
         solution_label = tk.Label(
@@ -7006,8 +7862,7 @@ F11   フルスクリーン                          F12     開発者ツール
             pady=5
         )
         solution_text.pack(fill="both", expand=True, pady=(0, 10))
-        solution_text.insert("1.0", analysis.get("suggestion", "ログファイルを確認してください"))
-        solution_text.config(state="disabled")
+        widgets["solution"] = solution_text
         
         # ボタンフレーム
         button_frame = tk.Frame(main_frame, bg="#2b2b2b")
@@ -7017,7 +7872,7 @@ F11   フルスクリーン                          F12     開発者ツール
         edit_btn = tk.Button(
             button_frame,
             text="✏ 設定を編集",
-            command=lambda: self.edit_step_from_error(step, step_number, dialog),
+            command=lambda: self.edit_step_from_error(widgets["step"], widgets["step_number"], dialog),
             font=("Meiryo UI", 10, "bold"),
             bg="#495057",
             fg="white",
@@ -7031,7 +7886,7 @@ F11   フルスクリーン                          F12     開発者ツール
         close_btn = tk.Button(
             button_frame,
             text="❌ 閉じる",
-            command=dialog.destroy,
+            command=lambda: self._hide_error_dialog(dialog),
             font=("Meiryo UI", 10, "bold"),
             bg="#6c757d",
             fg="white",
@@ -7041,10 +7896,12 @@ F11   フルスクリーン                          F12     開発者ツール
             cursor="hand2"
         )
         close_btn.pack(side="right")
+        
+        return widgets
 
     def edit_step_from_error(self, step: Step, step_number: int, dialog: tk.Toplevel):
         """エラーダイアログからステップ編集"""
-        dialog.destroy()
+        self._hide_error_dialog(dialog)
         # 該当ステップを選択
         children = self.tree.get_children()
         if step_number - 1 < len(children):
@@ -7055,16 +7912,34 @@ F11   フルスクリーン                          F12     開発者ツール
             self.edit_selected_step()
 
     
+    def _snapshot_steps(self) -> Tuple[Step, ...]:
+        """ステップ一覧のスナップショット（Stepは参照のみ保持するコピーオンライト方式）
+        
+        Stepを変更する箇所は必ず_detach_stepで複製に差し替えてから書き換えるため、
+        履歴側のStepは変更されない。
+        """
+        return tuple(self.steps)
+
+    def _detach_step(self, index: int) -> Step:
+        """Undo履歴と共有しない複製に差し替えて返す（Stepをその場で変更する前に呼ぶ）"""
+        step = self.steps[index].copy_for_write()
+        self.steps[index] = step
+        return step
+
+    def _make_state(self, action_description: str) -> dict:
+        """Undo/Redo用の状態を作成"""
+        return {
+            'id': uuid.uuid4().hex,
+            'timestamp': datetime.now().isoformat(),
+            'action': action_description,
+            'steps': self._snapshot_steps(),
+            'monitor_index': self.monitor_var.get()
+        }
+    
     def save_state(self, action_description: str):
         """現在の状態をUndo stackに保存"""
         try:
-            state = {
-                'id': str(uuid.uuid4()),
-                'timestamp': datetime.now().isoformat(),
-                'action': action_description,
-                'steps': [asdict(step) for step in self.steps],
-                'monitor_index': self.monitor_var.get()
-            }
+            state = self._make_state(action_description)
             
             # 新しい操作が行われた場合、redo stackをクリア
             self.redo_stack.clear()
@@ -7087,13 +7962,7 @@ F11   フルスクリーン                          F12     開発者ツール
                 return
                 
             # 現在の状態をredo stackに保存
-            current_state = {
-                'id': str(uuid.uuid4()),
-                'timestamp': datetime.now().isoformat(),
-                'action': 'Current State',
-                'steps': [asdict(step) for step in self.steps],
-                'monitor_index': self.monitor_var.get()
-            }
+            current_state = self._make_state('Current State')
             self.redo_stack.append(current_state)
             
             # 前の状態を復元
@@ -7117,13 +7986,7 @@ F11   フルスクリーン                          F12     開発者ツール
                 return
                 
             # 現在の状態をundo stackに保存
-            current_state = {
-                'id': str(uuid.uuid4()),
-                'timestamp': datetime.now().isoformat(),
-                'action': 'Current State',
-                'steps': [asdict(step) for step in self.steps],
-                'monitor_index': self.monitor_var.get()
-            }
+            current_state = self._make_state('Current State')
             self.undo_stack.append(current_state)
             
             # 次の状態を復元
@@ -7142,16 +8005,8 @@ F11   フルスクリーン                          F12     開発者ツール
     def restore_state(self, state: dict):
         """指定した状態を復元"""
         try:
-            # ステップリストを復元
-            self.steps.clear()
-            for step_dict in state['steps']:
-                step = Step(
-                    step_dict['type'],
-                    step_dict['params'],
-                    step_dict['comment'],
-                    step_dict.get('enabled', True)
-                )
-                self.steps.append(step)
+            # ステップリストを復元（Stepは履歴と共有し、変更時に_detach_stepで複製する）
+            self.steps[:] = state['steps']
             
             # モニター選択を復元
             self.monitor_var.set(state['monitor_index'])
@@ -7168,10 +8023,20 @@ F11   フルスクリーン                          F12     開発者ツール
 class MouseCoordinateDialog:
     """マウス座標選択ダイアログ（リアルタイム表示対応）"""
     
+    # マウス移動イベントをまとめて表示に反映する間隔（ミリ秒、約30Hz）
+    POSITION_UPDATE_INTERVAL_MS = 33
+    # pynput無しの警告を出力済みか（プロセス内で1回だけ出す）
+    _right_click_warning_logged = False
+    
     def __init__(self, parent: tk.Tk, title: str = "座標選択"):
         self.parent = parent
         self.selected_coordinates = None
         self.tracking = False
+        # pynputの移動イベントで受け取った最新位置と、表示反映の予約状態
+        self._pending_position = None
+        self._position_update_scheduled = False
+        # 最後に表示へ反映した座標
+        self._last_xy = None
         
         self.dialog = tk.Toplevel(parent)
         self.dialog.title(title)
@@ -7197,8 +8062,9 @@ class MouseCoordinateDialog:
     def center_window(self):
         """ウィンドウをスクリーン中央に配置"""
         self.dialog.update_idletasks()
-        x = (self.dialog.winfo_screenwidth() // 2) - (self.dialog.winfo_width() // 2)
-        y = (self.dialog.winfo_screenheight() // 2) - (self.dialog.winfo_height() // 2)
+        screen_width, screen_height = get_screen_size(self.dialog)
+        x = (screen_width // 2) - (self.dialog.winfo_width() // 2)
+        y = (screen_height // 2) - (self.dialog.winfo_height() // 2)
         self.dialog.geometry(f'+{x}+{y}')
     
     def setup_ui(self):
@@ -7342,10 +8208,14 @@ class MouseCoordinateDialog:
             # 透明度が使えない場合はそのまま
             pass
         
-        # リアルタイム座標更新を開始
-        self.update_position()
+        # 現在位置を表示（以降はマウス移動イベントで更新）。手入力後でも必ず上書きする
+        self._last_xy = None
+        try:
+            self._apply_position(*pyautogui.position())
+        except Exception:
+            pass
         
-        # グローバル右クリック監視を開始
+        # グローバル右クリック・移動監視を開始
         self.start_global_click_detection()
     
     def stop_tracking(self):
@@ -7366,19 +8236,30 @@ class MouseCoordinateDialog:
         # グローバルクリック監視を停止
         self.stop_global_click_detection()
     
+    def _apply_position(self, x: int, y: int):
+        """座標表示とエントリーフィールドを更新（前回と同じ座標なら何もしない）"""
+        if (x, y) == self._last_xy:
+            return
+        self._last_xy = (x, y)
+        self.position_display.configure(text=f"X: {x:4d} , Y: {y:4d}")
+        self.x_entry.delete(0, "end")
+        self.x_entry.insert(0, str(x))
+        self.y_entry.delete(0, "end") 
+        self.y_entry.insert(0, str(y))
+    
+    def _apply_pending_position(self):
+        """移動イベントで溜まった最新位置を反映（メインスレッド）"""
+        self._position_update_scheduled = False
+        position = self._pending_position
+        if self.tracking and position is not None:
+            self._apply_position(*position)
+    
     def update_position(self):
-        """マウス位置を更新"""
+        """マウス位置を更新（フォールバック：pynput無しの場合に50ms間隔でポーリング）"""
         if self.tracking:
             try:
                 # マウスの現在位置を取得
-                x, y = pyautogui.position()
-                self.position_display.configure(text=f"X: {x:4d} , Y: {y:4d}")
-                
-                # エントリーフィールドも更新
-                self.x_entry.delete(0, "end")
-                self.x_entry.insert(0, str(x))
-                self.y_entry.delete(0, "end") 
-                self.y_entry.insert(0, str(y))
+                self._apply_position(*pyautogui.position())
                 
                 # 50ms後に再実行
                 self.dialog.after(50, self.update_position)
@@ -7394,8 +8275,7 @@ class MouseCoordinateDialog:
                 self.stop_tracking()
                 
                 # 確定音（Windowsシステムサウンド）
-                import winsound
-                winsound.MessageBeep(winsound.MB_OK)
+                beep_async("MB_OK")
                 
                 messagebox.showinfo("座標確定", f"座標が確定されました:\nX: {x}, Y: {y}")
             except Exception as e:
@@ -7422,8 +8302,8 @@ class MouseCoordinateDialog:
     
     def start_global_click_detection(self):
         """グローバル右クリック検出を開始"""
-        try:
-            import pynput.mouse as mouse
+        if PYNPUT_AVAILABLE:
+            mouse = pynput_mouse
             
             def on_click(x, y, button, pressed):
                 if pressed and button == mouse.Button.right and self.tracking:
@@ -7434,13 +8314,19 @@ class MouseCoordinateDialog:
                     self.dialog.after(0, lambda: self.on_right_click_detected(x, y))
                     return False  # リスナーを停止
             
-            # 右クリックリスナーを開始
-            self.mouse_listener = mouse.Listener(on_click=on_click)
-            self.mouse_listener.start()
+            def on_move(x, y):
+                # 最新位置だけを保持し、表示反映は一定間隔で1回にまとめる（静止中は何もしない）
+                self._pending_position = (x, y)
+                if self.tracking and not self._position_update_scheduled:
+                    self._position_update_scheduled = True
+                    self.dialog.after(self.POSITION_UPDATE_INTERVAL_MS, self._apply_pending_position)
             
-        except ImportError:
-            # pynputが無い場合はフォールバック
-            # pynputが無い場合はフォールバック
+            # 右クリック・移動リスナーを開始
+            self.mouse_listener = mouse.Listener(on_click=on_click, on_move=on_move)
+            self.mouse_listener.start()
+        else:
+            # pynputが無い場合は座標をポーリングで更新
+            self.update_position()
             self.check_for_right_click()
     
     def stop_global_click_detection(self):
@@ -7454,28 +8340,23 @@ class MouseCoordinateDialog:
     
     def on_right_click_detected(self, x, y):
         """右クリックが検出された時の処理"""
-        self.position_display.configure(text=f"X: {x:4d} , Y: {y:4d}")
-        self.x_entry.delete(0, "end")
-        self.x_entry.insert(0, str(x))
-        self.y_entry.delete(0, "end") 
-        self.y_entry.insert(0, str(y))
+        self._apply_position(x, y)
         
         self.stop_tracking()
         
         # 確定音
-        try:
-            import winsound
-            winsound.MessageBeep(winsound.MB_OK)
-        except:
-            pass
+        beep_async("MB_OK")
             
         messagebox.showinfo("座標確定", f"右クリックで座標が確定されました:\nX: {x}, Y: {y}", parent=self.dialog)
     
     def check_for_right_click(self):
-        """フォールバック：定期的に右クリックをチェック（pynput無しの場合）"""
-        if self.tracking:
-            # 簡易的な実装：実際には完全ではないが参考用
-            self.dialog.after(100, self.check_for_right_click)
+        """フォールバック（pynput無しの場合）：右クリック自動確定は使えないため警告のみ行う
+        
+        座標は「OK」ボタンで手動確定する。
+        """
+        if not MouseCoordinateDialog._right_click_warning_logged:
+            MouseCoordinateDialog._right_click_warning_logged = True
+            logger.warning("pynput未インストール: 右クリック自動確定は無効です（OKボタンで確定してください）")
 
     def close_dialog(self):
         """ダイアログを安全に閉じる"""
@@ -7491,45 +8372,92 @@ class MouseCoordinateDialog:
 class EnhancedImageDialog:
     """画像選択の拡張ダイアログ（クリップボード対応）"""
     
+    # ダイアログの初期サイズ (幅, 高さ)
+    DIALOG_SIZE = (700, 600)
+    # 配色とフォント（ウィジェットごとに書かず、ここで一括定義）
+    BG_COLOR = "#2b2b2b"
+    PANEL_BG_COLOR = "#3c3c3c"
+    FONT_TITLE = ("Meiryo UI", 14, "bold")
+    FONT_SECTION = ("Meiryo UI", 11, "bold")
+    FONT_BUTTON = ("Meiryo UI", 10, "bold")
+    FONT_HINT = ("Meiryo UI", 11)
+    FONT_BODY = ("Meiryo UI", 10)
+    # プレビューのサムネイルサイズと、縮小済みサムネイルのディスクキャッシュ
+    PREVIEW_SIZE = (150, 80)
+    THUMB_CACHE_DIR = Path("temp") / "thumbs"
+    # サムネイルキャッシュの保持件数（超えた分は古い順に削除）
+    THUMB_CACHE_MAX_FILES = 200
+    # サムネイルキャッシュの整理はプロセスごとに1回だけ行う
+    _thumb_cache_pruned = False
+    # 貼り付けたクリップボード画像の保存先
+    CLIPBOARD_TEMP_DIR = Path("temp")
+    # クリップボード取得の再試行間隔（秒、初回は待たない）
+    CLIPBOARD_RETRY_DELAYS = (0, 0.03, 0.08, 0.16)
+    # クリップボードのファイル一覧から受け付ける拡張子（ファイル選択ダイアログと同じ）
+    IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tiff"})
+    
     def __init__(self, parent: tk.Tk, title: str = "画像選択"):
         self.parent = parent
         self.selected_path = None
         self.preview_label = None  # 明示的に初期化
         self.paste_area = None     # 明示的に初期化
         self.paste_label = None    # 明示的に初期化
+        # スクロール更新のアイドル処理が予約済みか
+        self._scroll_refresh_pending = False
+        # 未反映のホイール移動量（delta単位）と、反映処理の予約状態
+        self._wheel_accum = 0
+        self._wheel_scheduled = False
+        # クリップボード取得中フラグと、取得中表示の前のラベル文言
+        self._paste_in_progress = False
+        self._paste_label_text = ""
+        # サムネイルキャッシュが増え続けないよう、最初のダイアログ表示時に整理
+        if not EnhancedImageDialog._thumb_cache_pruned:
+            EnhancedImageDialog._thumb_cache_pruned = True
+            self._prune_thumb_cache()
+        # 貼り付けごとにmkdirしないよう、保存先はダイアログ作成時に1回だけ用意
+        try:
+            self.CLIPBOARD_TEMP_DIR.mkdir(exist_ok=True)
+        except OSError as e:
+            logger.error(f"一時フォルダ作成エラー: {e}")
         
         self.dialog = tk.Toplevel(parent)
+        # 構築中は非表示にし、ウィジェットごとのレイアウト・再描画を表示時の1回にまとめる
+        self.dialog.withdraw()
         self.dialog.title(title)
-        self.dialog.configure(bg="#2b2b2b")
+        self.dialog.configure(bg=self.BG_COLOR)
         self.dialog.resizable(True, True)
         self.dialog.minsize(500, 400)
         self.dialog.transient(parent)
-        self.dialog.grab_set()
-        
-        # メイン画面と同じモニターに配置
-        AppConfig.position_window_on_main_monitor(self.dialog, parent, 700, 600)
         
         # UIを構築
         self.setup_ui()
         
+        # メイン画面と同じモニターに配置（ここで初めて表示される）
+        AppConfig.position_window_on_main_monitor(self.dialog, parent, *self.DIALOG_SIZE)
+        # grabは表示後に設定（非表示ウィンドウへのgrabは失敗するため）
+        self.dialog.grab_set()
+        
         # ESCキーで閉じる
         self.dialog.bind('<Escape>', lambda e: self.dialog.destroy())
+        # 閉じたらプレビュー画像を解放
+        self.dialog.bind('<Destroy>', self._on_dialog_destroy, add='+')
     
     def center_window(self):
         """ウィンドウをスクリーン中央に配置"""
         self.dialog.update_idletasks()
-        x = (self.dialog.winfo_screenwidth() // 2) - (self.dialog.winfo_width() // 2)
-        y = (self.dialog.winfo_screenheight() // 2) - (self.dialog.winfo_height() // 2)
+        screen_width, screen_height = get_screen_size(self.dialog)
+        x = (screen_width // 2) - (self.dialog.winfo_width() // 2)
+        y = (screen_height // 2) - (self.dialog.winfo_height() // 2)
         self.dialog.geometry(f'+{x}+{y}')
     
     def setup_ui(self):
         """UIを構築（スクロール対応＋固定ボタン）"""
         # メインコンテナ
-        container = tk.Frame(self.dialog, bg="#2b2b2b")
+        container = tk.Frame(self.dialog, bg=self.BG_COLOR)
         container.pack(fill="both", expand=True, padx=20, pady=20)
         
         # ボタンフレーム（最下部に固定）
-        button_frame = tk.Frame(container, bg="#2b2b2b")
+        button_frame = tk.Frame(container, bg=self.BG_COLOR)
         button_frame.pack(side="bottom", fill="x", pady=(10, 0))
         
         # ttk.Buttonに変更して統一感を向上
@@ -7552,10 +8480,10 @@ class EnhancedImageDialog:
         cancel_btn.pack(side="right")
         
         # スクロール可能なメインコンテンツエリア
-        canvas = tk.Canvas(container, bg="#2b2b2b", highlightthickness=0)
+        canvas = tk.Canvas(container, bg=self.BG_COLOR, highlightthickness=0)
         scrollbar = ttk.Scrollbar(container, orient="vertical", command=canvas.yview, style='Modern.Vertical.TScrollbar')
         
-        main_frame = tk.Frame(canvas, bg="#2b2b2b")
+        main_frame = tk.Frame(canvas, bg=self.BG_COLOR)
         
         # スクロール領域の設定
         def configure_scroll_region(event=None):
@@ -7583,8 +8511,8 @@ class EnhancedImageDialog:
         
         def configure_canvas_window(event):
             canvas.itemconfig(canvas_window, width=event.width)
-            # キャンバスサイズ変更時にスクロール領域も再計算
-            container.after_idle(configure_scroll_region)
+            # キャンバスサイズ変更時にスクロール領域も再計算（連続したリサイズは1回にまとめる）
+            self.schedule_scroll_refresh()
         
         canvas.bind("<Configure>", configure_canvas_window)
         canvas.configure(yscrollcommand=scrollbar.set)
@@ -7606,25 +8534,56 @@ class EnhancedImageDialog:
         # 初期チェック
         container.after(100, check_scrollbar_visibility)
         
+        # スクロール領域の再計算→スクロールバー表示判定を1回のアイドル処理にまとめる（重複要求は1回に集約）
+        def refresh_scroll():
+            self._scroll_refresh_pending = False
+            configure_scroll_region()
+            check_scrollbar_visibility()
+        
+        def schedule_scroll_refresh():
+            if not self._scroll_refresh_pending:
+                self._scroll_refresh_pending = True
+                container.after_idle(refresh_scroll)
+        
         # インスタンス変数として保存（後から呼び出せるように）
         self.check_scrollbar_visibility = check_scrollbar_visibility
         self.configure_scroll_region = configure_scroll_region
+        self.schedule_scroll_refresh = schedule_scroll_refresh
+        
+        # マウスホイールスクロール対応（イベントごとに再描画せず、移動量を貯めてアイドル時に1回だけスクロール）
+        def flush_wheel():
+            self._wheel_scheduled = False
+            # 1ノッチ(120)未満の端数は次回に持ち越す（高精度タッチパッド対策）
+            units = int(self._wheel_accum / 120)
+            if units:
+                self._wheel_accum -= units * 120
+                canvas.yview_scroll(-units, "units")
+        
+        def queue_wheel(delta):
+            self._wheel_accum += delta
+            if not self._wheel_scheduled:
+                self._wheel_scheduled = True
+                container.after_idle(flush_wheel)
         
-        # マウスホイールスクロール対応
         def on_mousewheel(event):
-            canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+            if event.num == 4:  # Linux 上スクロール
+                queue_wheel(120)
+            elif event.num == 5:  # Linux 下スクロール
+                queue_wheel(-120)
+            else:  # Windows
+                queue_wheel(event.delta)
         
         canvas.bind("<MouseWheel>", on_mousewheel)  # Windows
-        canvas.bind("<Button-4>", lambda e: canvas.yview_scroll(-1, "units"))  # Linux
-        canvas.bind("<Button-5>", lambda e: canvas.yview_scroll(1, "units"))   # Linux
+        canvas.bind("<Button-4>", on_mousewheel)  # Linux
+        canvas.bind("<Button-5>", on_mousewheel)  # Linux
         
         # タイトル
         title_label = tk.Label(
             main_frame,
             text="📷 画像を選択してください",
-            font=("Meiryo UI", 14, "bold"),
+            font=self.FONT_TITLE,
             fg="#74c0fc",
-            bg="#2b2b2b"
+            bg=self.BG_COLOR
         )
         title_label.pack(pady=(0, 20))
         
@@ -7634,23 +8593,23 @@ class EnhancedImageDialog:
             text="📋 簡単な使い方:\n" +
                  "1️⃣ Shift+Win+S → 画面範囲選択 → Ctrl+V で貼り付け\n" +
                  "2️⃣ または下の「ファイルを選択」ボタンからファイル選択",
-            font=("Meiryo UI", 10),
+            font=self.FONT_BODY,
             fg="#ffffff",
-            bg="#2b2b2b",
+            bg=self.BG_COLOR,
             justify="left"
         )
         description_label.pack(pady=(0, 15))
         
         # ファイル選択エリア
-        file_frame = tk.Frame(main_frame, bg="#3c3c3c", relief="groove", bd=1)
+        file_frame = tk.Frame(main_frame, bg=self.PANEL_BG_COLOR, relief="groove", bd=1)
         file_frame.pack(fill="x", pady=(0, 15))
         
         file_label = tk.Label(
             file_frame,
             text="📁 ファイルから選択:",
-            font=("Meiryo UI", 11, "bold"),
+            font=self.FONT_SECTION,
             fg="#51cf66",
-            bg="#3c3c3c"
+            bg=self.PANEL_BG_COLOR
         )
         file_label.pack(anchor="w", padx=10, pady=(10, 5))
         
@@ -7658,7 +8617,7 @@ class EnhancedImageDialog:
             file_frame,
             text="📂 ファイルを選択...",
             command=self.select_file,
-            font=("Meiryo UI", 10, "bold"),
+            font=self.FONT_BUTTON,
             bg="#0d7377",
             fg="white",
             relief="flat",
@@ -7669,22 +8628,22 @@ class EnhancedImageDialog:
         file_btn.pack(pady=(0, 10))
         
         # クリップボード貼り付けエリア（拡大制限）
-        clipboard_frame = tk.Frame(main_frame, bg="#3c3c3c", relief="groove", bd=1)
+        clipboard_frame = tk.Frame(main_frame, bg=self.PANEL_BG_COLOR, relief="groove", bd=1)
         clipboard_frame.pack(fill="x", pady=(0, 15))
         
         clipboard_label = tk.Label(
             clipboard_frame,
             text="📋 クリップボードから貼り付け:",
-            font=("Meiryo UI", 11, "bold"),
+            font=self.FONT_SECTION,
             fg="#ffd93d",
-            bg="#3c3c3c"
+            bg=self.PANEL_BG_COLOR
         )
         clipboard_label.pack(anchor="w", padx=10, pady=(10, 5))
         
         # 貼り付けエリア（ドロップゾーン風）
         self.paste_area = tk.Frame(
             clipboard_frame,
-            bg="#2b2b2b",
+            bg=self.BG_COLOR,
             relief="groove",  # dashedをgrooveに変更
             bd=2,
             height=120  # 高さを少し減らす
@@ -7696,9 +8655,9 @@ class EnhancedImageDialog:
             text="🖼️ ここで Ctrl+V を押してください\n\n" +
                  "💡 Shift+Win+S で範囲選択した直後に\n" +
                  "   このダイアログで Ctrl+V を押すだけ！",
-            font=("Meiryo UI", 11),
+            font=self.FONT_HINT,
             fg="#adb5bd",
-            bg="#2b2b2b"
+            bg=self.BG_COLOR
         )
         self.paste_label.pack(expand=True)
         
@@ -7734,55 +8693,87 @@ class EnhancedImageDialog:
             self.show_error_dialog("エラー", f"ファイル選択に失敗しました:\n{e}", parent=self.dialog)
     
     def paste_from_clipboard(self, event=None):
-        """クリップボードから画像を貼り付け"""
+        """クリップボードから画像を貼り付け（取得と保存はワーカースレッドで行いUIを止めない）"""
+        if self._paste_in_progress:
+            return
+        self._paste_in_progress = True
+        if self.paste_label is not None:
+            self._paste_label_text = self.paste_label.cget("text")
+            self.paste_label.configure(text="⏳ 貼り付け中...")
+        threading.Thread(target=self._grab_clipboard_worker, daemon=True).start()
+
+    def _grab_clipboard_worker(self):
+        """クリップボード画像を取得して一時ファイルに保存し、プレビュー用サムネイルも作成（ワーカースレッド）"""
+        temp_path, thumbnail, error = None, None, None
         try:
-            # クリップボード貼り付け開始
-            
-            # Pillowを使ってクリップボードから画像を取得
-            from PIL import ImageGrab
-            
-            clipboard_image = ImageGrab.grabclipboard()
-            # クリップボード画像取得
-            
-            if clipboard_image is None:
-                # クリップボードに画像なし
-                messagebox.showwarning(
-                    "警告", 
-                    "クリップボードに画像がありません。\n\n" +
-                    "1. Shift+Win+S でスクリーンショットを撮影\n" +
-                    "2. 範囲を選択\n" +
-                    "3. このダイアログで Ctrl+V を押してください",
-                    parent=self.dialog
-                )
-                return
-            
-            # 画像サイズ的取
-            
-            # 一時ファイルに保存
-            temp_dir = Path("temp")
-            temp_dir.mkdir(exist_ok=True)
-            
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_path = temp_dir / f"clipboard_image_{timestamp}.png"
-            
-            # 一時ファイルに保存
-            clipboard_image.save(temp_path, "PNG")
-            self.selected_path = str(temp_path)
-            
-            # プレビュー表示開始
-            self.show_preview(str(temp_path), "クリップボード")
-            
-            # 貼り付け処理完了
+            # Pillow(ImageGrab)を使ってクリップボードから画像を取得
+            # 大きな画像はクリップボード側の準備が間に合わずNoneになることがあるため、間隔を広げて再試行
+            clipboard_image = None
+            for delay in self.CLIPBOARD_RETRY_DELAYS:
+                if delay:
+                    time.sleep(delay)
+                clipboard_image = ImageGrab.grabclipboard()
+                if clipboard_image is not None:
+                    break
             
-        except ImportError as e:
-            logger.error(f"PIL/Pillow ImportError: {e}")
-            self.show_error_dialog("エラー", "PIL/Pillowが必要です。\npip install Pillow でインストールしてください。", parent=self.dialog)
+            if isinstance(clipboard_image, list):
+                # エクスプローラーでファイルをコピーした場合はパスの一覧が返るため、画像ファイルをそのまま使う
+                temp_path = next(
+                    (path for path in clipboard_image
+                     if os.path.splitext(path)[1].lower() in self.IMAGE_EXTENSIONS and os.path.isfile(path)),
+                    None
+                )
+            elif clipboard_image is not None:
+                # 一時ファイルに保存（同じ秒に続けて貼り付けても上書きしないようナノ秒で命名）
+                temp_path = str(self.CLIPBOARD_TEMP_DIR / f"clipboard_image_{time.time_ns()}.png")
+                # テンプレート照合に使うため可逆のPNGのまま、圧縮は最速レベルにする
+                clipboard_image.save(temp_path, "PNG", compress_level=1)
+                # 保存済みPNGを読み直さず、メモリ上の画像からそのままサムネイルを作る
+                try:
+                    thumbnail = make_thumbnail(clipboard_image, self.PREVIEW_SIZE)
+                except Exception as e:
+                    logger.debug(f"クリップボードサムネイル作成エラー（ファイルから再作成します）: {e}")
         except Exception as e:
-            logger.error(f"クリップボード貼り付けエラー: {e}")
-            self.show_error_dialog("エラー", f"クリップボードからの貼り付けに失敗しました:\n{e}", parent=self.dialog)
+            error = e
+        
+        # 結果の反映はメインスレッドで行う（ダイアログが閉じられていれば何もしない）
+        try:
+            self.dialog.after(0, self._on_clipboard_grabbed, temp_path, thumbnail, error)
+        except (tk.TclError, RuntimeError):
+            pass
+
+    def _on_clipboard_grabbed(self, temp_path: Optional[str], thumbnail: Optional["Image.Image"],
+                              error: Optional[Exception]):
+        """クリップボード画像の取得結果を反映（メインスレッド）"""
+        self._paste_in_progress = False
+        if not self.dialog.winfo_exists():
+            return
+        if temp_path is None and self.paste_label is not None:
+            self.paste_label.configure(text=self._paste_label_text)
+        
+        if isinstance(error, ImportError):
+            logger.error(f"PIL/Pillow ImportError: {error}")
+            self.show_error_dialog("エラー", "PIL/Pillowが必要です。\npip install Pillow でインストールしてください。", parent=self.dialog)
+        elif error is not None:
+            logger.error(f"クリップボード貼り付けエラー: {error}")
+            self.show_error_dialog("エラー", f"クリップボードからの貼り付けに失敗しました:\n{error}", parent=self.dialog)
+        elif temp_path is None:
+            # クリップボードに画像なし
+            messagebox.showwarning(
+                "警告", 
+                "クリップボードに画像がありません。\n\n" +
+                "1. Shift+Win+S でスクリーンショットを撮影\n" +
+                "2. 範囲を選択\n" +
+                "3. このダイアログで Ctrl+V を押してください",
+                parent=self.dialog
+            )
+        else:
+            self.selected_path = temp_path
+            # プレビュー表示
+            self.show_preview(temp_path, "クリップボード", thumbnail)
     
-    def show_preview(self, image_path: str, source: str):
-        """画像プレビューを表示"""
+    def show_preview(self, image_path: str, source: str, thumbnail: Optional["Image.Image"] = None):
+        """画像プレビューを表示（thumbnailがあればファイルを読み直さずにそれを表示）"""
         try:
             # プレビュー表示開始
             
@@ -7792,24 +8783,23 @@ class EnhancedImageDialog:
                 self.show_error_dialog("エラー", "UIの初期化に失敗しました", parent=self.dialog)
                 return
             
-            # 既存のプレビューを削除
-            if hasattr(self, 'preview_label') and self.preview_label:
-                # 既存プレビューラベル削除
-                self.preview_label.destroy()
+            # 既存のプレビューを削除（次の画像を読み込む前に古い画像データを解放）
+            self._release_preview()
             
-            # 画像を読み込み
-            pil_image = Image.open(image_path)
-            # 画像読み込み完了
+            # ファイル情報はここで1回だけ取得（サイズ表示とサムネイルキャッシュのキーで共用）
+            st = os.stat(image_path)
             
-            # サムネイル作成
-            pil_image.thumbnail((150, 80), Image.Resampling.LANCZOS)
-            photo = ImageTk.PhotoImage(pil_image)
+            # 画像を読み込み、サムネイル作成
+            if thumbnail is not None:
+                photo = ImageTk.PhotoImage(thumbnail)
+            else:
+                photo = self._load_preview_photo(image_path, st)
             
             # プレビューラベル作成
             self.preview_label = tk.Label(
                 self.paste_area,
                 image=photo,
-                bg="#2b2b2b"
+                bg=self.BG_COLOR
             )
             self.preview_label.image = photo  # 参照を保持
             
@@ -7819,7 +8809,7 @@ class EnhancedImageDialog:
             self.preview_label.pack()
             
             # 情報表示
-            file_size = os.path.getsize(image_path)
+            file_size = st.st_size
             size_str = f"{file_size:,} bytes" if file_size < 1024 else f"{file_size/1024:.1f} KB"
             
             info_text = f"✅ {source}画像が設定されました\n{os.path.basename(image_path)} ({size_str})"
@@ -7829,17 +8819,76 @@ class EnhancedImageDialog:
             
             # プレビュー表示完了
             
-            # プレビュー表示後にスクロールバー可視性をチェック
-            if hasattr(self, 'dialog'):
-                self.dialog.after(200, self.check_scrollbar_visibility)
-                # スクロール領域も再計算
-                if hasattr(self, 'configure_scroll_region'):
-                    self.dialog.after(250, self.configure_scroll_region)
+            # プレビュー表示後にスクロール領域とスクロールバー可視性をまとめて更新
+            self.schedule_scroll_refresh()
             
         except Exception as e:
             logger.error(f"プレビュー表示エラー: {e}")
             self.show_error_dialog("エラー", f"画像プレビューの表示に失敗しました:\n{e}", parent=self.dialog)
     
+    def _release_preview(self):
+        """表示中のプレビューを破棄し、保持しているPhotoImageを解放"""
+        if self.preview_label is None:
+            return
+        try:
+            self.preview_label.image = None
+            self.preview_label.destroy()
+        except tk.TclError:
+            pass  # ダイアログ破棄中で既にウィジェットが無い
+        finally:
+            self.preview_label = None
+    
+    def _on_dialog_destroy(self, event):
+        """ダイアログ破棄時にプレビュー画像を解放（子ウィジェットの<Destroy>は無視）"""
+        if event.widget is self.dialog:
+            self._release_preview()
+    
+    @classmethod
+    def _prune_thumb_cache(cls):
+        """サムネイルキャッシュをTHUMB_CACHE_MAX_FILES件まで古い順に削除"""
+        try:
+            with os.scandir(cls.THUMB_CACHE_DIR) as it:
+                entries = [(entry.stat().st_mtime, entry.path) for entry in it
+                           if entry.is_file() and entry.name.endswith(".png")]
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.debug(f"サムネイルキャッシュ整理エラー（無視可能）: {e}")
+            return
+        if len(entries) <= cls.THUMB_CACHE_MAX_FILES:
+            return
+        entries.sort(reverse=True)
+        for _, path in entries[cls.THUMB_CACHE_MAX_FILES:]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.debug(f"サムネイルキャッシュ削除エラー（無視可能）: {e}")
+    
+    def _load_preview_photo(self, image_path: str, st: os.stat_result) -> "ImageTk.PhotoImage":
+        """プレビュー用サムネイルを作成（同じファイルはディスクキャッシュから読み込み、縮小処理を省略）"""
+        width, height = self.PREVIEW_SIZE
+        key_source = f"{os.path.abspath(image_path)}|{st.st_mtime_ns}|{st.st_size}|{width}x{height}"
+        cache_path = self.THUMB_CACHE_DIR / f"{hashlib.blake2b(key_source.encode('utf-8'), digest_size=8).hexdigest()}.png"
+        
+        if cache_path.exists():
+            try:
+                with Image.open(cache_path) as cached:
+                    photo = ImageTk.PhotoImage(cached)
+                # 使われたキャッシュは更新時刻を新しくし、整理で消えにくくする
+                os.utime(cache_path)
+                return photo
+            except Exception as e:
+                logger.debug(f"サムネイルキャッシュ読み込みエラー（再作成します）: {e}")
+        
+        with Image.open(image_path) as pil_image:
+            pil_image = make_thumbnail(pil_image, self.PREVIEW_SIZE)
+            try:
+                self.THUMB_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                pil_image.save(cache_path, "PNG")
+            except Exception as e:
+                logger.debug(f"サムネイルキャッシュ保存エラー（無視可能）: {e}")
+            return ImageTk.PhotoImage(pil_image)
+
     def confirm_selection(self):
         """選択を確定"""
         if self.selected_path:
@@ -7862,6 +8911,10 @@ class EnhancedImageDialog:
 
 class ConfigSwitcherDialog:
     """設定ファイル切替ダイアログ"""
+    
+    # ダイアログの初期サイズ (幅, 高さ)
+    DIALOG_SIZE = (700, 600)
+    
     def __init__(self, parent: tk.Tk, json_files: List[Dict], load_callback):
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("⚙️ 設定切替")
@@ -7871,7 +8924,7 @@ class ConfigSwitcherDialog:
         self.dialog.grab_set()
         
         # メイン画面と同じモニターに配置
-        AppConfig.position_window_on_main_monitor(self.dialog, parent, 700, 600)
+        AppConfig.position_window_on_main_monitor(self.dialog, parent, *self.DIALOG_SIZE)
         
         # スタイル設定
         self.dialog.configure(bg=AppConfig.THEME['bg_primary'])
@@ -7879,6 +8932,15 @@ class ConfigSwitcherDialog:
         self.json_files = json_files
         self.load_callback = load_callback
         self.selected_file = None
+        # ファイル情報の表示文字列は事前に作成（↓キー連打での選択変更ごとに組み立てない）
+        self._preview_texts = [
+            f"ファイル名: {file_info['name']}\n"
+            f"ステップ数: {file_info['steps']}\n"
+            f"ファイルサイズ: {file_info['size']} bytes\n"
+            f"パス: {file_info['path']}"
+            for file_info in json_files
+        ]
+        self._preview_index = None
         self.setup_ui()
         
         # ESCキーで閉じる
@@ -7887,8 +8949,9 @@ class ConfigSwitcherDialog:
     def center_window(self):
         """ウィンドウをスクリーン中央に配置"""
         self.dialog.update_idletasks()
-        x = (self.dialog.winfo_screenwidth() // 2) - (self.dialog.winfo_width() // 2)
-        y = (self.dialog.winfo_screenheight() // 2) - (self.dialog.winfo_height() // 2)
+        screen_width, screen_height = get_screen_size(self.dialog)
+        x = (screen_width // 2) - (self.dialog.winfo_width() // 2)
+        y = (screen_height // 2) - (self.dialog.winfo_height() // 2)
         self.dialog.geometry(f'+{x}+{y}')
     
     def setup_ui(self):
@@ -7922,9 +8985,9 @@ class ConfigSwitcherDialog:
         self.listbox.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side='right', fill='y')
         
-        # ファイル一覧を追加
-        for file_info in self.json_files:
-            self.listbox.insert(tk.END, file_info["display"])
+        # ファイル一覧を追加（1回のinsertでまとめて渡し、Tcl呼び出しを1回にする）
+        if self.json_files:
+            self.listbox.insert(tk.END, *(file_info["display"] for file_info in self.json_files))
         
         # ダブルクリックで読み込み
         self.listbox.bind('<Double-Button-1>', self.on_double_click)
@@ -7958,28 +9021,21 @@ class ConfigSwitcherDialog:
         if selection:
             index = selection[0]
             self.selected_file = self.json_files[index]
-            self.update_preview()
+            self.update_preview(index)
     
     def on_double_click(self, event):
         """ダブルクリック時の処理"""
         self.load_selected()
     
-    def update_preview(self):
-        """プレビューエリアを更新"""
-        if not self.selected_file:
+    def update_preview(self, index: int):
+        """プレビューエリアを更新（表示中と同じファイルなら書き換えない）"""
+        if index == self._preview_index:
             return
+        self._preview_index = index
         
         self.info_text.config(state='normal')
         self.info_text.delete('1.0', tk.END)
-        
-        info_lines = [
-            f"ファイル名: {self.selected_file['name']}",
-            f"ステップ数: {self.selected_file['steps']}",
-            f"ファイルサイズ: {self.selected_file['size']} bytes",
-            f"パス: {self.selected_file['path']}"
-        ]
-        
-        self.info_text.insert('1.0', '\n'.join(info_lines))
+        self.info_text.insert('1.0', self._preview_texts[index])
         self.info_text.config(state='disabled')
     
     def load_selected(self):
@@ -7991,17 +9047,19 @@ class ConfigSwitcherDialog:
             self.load_callback(self.selected_file['path'])
             self.dialog.destroy()
         except Exception as e:
-            import tkinter.messagebox as messagebox
             messagebox.showerror("エラー", f"設定の読み込みに失敗しました:\n{e}", parent=self.dialog)
     
     def open_config_folder(self):
         """configフォルダを開く"""
         try:
-            import subprocess
             config_dir = os.path.dirname(self.json_files[0]['path']) if self.json_files else os.path.join(os.path.dirname(__file__), "config")
-            subprocess.run(['explorer', config_dir], check=True)
+            # explorerの終了を待たずに戻る（explorerは成功時も非0を返すことがあるため終了コードは見ない）
+            subprocess.Popen(
+                ['explorer', config_dir],
+                close_fds=True,
+                creationflags=(subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP) if os.name == 'nt' else 0
+            )
         except Exception as e:
-            import tkinter.messagebox as messagebox
             messagebox.showerror("エラー", f"フォルダを開けませんでした:\n{e}", parent=self.dialog)
 
 